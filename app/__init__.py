@@ -9,6 +9,7 @@ def create_app(config_name='development'):
     # Configuration
     app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
     app.config['DEBUG'] = True if config_name == 'development' else False
+    app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_CONTENT_LENGTH', 16 * 1024 * 1024))  # uploads
 
     # Database configuration
     basedir = os.path.abspath(os.path.dirname(__file__))
@@ -29,6 +30,65 @@ def create_app(config_name='development'):
     from app.services.email_service import email_service
     email_service.init_app(app)
 
+    # Background jobs
+    app.config['SCHEDULER_ENABLED'] = os.environ.get('SCHEDULER_ENABLED', 'true').lower() in ['true', 'on', '1']
+    app.config['REMINDER_WINDOW_HOURS'] = int(os.environ.get('REMINDER_WINDOW_HOURS', 24))
+    app.config['REMINDER_INTERVAL_MINUTES'] = int(os.environ.get('REMINDER_INTERVAL_MINUTES', 15))
+    app.config['REMINDER_CLAIM_MINUTES'] = int(os.environ.get('REMINDER_CLAIM_MINUTES', 30))
+    app.config['REMINDER_BATCH_LIMIT'] = int(os.environ.get('REMINDER_BATCH_LIMIT', 500))
+    app.config['SCHEDULER_LOCK_FILE'] = os.environ.get('SCHEDULER_LOCK_FILE', os.path.join(instance_dir, 'scheduler.lock'))
+    app.config['VACCINATION_DUE_WINDOW_DAYS'] = int(os.environ.get('VACCINATION_DUE_WINDOW_DAYS', 30))
+    app.config['DOCTOR_DIGEST_INTERVAL_HOURS'] = int(os.environ.get('DOCTOR_DIGEST_INTERVAL_HOURS', 24))
+    app.config['WORKLIST_REFRESH_MINUTES'] = int(os.environ.get('WORKLIST_REFRESH_MINUTES', 15))
+    app.config['GROWTH_OUTLIER_Z'] = float(os.environ.get('GROWTH_OUTLIER_Z', 3))
+    app.config['RISK_SCORE_INTERVAL_MINUTES'] = int(os.environ.get('RISK_SCORE_INTERVAL_MINUTES', 60))
+
+    from app.services.scheduler import scheduler
+    from app.services.reminders import send_due_reminders
+    from app.services import vaccination_due
+    scheduler.add_job('appointment_reminders', app.config['REMINDER_INTERVAL_MINUTES'] * 60,
+                      send_due_reminders, run_immediately=True)
+    scheduler.add_job('vaccination_due', 24 * 60 * 60, vaccination_due.refresh_all, run_immediately=True)
+    if email_service.doctor_digest_mode:
+        from app.services.digests import send_doctor_digests
+        scheduler.add_job('doctor_digests', app.config['DOCTOR_DIGEST_INTERVAL_HOURS'] * 60 * 60,
+                          send_doctor_digests)
+    from app.services.worklist import worklist
+    # Overdue follow-ups depend on the clock, so heaps are dropped and rebuilt on next read
+    scheduler.add_job('doctor_worklist', app.config['WORKLIST_REFRESH_MINUTES'] * 60,
+                      worklist.refresh_all)
+    from app.services.growth_standards import growth_standards
+    growth_standards.init_app(app)
+    scheduler.add_job('growth_outliers', 24 * 60 * 60, growth_standards.find_outliers)
+    app.config['COHORT_SNAPSHOT_DIR'] = os.environ.get('COHORT_SNAPSHOT_DIR', os.path.join(instance_dir, 'cohorts'))
+    app.config['COHORT_REFRESH_MINUTES'] = int(os.environ.get('COHORT_REFRESH_MINUTES', 30))
+    from app.services.cohort_analytics import cohort_analytics
+    cohort_analytics.init_app(app)
+    from app.services import risk_scores
+    scheduler.add_job('risk_scores', app.config['RISK_SCORE_INTERVAL_MINUTES'] * 60, risk_scores.refresh_all,
+                      run_immediately=True)
+    scheduler.add_job('cohort_snapshots', app.config['COHORT_REFRESH_MINUTES'] * 60, cohort_analytics.refresh)
+    scheduler.init_app(app)
+
+    # Doctor availability (in-memory slot index rebuilt from the database)
+    app.config['DOCTOR_DAY_START'] = os.environ.get('DOCTOR_DAY_START', '09:00')
+    app.config['DOCTOR_DAY_END'] = os.environ.get('DOCTOR_DAY_END', '17:00')
+    app.config['DOCTOR_SLOT_MINUTES'] = int(os.environ.get('DOCTOR_SLOT_MINUTES', 30))
+    app.config['DOCTOR_WORKING_DAYS'] = os.environ.get('DOCTOR_WORKING_DAYS', '0,1,2,3,4')
+
+    from app.services.availability import availability
+    availability.init_app(app)
+
+    # Doctor dashboard statistics cache
+    app.config['DOCTOR_STATS_TTL_SECONDS'] = int(os.environ.get('DOCTOR_STATS_TTL_SECONDS', 60))
+    from app.services.doctor_stats import doctor_stats
+    doctor_stats.init_app(app)
+
+    # Doctor worklist (per-doctor priority heaps, rebuilt lazily)
+    app.config['WORKLIST_PRIORITY'] = os.environ.get('WORKLIST_PRIORITY', 'type,risk,time')
+    app.config['WORKLIST_URGENT_TYPES'] = os.environ.get('WORKLIST_URGENT_TYPES', 'emergency')
+    worklist.init_app(app)
+
     # Register blueprints
     from app.routes.main import main_bp
     from app.routes.auth import auth_bp
@@ -82,6 +142,31 @@ def add_content_management_tables(db_path):
         conn.commit()
         print("✅ Medical reports table created successfully!")
 
+    # Pregnancy weight tracking (written by the pregnancy blueprint)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS weight_entries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            date DATE NOT NULL DEFAULT (date('now')),
+            weight REAL NOT NULL,
+            pregnancy_week INTEGER NOT NULL,
+            pre_pregnancy_weight REAL,
+            height REAL,
+            bmi REAL,
+            weight_gain REAL,
+            notes TEXT,
+            bmi_category TEXT,
+            gain_band_low REAL,
+            gain_band_high REAL,
+            gain_status TEXT,
+            trajectory_updated_at TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+    conn.commit()
+
     # Check if tables exist
     cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='nutrition_content'")
     if cursor.fetchone() is None:
@@ -204,6 +289,180 @@ def add_content_management_tables(db_path):
 
     conn.close()
 
+def add_materialized_tables(db_path):
+    """Add tables holding precomputed data maintained by background jobs"""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS vaccination_due (
+                baby_id INTEGER NOT NULL,
+                schedule_id INTEGER NOT NULL,
+                vaccine_name TEXT NOT NULL,
+                age_months INTEGER NOT NULL,
+                due_date DATE NOT NULL,
+                status TEXT NOT NULL,
+                computed_at TEXT NOT NULL,
+                PRIMARY KEY (baby_id, schedule_id),
+                FOREIGN KEY (baby_id) REFERENCES babies (id),
+                FOREIGN KEY (schedule_id) REFERENCES vaccination_schedules (id)
+            )
+        ''')
+
+        # One row per doctor per digest run (doctor_id is NULL for empty runs)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS doctor_digests (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                doctor_id INTEGER,
+                period_start TEXT NOT NULL,
+                period_end TEXT NOT NULL,
+                new_count INTEGER DEFAULT 0,
+                cancelled_count INTEGER DEFAULT 0,
+                upcoming_count INTEGER DEFAULT 0,
+                sent_at TEXT NOT NULL,
+                FOREIGN KEY (doctor_id) REFERENCES users (id)
+            )
+        ''')
+
+        # Rule-based pregnancy risk per doctor-patient pair (see app/services/risk_scores.py)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS patient_risk_scores (
+                doctor_id INTEGER NOT NULL,
+                patient_id INTEGER NOT NULL,
+                score INTEGER NOT NULL,
+                level TEXT NOT NULL,
+                flags TEXT NOT NULL,
+                computed_at TEXT NOT NULL,
+                PRIMARY KEY (doctor_id, patient_id),
+                FOREIGN KEY (doctor_id) REFERENCES users (id),
+                FOREIGN KEY (patient_id) REFERENCES users (id)
+            )
+        ''')
+
+        # Per-doctor working hours (doctors without a row use the configured defaults)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS doctor_availability (
+                doctor_id INTEGER PRIMARY KEY,
+                start_time TEXT NOT NULL,
+                end_time TEXT NOT NULL,
+                slot_minutes INTEGER NOT NULL,
+                working_days TEXT NOT NULL,
+                updated_at TEXT,
+                FOREIGN KEY (doctor_id) REFERENCES users (id)
+            )
+        ''')
+
+        # Per-doctor calendar feed key; replacing it revokes every earlier feed URL
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS doctor_calendar_feeds (
+                doctor_id INTEGER PRIMARY KEY,
+                feed_key TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                FOREIGN KEY (doctor_id) REFERENCES users (id)
+            )
+        ''')
+
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"⚠️ Could not create materialized tables: {e}")
+    finally:
+        conn.close()
+
+def add_indexes(db_path):
+    """Create indexes used by background jobs and hot queries"""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    try:
+        # Reminder scheduler: confirmed, not-yet-reminded appointments in a date window
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_appointments_reminder
+            ON appointments (status, reminder_sent, appointment_date)
+        ''')
+
+        # Doctor appointment lists: WHERE doctor_id = ? ORDER BY appointment_date
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_appointments_doctor_date
+            ON appointments (doctor_id, appointment_date)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_users_role_name
+            ON users (role, full_name)
+        ''')
+
+        # Doctor dashboard statistics
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_medical_reports_doctor_date
+            ON medical_reports (doctor_id, report_date)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_weight_entries_user_date
+            ON weight_entries (user_id, date)
+        ''')
+
+        # Weight trajectory refresh: entries not computed yet
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_weight_entries_trajectory_stale
+            ON weight_entries (user_id) WHERE trajectory_updated_at IS NULL
+        ''')
+
+        # Doctor patient roster
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_medical_reports_patient_date
+            ON medical_reports (patient_id, report_date)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_babies_parent
+            ON babies (parent_id, is_active)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_appointments_user_date
+            ON appointments (user_id, appointment_date)
+        ''')
+
+        # Growth trend refresh: a baby's records by date
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_growth_records_baby_date
+            ON growth_records (baby_id, record_date)
+        ''')
+
+        # Age-bucketed growth queries (e.g. every 6-month measurement)
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_growth_records_age_months
+            ON growth_records (age_months)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_growth_records_age_days
+            ON growth_records (age_days)
+        ''')
+
+        # Risk scores: a doctor's patients by score
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_patient_risk_scores_doctor_score
+            ON patient_risk_scores (doctor_id, score DESC)
+        ''')
+
+        # Vaccination due-date engine
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_vaccination_due_status
+            ON vaccination_due (status, due_date)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_vaccination_due_schedule
+            ON vaccination_due (schedule_id)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_vaccinations_baby_vaccine
+            ON vaccinations (baby_id, vaccine_name)
+        ''')
+
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"⚠️ Could not create indexes: {e}")
+    finally:
+        conn.close()
+
 def update_database_schema(db_path):
     """Update existing database schema to ensure all required columns exist"""
 
@@ -222,9 +481,13 @@ def update_database_schema(db_path):
             ('patient_email', 'TEXT'),
             ('child_name', 'TEXT'),
             ('reminder_sent', 'BOOLEAN DEFAULT 0'),
+            ('reminder_claimed_at', 'TIMESTAMP'),
             ('confirmed_by_doctor', 'BOOLEAN DEFAULT 0'),
             ('completed_at', 'TIMESTAMP'),
-            ('updated_at', 'TIMESTAMP')
+            ('updated_at', 'TIMESTAMP'),
+            ('appointment_day', 'TEXT'),
+            ('display_date', 'TEXT'),
+            ('display_time', 'TEXT')
         ]
 
         # Add missing columns
@@ -250,7 +513,54 @@ def update_database_schema(db_path):
             except sqlite3.Error as e:
                 print(f"⚠️ Could not add column age_months: {e}")
 
+        # Age in days, derived with age_months from birth_date whenever records change
+        if 'age_days' not in existing_growth_columns:
+            try:
+                cursor.execute("ALTER TABLE growth_records ADD COLUMN age_days INTEGER")
+                print(f"✅ Added column: age_days to growth_records")
+            except sqlite3.Error as e:
+                print(f"⚠️ Could not add column age_days: {e}")
+
+        # Precomputed growth metrics (see app/services/growth_trends.py)
+        growth_metric_columns = [
+            ('weight_z', 'REAL'), ('height_z', 'REAL'), ('head_z', 'REAL'),
+            ('weight_velocity', 'REAL'), ('height_velocity', 'REAL'), ('head_velocity', 'REAL'),
+            ('weight_trend', 'REAL'), ('height_trend', 'REAL'), ('head_trend', 'REAL'),
+            ('percentile_crossings', 'TEXT'),
+            ('metrics_updated_at', 'TIMESTAMP')
+        ]
+        for column_name, column_type in growth_metric_columns:
+            if column_name not in existing_growth_columns:
+                try:
+                    cursor.execute(f"ALTER TABLE growth_records ADD COLUMN {column_name} {column_type}")
+                    print(f"✅ Added column: {column_name} to growth_records")
+                except sqlite3.Error as e:
+                    print(f"⚠️ Could not add column {column_name}: {e}")
+
+        # IOM weight-gain band per entry (see app/services/weight_trajectory.py);
+        # a missing table is created with these columns later
+        cursor.execute("PRAGMA table_info(weight_entries)")
+        existing_weight_columns = [col[1] for col in cursor.fetchall()]
+        weight_trajectory_columns = [
+            ('bmi_category', 'TEXT'),
+            ('gain_band_low', 'REAL'),
+            ('gain_band_high', 'REAL'),
+            ('gain_status', 'TEXT'),
+            ('trajectory_updated_at', 'TIMESTAMP')
+        ]
+        for column_name, column_type in weight_trajectory_columns:
+            if existing_weight_columns and column_name not in existing_weight_columns:
+                try:
+                    cursor.execute(f"ALTER TABLE weight_entries ADD COLUMN {column_name} {column_type}")
+                    print(f"✅ Added column: {column_name} to weight_entries")
+                except sqlite3.Error as e:
+                    print(f"⚠️ Could not add column {column_name}: {e}")
+
         conn.commit()
+        backfill_appointments(conn)
+        backfill_growth_ages(conn)
+        backfill_growth_scores(conn)
+        backfill_weight_trajectories(conn)
         print("✅ Database schema updated successfully")
 
     except Exception as e:
@@ -258,6 +568,82 @@ def update_database_schema(db_path):
     finally:
         conn.close()
 
+def backfill_appointments(conn):
+    """Resolve doctor_id by name and normalize appointment dates for legacy rows"""
+    from app.utils.helpers import appointment_datetime_fields
+    from app.data_manager import DOCTOR_BY_NAME_SQL
+
+    cursor = conn.cursor()
+
+    # Older bookings only carried doctor_name; link them with the same rule booking uses
+    cursor.execute('SELECT DISTINCT doctor_name FROM appointments WHERE doctor_id IS NULL AND doctor_name IS NOT NULL')
+    links = []
+    for (doctor_name,) in cursor.fetchall():
+        cursor.execute(DOCTOR_BY_NAME_SQL, (doctor_name,))
+        doctor = cursor.fetchone()
+        if doctor:
+            links.append((doctor[0], doctor_name))
+    cursor.executemany('UPDATE appointments SET doctor_id = ? WHERE doctor_id IS NULL AND doctor_name = ?', links)
+    linked = cursor.rowcount if links else 0
+
+    # Canonical ISO dates sort correctly as text; display fields are formatted once here
+    cursor.execute('SELECT id, appointment_date FROM appointments WHERE display_date IS NULL')
+    updates = []
+    for appointment_id, appointment_date in cursor.fetchall():
+        try:
+            fields = appointment_datetime_fields(appointment_date)
+        except (ValueError, TypeError):
+            fields = {
+                'appointment_date': appointment_date,
+                'appointment_day': appointment_date,
+                'display_date': appointment_date or 'Not specified',
+                'display_time': 'Not specified'
+            }
+        updates.append((
+            fields['appointment_date'],
+            fields['appointment_day'],
+            fields['display_date'],
+            fields['display_time'],
+            appointment_id
+        ))
+
+    cursor.executemany('''
+        UPDATE appointments
+        SET appointment_date = ?, appointment_day = ?, display_date = ?, display_time = ?
+        WHERE id = ?
+    ''', updates)
+    conn.commit()
+
+    if linked or updates:
+        print(f"✅ Backfilled appointments: {linked} linked to doctors, {len(updates)} dates normalized")
+
+def backfill_growth_ages(conn):
+    """Derive age_days/age_months for growth records saved before they were computed in SQL"""
+    from app.services.growth_trends import update_ages
+
+    updated = update_ages(conn, missing_only=True)
+    conn.commit()
+    if updated:
+        print(f"✅ Backfilled ages for {updated} growth records")
+
+def backfill_growth_scores(conn):
+    """Compute growth records saved before metrics were stored or before the WHO tables covered their age"""
+    from app.services.growth_trends import rescore_missing
+
+    updated = rescore_missing(conn)
+    conn.commit()
+    if updated:
+        print(f"✅ Backfilled growth metrics for {updated} growth records")
+
+def backfill_weight_trajectories(conn):
+    """Compute the weight-gain band and status for entries saved before they were stored"""
+    from app.services.weight_trajectory import refresh_entries
+
+    updated = refresh_entries(conn, 'trajectory_updated_at IS NULL')
+    conn.commit()
+    if updated:
+        print(f"✅ Backfilled weight trajectories for {updated} weight entries")
+
 def init_database(db_path):
     """Initialize SQLite database with tables and sample data"""
 
@@ -267,6 +653,8 @@ def init_database(db_path):
         update_database_schema(db_path)
         # Check if content management tables exist and create them if they don't
         add_content_management_tables(db_path)
+        add_materialized_tables(db_path)
+        add_indexes(db_path)
         return
 
     print("🏗️  Creating SQLite database...")
@@ -326,11 +714,23 @@ def init_database(db_path):
             baby_id INTEGER NOT NULL,
             record_date DATE NOT NULL,
             age_months INTEGER,
+            age_days INTEGER,
             weight REAL,
             height REAL,
             head_circumference REAL,
             doctor_name TEXT,
             notes TEXT,
+            weight_z REAL,
+            height_z REAL,
+            head_z REAL,
+            weight_velocity REAL,
+            height_velocity REAL,
+            head_velocity REAL,
+            weight_trend REAL,
+            height_trend REAL,
+            head_trend REAL,
+            percentile_crossings TEXT,
+            metrics_updated_at TIMESTAMP,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (baby_id) REFERENCES babies (id)
         );
@@ -356,6 +756,9 @@ def init_database(db_path):
             doctor_id INTEGER,
             appointment_type TEXT NOT NULL,
             appointment_date TIMESTAMP NOT NULL,
+            appointment_day TEXT,
+            display_date TEXT,
+            display_time TEXT,
             doctor_name TEXT NOT NULL,
             clinic_name TEXT,
             purpose TEXT,
@@ -365,6 +768,7 @@ def init_database(db_path):
             patient_email TEXT,
             child_name TEXT,
             reminder_sent BOOLEAN DEFAULT 0,
+            reminder_claimed_at TIMESTAMP,
             confirmed_by_doctor BOOLEAN DEFAULT 0,
             completed_at TIMESTAMP,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -400,6 +804,8 @@ def init_database(db_path):
     # Add content management tables using the helper function
     conn.close()  # Close current connection
     add_content_management_tables(db_path)
+    add_materialized_tables(db_path)
+    add_indexes(db_path)
 
     # Reopen connection for final commit
     conn = sqlite3.connect(db_path)
@@ -8,12 +8,37 @@ from datetime import datetime
 from werkzeug.security import check_password_hash
 from flask import current_app
 
+# The one rule for linking an appointment's doctor_name to an account, used by
+# booking and the startup backfill: exact full name, active accounts first
+DOCTOR_BY_NAME_SQL = '''
+    SELECT id, full_name, email, is_active
+    FROM users
+    WHERE role = 'doctor' AND full_name = ?
+    ORDER BY is_active DESC, id
+    LIMIT 1
+'''
+
 class DataManager:
     @staticmethod
     def get_connection():
         """Get database connection"""
         return sqlite3.connect(current_app.config['DATABASE_PATH'])
 
+    @staticmethod
+    def get_doctor_by_name(full_name):
+        """Get the doctor account a booking's doctor_name refers to (DOCTOR_BY_NAME_SQL)"""
+        conn = DataManager.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(DOCTOR_BY_NAME_SQL, (full_name,))
+
+        row = cursor.fetchone()
+        conn.close()
+
+        if row:
+            return {'id': row[0], 'full_name': row[1], 'email': row[2], 'is_active': bool(row[3])}
+        return None
+
     @staticmethod
     def get_user_by_email(email):
         """Get user by email"""
@@ -284,6 +309,9 @@ class DataManager:
             conn.commit()
             conn.close()
 
+            from app.services.vaccination_due import refresh_for_baby
+            refresh_for_baby(baby_id)
+
             return DataManager.get_baby_by_id(baby_id)
         except Exception as e:
             conn.rollback()
@@ -697,6 +725,9 @@ class DataManager:
         conn.commit()
         conn.close()
 
+        from app.services.vaccination_due import refresh_for_schedule
+        refresh_for_schedule(vaccination_id)
+
         return vaccination_id
 
     @staticmethod
@@ -1429,6 +1460,9 @@ class DataManager:
         conn.commit()
         conn.close()
 
+        from app.services.vaccination_due import refresh_for_schedule
+        refresh_for_schedule(vaccination_id)
+
     @staticmethod
     def delete_vaccination_schedule(vaccination_id):
         """Delete vaccination schedule (soft delete)"""
@@ -1442,4 +1476,7 @@ class DataManager:
         ''', (datetime.now().isoformat(), vaccination_id))
 
         conn.commit()
-        conn.close()
\ No newline at end of file
+        conn.close()
+
+        from app.services.vaccination_due import refresh_for_schedule
+        refresh_for_schedule(vaccination_id)
\ No newline at end of file
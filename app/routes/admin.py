@@ -1265,6 +1265,88 @@ def admin_get_babies():
         }), 500
 
 
+@admin_bp.route('/api/growth-outliers', methods=['GET'])
+@admin_required
+def admin_growth_outliers():
+    """
+    Growth records whose WHO z-score is beyond the outlier threshold
+
+    Returns the last scheduled run; ?refresh=1 (or a custom ?z=) rescores now.
+    """
+    try:
+        from app.services.growth_standards import growth_standards
+
+        threshold = request.args.get('z', type=float)
+        if request.args.get('refresh') or threshold is not None or growth_standards.last_outliers is None:
+            growth_standards.find_outliers(threshold)
+
+        result = growth_standards.last_outliers
+        return jsonify({
+            'success': True,
+            'count': len(result['outliers']),
+            **result
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@admin_bp.route('/api/cohort-curves', methods=['GET'])
+@admin_required
+def admin_cohort_curves():
+    """
+    Population percentile curves from the cohort snapshots
+
+    ?curve=pregnancy_weight_gain (default) gives weight gain by pregnancy week;
+    ?curve=baby_weight gives baby weight by month of age, optionally for one
+    ?gender=. ?percentiles=10,50,90 picks the bands; ?refresh=1 merges recent
+    changes first (?refresh=full rebuilds).
+    """
+    try:
+        from app.services.cohort_analytics import cohort_analytics, DEFAULT_PERCENTILES, GENDERS
+
+        curve = request.args.get('curve', 'pregnancy_weight_gain')
+        if curve not in ('pregnancy_weight_gain', 'baby_weight'):
+            return jsonify({'success': False, 'error': 'curve must be pregnancy_weight_gain or baby_weight'}), 400
+
+        try:
+            percentiles = [float(p) for p in request.args.get('percentiles', '').split(',') if p.strip()]
+        except ValueError:
+            return jsonify({'success': False, 'error': 'percentiles must be numbers'}), 400
+        percentiles = percentiles or list(DEFAULT_PERCENTILES)
+        if any(p < 0 or p > 100 for p in percentiles):
+            return jsonify({'success': False, 'error': 'percentiles must be between 0 and 100'}), 400
+
+        gender = (request.args.get('gender') or '').lower() or None
+        if gender is not None and gender not in GENDERS:
+            return jsonify({'success': False, 'error': f"gender must be one of {', '.join(GENDERS)}"}), 400
+
+        refresh = request.args.get('refresh')
+        if refresh:
+            cohort_analytics.refresh(full=refresh == 'full')
+
+        if curve == 'baby_weight':
+            points = cohort_analytics.baby_weight_curve(gender, percentiles)
+        else:
+            points = cohort_analytics.pregnancy_gain_curve(percentiles)
+
+        return jsonify({
+            'success': True,
+            'curve': curve,
+            'gender': gender,
+            'percentiles': percentiles,
+            'points': points,
+            'snapshots': cohort_analytics.status()
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 @admin_bp.route('/api/babies/assign', methods=['POST'])
 @admin_required
 def admin_assign_baby_to_user():
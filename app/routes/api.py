@@ -3,6 +3,10 @@ from datetime import datetime
 import json
 import sys
 
+from app.utils.helpers import parse_appointment_datetime
+from app.services.availability import availability, SlotConflictError
+from app.services import appointments as appointment_service
+
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
 def login_required(f):
@@ -304,44 +308,13 @@ def appointments_data():
     """Get user appointments or create new appointment"""
     if request.method == 'GET':
         try:
-            from app.data_manager import DataManager
-
             user_id = session['user_id']
 
             # Get all appointments for the current user
-            conn = DataManager.get_connection()
-            cursor = conn.cursor()
-
-            cursor.execute('''
-                SELECT a.id, a.user_id, a.baby_id, a.appointment_type, a.appointment_date,
-                       a.doctor_name, a.clinic_name, a.purpose, a.status, a.notes,
-                       a.created_at, b.name as baby_name
-                FROM appointments a
-                LEFT JOIN babies b ON a.baby_id = b.id
-                WHERE a.user_id = ?
-                ORDER BY a.appointment_date DESC
-            ''', (user_id,))
-
-            rows = cursor.fetchall()
-            conn.close()
-
-            appointments_data = []
-            for row in rows:
-                appointment_dict = {
-                    'id': row[0],
-                    'user_id': row[1],
-                    'baby_id': row[2],
-                    'appointment_type': row[3],
-                    'appointment_date': row[4],
-                    'doctor_name': row[5],
-                    'clinic_name': row[6],
-                    'purpose': row[7],
-                    'status': row[8],
-                    'notes': row[9],
-                    'created_at': row[10],
-                    'baby_name': row[11]
-                }
-                appointments_data.append(appointment_dict)
+            appointments_data = [
+                appointment_service.project(appointment, appointment_service.PATIENT_FIELDS)
+                for appointment in appointment_service.list_for_patient(user_id)
+            ]
 
             return jsonify({
                 'success': True,
@@ -373,52 +346,38 @@ def appointments_data():
 
             # Parse appointment date
             try:
-                appointment_date = datetime.fromisoformat(data['appointment_date'].replace('Z', '+00:00'))
+                appointment_date = parse_appointment_datetime(data['appointment_date'])
             except ValueError:
                 return jsonify({
                     'success': False,
                     'error': 'Invalid appointment date format'
                 }), 400
 
-            # Create new appointment
-            conn = DataManager.get_connection()
-            cursor = conn.cursor()
-
-            # Find doctor ID by name
-            doctor_id = None
-            if data.get('doctor_name'):
-                users = DataManager.get_all_users()
-                doctor = next((u for u in users if u.get('full_name') == data['doctor_name'] and u.get('role') == 'doctor'), None)
-                if doctor:
-                    doctor_id = doctor['id']
+            # Every booking must be linked to a doctor account, or no doctor would see it
+            doctor = DataManager.get_doctor_by_name(data['doctor_name'])
+            if not doctor or not doctor['is_active']:
+                return jsonify({
+                    'success': False,
+                    'error': 'Doctor not found. Please choose a doctor from the list.'
+                }), 400
+            doctor_id = doctor['id']
 
             # Get user information for patient details
             user_data = DataManager.get_user_by_id(user_id)
 
-            cursor.execute('''
-                INSERT INTO appointments (user_id, baby_id, doctor_id, appointment_type, appointment_date,
-                                        doctor_name, clinic_name, purpose, status, patient_name, patient_email,
-                                        created_at, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                user_id,
-                data.get('baby_id'),
-                doctor_id,
-                data['appointment_type'],
-                appointment_date.isoformat(),
-                data['doctor_name'],
-                data.get('clinic_name'),
-                data.get('purpose'),
-                'pending',
-                user_data['full_name'],
-                user_data['email'],
-                datetime.now().isoformat(),
-                datetime.now().isoformat()
-            ))
-
-            appointment_id = cursor.lastrowid
-            conn.commit()
-            conn.close()
+            # Create new appointment
+            try:
+                appointment_id = appointment_service.create(user_id, doctor_id, appointment_date, {
+                    'baby_id': data.get('baby_id'),
+                    'appointment_type': data['appointment_type'],
+                    'doctor_name': data['doctor_name'],
+                    'clinic_name': data.get('clinic_name'),
+                    'purpose': data.get('purpose'),
+                    'patient_name': user_data['full_name'],
+                    'patient_email': user_data['email']
+                })
+            except SlotConflictError as e:
+                return jsonify(appointment_service.conflict_error(e)), 409
 
             # Send booking notification emails to both patient and doctor
             email_results = {
@@ -749,44 +708,13 @@ def appointments_api():
     """Get user appointments or create new appointment"""
     if request.method == 'GET':
         try:
-            from app.data_manager import DataManager
-
             user_id = session['user_id']
 
             # Get all appointments for the current user
-            conn = DataManager.get_connection()
-            cursor = conn.cursor()
-
-            cursor.execute('''
-                SELECT a.id, a.user_id, a.baby_id, a.appointment_type, a.appointment_date,
-                       a.doctor_name, a.clinic_name, a.purpose, a.status, a.notes,
-                       a.created_at, b.name as baby_name
-                FROM appointments a
-                LEFT JOIN babies b ON a.baby_id = b.id
-                WHERE a.user_id = ?
-                ORDER BY a.appointment_date DESC
-            ''', (user_id,))
-
-            rows = cursor.fetchall()
-            conn.close()
-
-            appointments_data = []
-            for row in rows:
-                appointment_dict = {
-                    'id': row[0],
-                    'user_id': row[1],
-                    'baby_id': row[2],
-                    'appointment_type': row[3],
-                    'appointment_date': row[4],
-                    'doctor_name': row[5],
-                    'clinic_name': row[6],
-                    'purpose': row[7],
-                    'status': row[8],
-                    'notes': row[9],
-                    'created_at': row[10],
-                    'baby_name': row[11]
-                }
-                appointments_data.append(appointment_dict)
+            appointments_data = [
+                appointment_service.project(appointment, appointment_service.PATIENT_FIELDS)
+                for appointment in appointment_service.list_for_patient(user_id)
+            ]
 
             return jsonify({
                 'success': True,
@@ -818,52 +746,38 @@ def appointments_api():
 
             # Parse appointment date
             try:
-                appointment_date = datetime.fromisoformat(data['appointment_date'].replace('Z', '+00:00'))
+                appointment_date = parse_appointment_datetime(data['appointment_date'])
             except ValueError:
                 return jsonify({
                     'success': False,
                     'error': 'Invalid appointment date format'
                 }), 400
 
-            # Create new appointment
-            conn = DataManager.get_connection()
-            cursor = conn.cursor()
-
-            # Find doctor ID by name
-            doctor_id = None
-            if data.get('doctor_name'):
-                users = DataManager.get_all_users()
-                doctor = next((u for u in users if u.get('full_name') == data['doctor_name'] and u.get('role') == 'doctor'), None)
-                if doctor:
-                    doctor_id = doctor['id']
+            # Every booking must be linked to a doctor account, or no doctor would see it
+            doctor = DataManager.get_doctor_by_name(data['doctor_name'])
+            if not doctor or not doctor['is_active']:
+                return jsonify({
+                    'success': False,
+                    'error': 'Doctor not found. Please choose a doctor from the list.'
+                }), 400
+            doctor_id = doctor['id']
 
             # Get user information for email
             user_data = DataManager.get_user_by_id(user_id)
 
-            cursor.execute('''
-                INSERT INTO appointments (user_id, baby_id, doctor_id, appointment_type, appointment_date,
-                                        doctor_name, clinic_name, purpose, status, patient_name, patient_email,
-                                        created_at, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                user_id,
-                data.get('baby_id'),
-                doctor_id,
-                data['appointment_type'],
-                appointment_date.isoformat(),
-                data['doctor_name'],
-                data.get('clinic_name', 'Maternal Care Clinic'),
-                data.get('purpose'),
-                'pending',
-                user_data['full_name'],
-                user_data['email'],
-                datetime.now().isoformat(),
-                datetime.now().isoformat()
-            ))
-
-            appointment_id = cursor.lastrowid
-            conn.commit()
-            conn.close()
+            # Create new appointment
+            try:
+                appointment_id = appointment_service.create(user_id, doctor_id, appointment_date, {
+                    'baby_id': data.get('baby_id'),
+                    'appointment_type': data['appointment_type'],
+                    'doctor_name': data['doctor_name'],
+                    'clinic_name': data.get('clinic_name', 'Maternal Care Clinic'),
+                    'purpose': data.get('purpose'),
+                    'patient_name': user_data['full_name'],
+                    'patient_email': user_data['email']
+                })
+            except SlotConflictError as e:
+                return jsonify(appointment_service.conflict_error(e)), 409
 
             # Send immediate booking notification to patient and doctor
             email_results = {
@@ -931,23 +845,11 @@ def appointments_api():
 def appointment_detail_api(appointment_id):
     """Cancel or update a specific appointment"""
     try:
-        from app.data_manager import DataManager
-
         user_id = session['user_id']
 
         # Check if appointment exists and belongs to user
-        conn = DataManager.get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute('''
-            SELECT id, status FROM appointments
-            WHERE id = ? AND user_id = ?
-        ''', (appointment_id, user_id))
-
-        appointment = cursor.fetchone()
-
+        appointment = appointment_service.get_for_patient(appointment_id, user_id)
         if not appointment:
-            conn.close()
             return jsonify({
                 'success': False,
                 'error': 'Appointment not found'
@@ -955,14 +857,7 @@ def appointment_detail_api(appointment_id):
 
         if request.method == 'DELETE':
             # Cancel the appointment
-            cursor.execute('''
-                UPDATE appointments
-                SET status = 'cancelled', updated_at = ?
-                WHERE id = ? AND user_id = ?
-            ''', (datetime.now().isoformat(), appointment_id, user_id))
-
-            conn.commit()
-            conn.close()
+            appointment_service.cancel(appointment_id, doctor_id=appointment['doctor_id'])
 
             return jsonify({
                 'success': True,
@@ -972,42 +867,20 @@ def appointment_detail_api(appointment_id):
         elif request.method == 'PUT':
             # Update appointment
             data = request.get_json()
-
-            update_fields = []
-            update_values = []
-
-            if 'status' in data:
-                update_fields.append('status = ?')
-                update_values.append(data['status'])
-            if 'notes' in data:
-                update_fields.append('notes = ?')
-                update_values.append(data['notes'])
+            changes = {field: data[field] for field in ('status', 'notes') if field in data}
             if 'appointment_date' in data:
                 try:
-                    appointment_date = datetime.fromisoformat(data['appointment_date'].replace('Z', '+00:00'))
-                    update_fields.append('appointment_date = ?')
-                    update_values.append(appointment_date.isoformat())
+                    changes['appointment_date'] = parse_appointment_datetime(data['appointment_date'])
                 except ValueError:
-                    conn.close()
                     return jsonify({
                         'success': False,
                         'error': 'Invalid appointment date format'
                     }), 400
 
-            if update_fields:
-                update_fields.append('updated_at = ?')
-                update_values.extend([datetime.now().isoformat(), appointment_id, user_id])
-
-                query = f'''
-                    UPDATE appointments
-                    SET {', '.join(update_fields)}
-                    WHERE id = ? AND user_id = ?
-                '''
-
-                cursor.execute(query, update_values)
-                conn.commit()
-
-            conn.close()
+            try:
+                appointment_service.update(appointment, changes)
+            except SlotConflictError as e:
+                return jsonify(appointment_service.conflict_error(e)), 409
 
             return jsonify({
                 'success': True,
@@ -1020,43 +893,56 @@ def appointment_detail_api(appointment_id):
             'error': str(e)
         }), 500
 
-@api_bp.route('/appointments/<int:appointment_id>/confirm', methods=['POST'])
+@api_bp.route('/doctors/<int:doctor_id>/availability')
 @login_required
-def confirm_user_appointment(appointment_id):
-    """User confirms their own appointment"""
+def doctor_availability_api(doctor_id):
+    """Free appointment slots for a doctor on a given day (?date=YYYY-MM-DD)"""
     try:
-        from app.data_manager import DataManager
-
-        user_id = session['user_id']
+        try:
+            day = datetime.strptime(request.args.get('date', ''), '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'Query parameter date must be YYYY-MM-DD'
+            }), 400
 
-        # Check if appointment exists and belongs to user
-        conn = DataManager.get_connection()
-        cursor = conn.cursor()
+        settings = availability.get_settings(doctor_id)
+        slots = availability.free_slots(doctor_id, day)
 
-        cursor.execute('''
-            SELECT id, status FROM appointments
-            WHERE id = ? AND user_id = ?
-        ''', (appointment_id, user_id))
+        return jsonify({
+            'success': True,
+            'doctor_id': doctor_id,
+            'date': day.isoformat(),
+            'working_hours': {
+                'start': settings['start_time'].strftime('%H:%M'),
+                'end': settings['end_time'].strftime('%H:%M')
+            },
+            'slot_minutes': settings['slot_minutes'],
+            'slots': [{
+                'appointment_date': slot.isoformat(),
+                'time': slot.strftime('%H:%M'),
+                'display_time': slot.strftime('%I:%M %p')
+            } for slot in slots],
+            'count': len(slots)
+        })
 
-        appointment = cursor.fetchone()
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
 
-        if not appointment:
-            conn.close()
+@api_bp.route('/appointments/<int:appointment_id>/confirm', methods=['POST'])
+@login_required
+def confirm_user_appointment(appointment_id):
+    """User confirms their own appointment"""
+    try:
+        if not appointment_service.confirm_by_patient(appointment_id, session['user_id']):
             return jsonify({
                 'success': False,
                 'error': 'Appointment not found'
             }), 404
 
-        # Update appointment status to confirmed
-        cursor.execute('''
-            UPDATE appointments
-            SET status = 'confirmed', updated_at = ?
-            WHERE id = ? AND user_id = ?
-        ''', (datetime.now().isoformat(), appointment_id, user_id))
-
-        conn.commit()
-        conn.close()
-
         return jsonify({
             'success': True,
             'message': 'Appointment confirmed successfully'
@@ -1190,6 +1076,9 @@ def babies_api():
             conn.commit()
             conn.close()
 
+            from app.services.vaccination_due import refresh_for_baby
+            refresh_for_baby(baby_id)
+
             # Get the created baby
             baby_data = DataManager.get_baby_by_id(baby_id)
 
@@ -1253,6 +1142,9 @@ def baby_detail_api(baby_id):
             cursor.execute('UPDATE babies SET is_active = 0 WHERE id = ?', (baby_id,))
             conn.commit()
             conn.close()
+
+            from app.services.vaccination_due import refresh_for_baby
+            refresh_for_baby(baby_id)
             
             return jsonify({
                 'success': True,
@@ -1,8 +1,13 @@
-from flask import Blueprint, render_template, request, jsonify, session, redirect, url_for
+from flask import Blueprint, render_template, request, jsonify, session, redirect, url_for, Response, stream_with_context
 from datetime import datetime, date, timedelta
 from app.data_manager import DataManager
+from app.utils.helpers import parse_appointment_datetime, stream_csv
+from app.services.availability import SlotConflictError
+from app.services import appointments as appointment_service
+from app.services.baby_profile import fetch_profile
 import uuid
 import json
+import sqlite3
 
 babycare_bp = Blueprint('babycare', __name__, url_prefix='/babycare')
 
@@ -40,6 +45,48 @@ def validate_baby_access(baby_id, user_id):
 
     return baby, None
 
+# Newest records of each kind on the baby dashboard
+DASHBOARD_RECENT_RECORDS = 5
+
+GROWTH_RECORD_COLUMNS = '''id, baby_id, record_date, age_months, age_days, weight, height, head_circumference, notes,
+    weight_z, height_z, head_z, weight_velocity, height_velocity, head_velocity,
+    weight_trend, height_trend, head_trend, percentile_crossings, metrics_updated_at, created_at'''
+
+def growth_record_to_dict(row):
+    """Growth record response with its precomputed WHO scores, velocity and trend"""
+    from app.services.growth_standards import percentile
+
+    z_scores = {
+        'weight_for_age': row['weight_z'],
+        'length_for_age': row['height_z'],
+        'head_circumference_for_age': row['head_z']
+    }
+    return {
+        'id': row['id'],
+        'baby_id': row['baby_id'],
+        'date': row['record_date'],
+        'age_months': row['age_months'],
+        'age_days': row['age_days'],
+        'weight': row['weight'],
+        'height': row['height'],
+        'head': row['head_circumference'],
+        'notes': row['notes'],
+        'created_at': row['created_at'],
+        'z_scores': {name: None if z is None else round(z, 2) for name, z in z_scores.items()},
+        'percentiles': {name: None if z is None else round(float(percentile(z)), 1) for name, z in z_scores.items()},
+        'velocity': {
+            'weight': row['weight_velocity'],
+            'height': row['height_velocity'],
+            'head': row['head_velocity']
+        },
+        'trend': {
+            'weight': row['weight_trend'],
+            'height': row['height_trend'],
+            'head': row['head_trend']
+        },
+        'percentile_crossings': json.loads(row['percentile_crossings'] or '[]')
+    }
+
 # Page Routes
 
 @babycare_bp.route('/')
@@ -238,7 +285,6 @@ def filter_babies_by_unique_id():
         data = request.get_json()
         unique_id = data.get('unique_id', '').strip()
         user_id = session['user_id']
-        user = DataManager.get_user_by_id(user_id)
         
         if not unique_id:
             return jsonify({
@@ -246,68 +292,27 @@ def filter_babies_by_unique_id():
                 'error': 'Unique ID is required'
             }), 400
         
-        # Validate and get baby by unique ID
-        baby = DataManager.get_baby_by_unique_id(unique_id)
+        # Baby, parent, every record and the counts in one query
+        conn = DataManager.get_connection()
+        try:
+            profile = fetch_profile(conn, user_id, 'related_data', unique_id=unique_id)
+        finally:
+            conn.close()
         
-        if not baby:
+        if not profile:
             return jsonify({
                 'success': False,
                 'error': 'No baby found with this unique ID'
             }), 404
         
         # Check if user has access (parent or admin)
-        if baby['parent_id'] != user_id and (not user or user['role'] != 'admin'):
+        if profile['parent_id'] != user_id and profile['viewer_role'] != 'admin':
             return jsonify({
                 'success': False,
                 'error': 'Access denied - You do not have permission to view this baby'
             }), 403
         
-        # Get full baby information with parent details
-        baby_with_parent = DataManager.get_baby_with_parent_info(unique_id)
-        
-        # Get related data for this baby
-        conn = DataManager.get_connection()
-        cursor = conn.cursor()
-        
-        # Get vaccinations
-        cursor.execute('''
-            SELECT * FROM vaccinations 
-            WHERE baby_id = ? 
-            ORDER BY scheduled_date DESC
-        ''', (baby['id'],))
-        vaccinations = [dict(zip([col[0] for col in cursor.description], row)) 
-                       for row in cursor.fetchall()]
-        
-        # Get growth records
-        cursor.execute('''
-            SELECT * FROM growth_records 
-            WHERE baby_id = ? 
-            ORDER BY record_date DESC
-        ''', (baby['id'],))
-        growth_records = [dict(zip([col[0] for col in cursor.description], row)) 
-                         for row in cursor.fetchall()]
-        
-        # Get nutrition records
-        cursor.execute('''
-            SELECT * FROM nutrition_records 
-            WHERE baby_id = ? 
-            ORDER BY record_date DESC
-        ''', (baby['id'],))
-        nutrition_records = [dict(zip([col[0] for col in cursor.description], row)) 
-                            for row in cursor.fetchall()]
-        
-        conn.close()
-        
-        return jsonify({
-            'success': True,
-            'baby': baby_with_parent,
-            'related_data': {
-                'vaccinations': vaccinations,
-                'growth_records': growth_records,
-                'nutrition_records': nutrition_records
-            },
-            'message': f'Successfully loaded data for {baby["name"]}'
-        })
+        return Response(profile['profile'], mimetype='application/json')
         
     except Exception as e:
         return jsonify({
@@ -799,6 +804,9 @@ def babies_api():
             conn.commit()
             conn.close()
 
+            from app.services.vaccination_due import refresh_for_baby
+            refresh_for_baby(baby_id)
+
             # Get the created baby
             baby_data = DataManager.get_baby_by_id(baby_id)
 
@@ -901,10 +909,18 @@ def baby_detail_api(baby_id):
                 update_values.append(baby_id)
                 query = f"UPDATE babies SET {', '.join(update_fields)} WHERE id = ?"
                 cursor.execute(query, update_values)
+                if 'birth_date' in data or 'gender' in data:
+                    # Stored ages and z-scores depend on birth date and sex
+                    from app.services import growth_trends
+                    growth_trends.refresh_baby(conn, baby_id)
                 conn.commit()
 
             conn.close()
 
+            if 'birth_date' in data:
+                from app.services.vaccination_due import refresh_for_baby
+                refresh_for_baby(baby_id)
+
             # Get updated baby data
             updated_baby = DataManager.get_baby_by_id(baby_id)
 
@@ -922,6 +938,9 @@ def baby_detail_api(baby_id):
             conn.commit()
             conn.close()
 
+            from app.services.vaccination_due import refresh_for_baby
+            refresh_for_baby(baby_id)
+
             return jsonify({
                 'success': True,
                 'message': 'Baby record deactivated successfully'
@@ -936,108 +955,22 @@ def baby_dashboard_api(baby_id):
     """Get comprehensive dashboard data for a specific baby"""
     try:
         user_id = session['user_id']
-        user = DataManager.get_user_by_id(user_id)
-        
-        # Get baby and check access
-        baby = DataManager.get_baby_by_id(baby_id)
-        if not baby:
+
+        # Baby, recent records, upcoming appointments and counts in one query
+        conn = DataManager.get_connection()
+        try:
+            profile = fetch_profile(conn, user_id, 'recent_data', baby_id=baby_id, limit=DASHBOARD_RECENT_RECORDS)
+        finally:
+            conn.close()
+
+        if not profile:
             return jsonify({'error': 'Baby not found'}), 404
             
         # Check if user has access (parent or admin)
-        if baby['parent_id'] != user_id and (not user or user['role'] != 'admin'):
+        if profile['parent_id'] != user_id and profile['viewer_role'] != 'admin':
             return jsonify({'error': 'Access denied'}), 403
 
-        # Get recent records using DataManager
-        conn = DataManager.get_connection()
-        cursor = conn.cursor()
-        
-        # Get recent vaccinations
-        cursor.execute('''
-            SELECT * FROM vaccinations 
-            WHERE baby_id = ? 
-            ORDER BY scheduled_date DESC 
-            LIMIT 5
-        ''', (baby_id,))
-        recent_vaccinations = [dict(zip([col[0] for col in cursor.description], row)) 
-                             for row in cursor.fetchall()]
-        
-        # Get recent growth records
-        cursor.execute('''
-            SELECT * FROM growth_records 
-            WHERE baby_id = ? 
-            ORDER BY record_date DESC 
-            LIMIT 5
-        ''', (baby_id,))
-        recent_growth = [dict(zip([col[0] for col in cursor.description], row)) 
-                        for row in cursor.fetchall()]
-        
-        # Get recent nutrition records
-        cursor.execute('''
-            SELECT * FROM nutrition_records 
-            WHERE baby_id = ? 
-            ORDER BY record_date DESC 
-            LIMIT 5
-        ''', (baby_id,))
-        recent_nutrition = [dict(zip([col[0] for col in cursor.description], row)) 
-                           for row in cursor.fetchall()]
-        
-        # Get upcoming appointments
-        cursor.execute('''
-            SELECT * FROM appointments 
-            WHERE baby_id = ? AND appointment_date > ? 
-            ORDER BY appointment_date 
-            LIMIT 5
-        ''', (baby_id, datetime.now().isoformat()))
-        upcoming_appointments = [dict(zip([col[0] for col in cursor.description], row)) 
-                                for row in cursor.fetchall()]
-        
-        # Count total records
-        cursor.execute('SELECT COUNT(*) FROM vaccinations WHERE baby_id = ?', (baby_id,))
-        total_vaccinations = cursor.fetchone()[0]
-        
-        cursor.execute('SELECT COUNT(*) FROM growth_records WHERE baby_id = ?', (baby_id,))
-        total_growth_records = cursor.fetchone()[0]
-        
-        cursor.execute('SELECT COUNT(*) FROM nutrition_records WHERE baby_id = ?', (baby_id,))
-        total_nutrition_records = cursor.fetchone()[0]
-        
-        cursor.execute('SELECT COUNT(*) FROM appointments WHERE baby_id = ?', (baby_id,))
-        total_appointments = cursor.fetchone()[0]
-        
-        # Calculate vaccination progress
-        cursor.execute('''
-            SELECT COUNT(*) FROM vaccinations 
-            WHERE baby_id = ? AND status = 'completed'
-        ''', (baby_id,))
-        completed_vaccinations = cursor.fetchone()[0]
-        
-        conn.close()
-
-        vaccination_progress = {
-            'total': total_vaccinations,
-            'completed': completed_vaccinations,
-            'percentage': (completed_vaccinations / total_vaccinations * 100) if total_vaccinations > 0 else 0
-        }
-
-        return jsonify({
-            'success': True,
-            'baby': baby,
-            'recent_data': {
-                'vaccinations': recent_vaccinations,
-                'growth_records': recent_growth,
-                'nutrition_records': recent_nutrition,
-                'upcoming_appointments': upcoming_appointments
-            },
-            'statistics': {
-                'vaccination_progress': vaccination_progress,
-                'total_records': {
-                    'vaccinations': total_vaccinations,
-                    'growth_records': total_growth_records,
-                    'nutrition_records': total_nutrition_records,
-                    'appointments': total_appointments
-                }
-            }
-        })
+        return Response(profile['profile'], mimetype='application/json')
 
     except Exception as e:
         return jsonify({'error': f'Failed to load dashboard: {str(e)}'}), 500
@@ -1297,31 +1230,54 @@ def admin_all_babies():
 def admin_vaccination_schedule():
     """Get vaccination schedule overview for admin"""
     try:
-        # Get upcoming vaccinations
-        upcoming_vaccinations = Vaccination.query.filter(
-            Vaccination.status == 'scheduled',
-            Vaccination.scheduled_date >= date.today()
-        ).order_by(Vaccination.scheduled_date).all()
-
-        # Get overdue vaccinations
-        overdue_vaccinations = Vaccination.query.filter(
-            Vaccination.status == 'scheduled',
-            Vaccination.scheduled_date < date.today()
-        ).order_by(Vaccination.scheduled_date).all()
+        # Served from the materialized vaccination_due table; ?status=overdue,due,upcoming
+        statuses = [s.strip() for s in request.args.get('status', 'overdue,due').split(',') if s.strip()]
+        limit = min(int(request.args.get('limit', 500)), 5000)
+
+        conn = DataManager.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            SELECT status, COUNT(*)
+            FROM vaccination_due
+            GROUP BY status
+        ''')
+        counts = dict(cursor.fetchall())
+
+        placeholders = ','.join('?' * len(statuses))
+        cursor.execute(f'''
+            SELECT vd.baby_id, b.name, b.unique_id, vd.schedule_id, vd.vaccine_name,
+                   vd.age_months, vd.due_date, vd.status
+            FROM vaccination_due vd
+            JOIN babies b ON vd.baby_id = b.id
+            WHERE vd.status IN ({placeholders})
+            ORDER BY vd.due_date
+            LIMIT ?
+        ''', statuses + [limit])
+        rows = cursor.fetchall()
+        conn.close()
 
         vaccination_data = []
-        for vaccination in upcoming_vaccinations + overdue_vaccinations:
-            vaccination_dict = vaccination.to_dict()
-            baby = Baby.query.get(vaccination.baby_id)
-            vaccination_dict['baby_name'] = baby.name if baby else 'Unknown'
-            vaccination_dict['is_overdue'] = vaccination.scheduled_date < date.today()
-            vaccination_data.append(vaccination_dict)
+        for row in rows:
+            vaccination_data.append({
+                'baby_id': row[0],
+                'baby_name': row[1] or 'Unknown',
+                'baby_unique_id': row[2],
+                'schedule_id': row[3],
+                'vaccine_name': row[4],
+                'age_months': row[5],
+                'due_date': row[6],
+                'status': row[7],
+                'is_overdue': row[7] == 'overdue'
+            })
 
         return jsonify({
             'success': True,
             'vaccinations': vaccination_data,
-            'upcoming_count': len(upcoming_vaccinations),
-            'overdue_count': len(overdue_vaccinations)
+            'overdue_count': counts.get('overdue', 0),
+            'due_count': counts.get('due', 0),
+            'upcoming_count': counts.get('upcoming', 0),
+            'completed_count': counts.get('completed', 0)
         })
 
     except Exception as e:
@@ -1360,47 +1316,13 @@ def appointments_api():
     """Get baby care appointments or create new appointment"""
     if request.method == 'GET':
         try:
-            from app.data_manager import DataManager
-
             user_id = session['user_id']
 
             # Get all baby care appointments for the current user
-            conn = DataManager.get_connection()
-            cursor = conn.cursor()
-
-            cursor.execute('''
-                SELECT a.id, a.user_id, a.baby_id, a.appointment_type, a.appointment_date,
-                       a.doctor_name, a.clinic_name, a.purpose, a.status, a.notes,
-                       a.created_at, b.name as baby_name, u.full_name as doctor_full_name,
-                       u.email as doctor_email
-                FROM appointments a
-                LEFT JOIN babies b ON a.baby_id = b.id
-                LEFT JOIN users u ON a.doctor_id = u.id
-                WHERE a.user_id = ? AND a.appointment_type LIKE '%Baby Care%'
-                ORDER BY a.appointment_date DESC
-            ''', (user_id,))
-
-            appointments = cursor.fetchall()
-            conn.close()
-
-            appointments_data = []
-            for appointment in appointments:
-                appointments_data.append({
-                    'id': appointment[0],
-                    'user_id': appointment[1],
-                    'baby_id': appointment[2],
-                    'appointment_type': appointment[3],
-                    'appointment_date': appointment[4],
-                    'doctor_name': appointment[5],
-                    'clinic_name': appointment[6],
-                    'purpose': appointment[7],
-                    'status': appointment[8],
-                    'notes': appointment[9],
-                    'created_at': appointment[10],
-                    'baby_name': appointment[11],
-                    'doctor_full_name': appointment[12],
-                    'doctor_email': appointment[13]
-                })
+            appointments_data = [
+                appointment_service.project(appointment, appointment_service.PATIENT_FIELDS)
+                for appointment in appointment_service.list_for_patient(user_id, baby_care_only=True)
+            ]
 
             return jsonify({
                 'success': True,
@@ -1431,7 +1353,7 @@ def appointments_api():
 
             # Parse appointment date
             try:
-                appointment_date = datetime.fromisoformat(data['appointment_date'].replace('Z', '+00:00'))
+                appointment_date = parse_appointment_datetime(data['appointment_date'])
             except ValueError:
                 return jsonify({
                     'success': False,
@@ -1446,45 +1368,30 @@ def appointments_api():
                     'error': 'User not found'
                 }), 404
 
-            # Find doctor by name
-            doctor_id = None
-            doctor_email = None
-            if data.get('doctor_name'):
-                users = DataManager.get_all_users()
-                doctor = next((u for u in users if u.get('full_name') == data['doctor_name'] and u.get('role') == 'doctor'), None)
-                if doctor:
-                    doctor_id = doctor['id']
-                    doctor_email = doctor['email']
+            # Every booking must be linked to a doctor account, or no doctor would see it
+            doctor = DataManager.get_doctor_by_name(data['doctor_name'])
+            if not doctor or not doctor['is_active']:
+                return jsonify({
+                    'success': False,
+                    'error': 'Doctor not found. Please choose a doctor from the list.'
+                }), 400
+            doctor_id = doctor['id']
+            doctor_email = doctor['email']
 
             # Create new baby care appointment
-            conn = DataManager.get_connection()
-            cursor = conn.cursor()
-
-            cursor.execute('''
-                INSERT INTO appointments (user_id, baby_id, doctor_id, appointment_type, appointment_date,
-                                        doctor_name, clinic_name, purpose, status, patient_name, patient_email,
-                                        child_name, created_at, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                user_id,
-                data.get('baby_id'),
-                doctor_id,
-                data.get('appointment_type', 'Baby Care Checkup'),
-                appointment_date.isoformat(),
-                data['doctor_name'],
-                data.get('clinic_name', 'Baby Care Clinic'),
-                data.get('purpose', ''),
-                'pending',
-                data.get('patient_name', user_data['full_name']),
-                user_data['email'],
-                data.get('child_name', 'Child'),
-                datetime.now().isoformat(),
-                datetime.now().isoformat()
-            ))
-
-            appointment_id = cursor.lastrowid
-            conn.commit()
-            conn.close()
+            try:
+                appointment_id = appointment_service.create(user_id, doctor_id, appointment_date, {
+                    'baby_id': data.get('baby_id'),
+                    'appointment_type': data.get('appointment_type', 'Baby Care Checkup'),
+                    'doctor_name': data['doctor_name'],
+                    'clinic_name': data.get('clinic_name', 'Baby Care Clinic'),
+                    'purpose': data.get('purpose', ''),
+                    'patient_name': data.get('patient_name', user_data['full_name']),
+                    'patient_email': user_data['email'],
+                    'child_name': data.get('child_name', 'Child')
+                })
+            except SlotConflictError as e:
+                return jsonify(appointment_service.conflict_error(e)), 409
 
             # Send immediate booking notification to patient and doctor
             email_results = {
@@ -1545,42 +1452,119 @@ def get_growth_records(baby_id):
         if error:
             return jsonify({'success': False, 'error': error}), 403 if 'denied' in error else 404
         
+        from app.services import downsampling
+
+        # ?points=N downsamples each series for charts
+        points = request.args.get('points', type=int)
+        if points is not None and points < downsampling.MIN_POINTS:
+            return jsonify({'success': False, 'error': f'points must be at least {downsampling.MIN_POINTS}'}), 400
+
         conn = DataManager.get_connection()
+        conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT id, baby_id, record_date, age_months, weight, height, head_circumference, notes, created_at
+
+        query = f'''
+            SELECT {GROWTH_RECORD_COLUMNS}
             FROM growth_records
             WHERE baby_id = ?
             ORDER BY record_date DESC
-        ''', (baby_id,))
-        
+        '''
+        cursor.execute(query, (baby_id,))
         rows = cursor.fetchall()
         conn.close()
-        
-        records = []
-        for row in rows:
-            records.append({
-                'id': row[0],
-                'baby_id': row[1],
-                'date': row[2],
-                'age_months': row[3],
-                'weight': row[4],
-                'height': row[5],
-                'head': row[6],
-                'notes': row[7],
-                'created_at': row[8]
-            })
+
+        records = [growth_record_to_dict(row) for row in rows]
+        total_count = len(records)
+        if points:
+            records = downsampling.downsample(records, lambda r: downsampling.day_number(r['date']),
+                                              ['weight', 'height', 'head'], points)
         
         return jsonify({
             'success': True,
             'records': records,
+            'total_count': total_count,
             'baby_name': baby['name']
         })
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+# Per-baby CSV exports: dataset -> (query, header, row -> cells)
+BABY_CSV_EXPORTS = {
+    'growth-records': (
+        '''
+            SELECT record_date, age_months, age_days, weight, height, head_circumference,
+                   weight_z, height_z, head_z, weight_velocity, height_velocity, head_velocity, notes
+            FROM growth_records
+            WHERE baby_id = ?
+            ORDER BY record_date ASC, id ASC
+        ''',
+        ['Date', 'Age (months)', 'Age (days)', 'Weight (kg)', 'Height (cm)', 'Head Circumference (cm)',
+         'Weight-for-age Z', 'Length-for-age Z', 'Head-for-age Z',
+         'Weight Velocity (kg/month)', 'Height Velocity (cm/month)', 'Head Velocity (cm/month)', 'Notes'],
+        lambda row: [
+            row['record_date'], _cell(row['age_months']), _cell(row['age_days']), _cell(row['weight']), _cell(row['height']),
+            _cell(row['head_circumference']), _cell(row['weight_z'], 2), _cell(row['height_z'], 2),
+            _cell(row['head_z'], 2), _cell(row['weight_velocity']), _cell(row['height_velocity']),
+            _cell(row['head_velocity']), row['notes'] or ''
+        ]
+    ),
+    'vaccinations': (
+        '''
+            SELECT vaccine_name, scheduled_date, administered_date, status, doctor_name, clinic_name, notes
+            FROM vaccinations
+            WHERE baby_id = ?
+            ORDER BY scheduled_date ASC, id ASC
+        ''',
+        ['Vaccine', 'Scheduled Date', 'Administered Date', 'Status', 'Doctor', 'Clinic', 'Notes'],
+        lambda row: [
+            row['vaccine_name'], row['scheduled_date'], row['administered_date'] or '', row['status'] or '',
+            row['doctor_name'] or '', row['clinic_name'] or '', row['notes'] or ''
+        ]
+    ),
+    'nutrition': (
+        '''
+            SELECT record_date, feeding_type, amount, frequency, notes
+            FROM nutrition_records
+            WHERE baby_id = ?
+            ORDER BY record_date ASC, id ASC
+        ''',
+        ['Date', 'Feeding Type', 'Amount', 'Frequency (per day)', 'Notes'],
+        lambda row: [
+            row['record_date'], row['feeding_type'], _cell(row['amount']), _cell(row['frequency']),
+            row['notes'] or ''
+        ]
+    )
+}
+
+def _cell(value, digits=None):
+    if value is None:
+        return ''
+    return round(value, digits) if digits is not None else value
+
+@babycare_bp.route('/api/babies/<int:baby_id>/<any("growth-records", vaccinations, nutrition):dataset>/export-csv')
+@login_required
+def export_baby_csv(baby_id, dataset):
+    """Export a baby's growth records, vaccinations or nutrition log as CSV, streamed as rows are read"""
+    try:
+        user_id = session['user_id']
+
+        baby, error = validate_baby_access(baby_id, user_id)
+        if error:
+            return jsonify({'success': False, 'error': error}), 403 if 'denied' in error else 404
+
+        query, header, to_values = BABY_CSV_EXPORTS[dataset]
+        rows = stream_csv(DataManager.get_connection, query, (baby_id,), header, to_values)
+
+        name = ''.join(c if c.isalnum() else '_' for c in baby['name']).strip('_') or 'baby'
+        response = Response(stream_with_context(rows), mimetype='text/csv')
+        response.headers['Content-Disposition'] = \
+            f'attachment; filename={name}_{dataset.replace("-", "_")}_{datetime.now().strftime("%Y%m%d")}.csv'
+        return response
+
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @babycare_bp.route('/api/growth-records/<int:baby_id>', methods=['POST'])
 @login_required
 def add_growth_record(baby_id):
@@ -1598,10 +1582,8 @@ def add_growth_record(baby_id):
         if not data.get('date'):
             return jsonify({'success': False, 'error': 'Date is required'}), 400
         
-        # Calculate age in months from baby's date of birth
-        baby_dob = datetime.strptime(baby['date_of_birth'], '%Y-%m-%d')
-        record_date = datetime.strptime(data['date'], '%Y-%m-%d')
-        age_months = (record_date.year - baby_dob.year) * 12 + (record_date.month - baby_dob.month)
+        # Age is derived from the baby's birth date in SQL by refresh_baby
+        datetime.strptime(data['date'], '%Y-%m-%d')
         
         # Ensure at least one measurement is provided
         weight = float(data['weight']) if data.get('weight') else None
@@ -1611,39 +1593,33 @@ def add_growth_record(baby_id):
         if not any([weight, height, head]):
             return jsonify({'success': False, 'error': 'At least one measurement is required'}), 400
         
+        from app.services import growth_trends
+
         conn = DataManager.get_connection()
+        conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO growth_records 
-            (baby_id, record_date, age_months, weight, height, head_circumference, notes)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (baby_id, data['date'], age_months, weight, height, head, data.get('notes', '')))
-        
-        record_id = cursor.lastrowid
-        conn.commit()
+
+        try:
+            cursor.execute('''
+                INSERT INTO growth_records 
+                (baby_id, record_date, weight, height, head_circumference, notes)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (baby_id, data['date'], weight, height, head, data.get('notes', '')))
+            record_id = cursor.lastrowid
+
+            # Metrics of this record and every later one depend on it
+            growth_trends.refresh_baby(conn, baby_id, data['date'])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            conn.close()
+            raise
         
         # Get the inserted record
-        cursor.execute('''
-            SELECT id, baby_id, record_date, age_months, weight, height, head_circumference, notes, created_at
-            FROM growth_records WHERE id = ?
-        ''', (record_id,))
-        
-        row = cursor.fetchone()
+        cursor.execute(f'SELECT {GROWTH_RECORD_COLUMNS} FROM growth_records WHERE id = ?', (record_id,))
+        record = growth_record_to_dict(cursor.fetchone())
         conn.close()
         
-        record = {
-            'id': row[0],
-            'baby_id': row[1],
-            'date': row[2],
-            'age_months': row[3],
-            'weight': row[4],
-            'height': row[5],
-            'head': row[6],
-            'notes': row[7],
-            'created_at': row[8]
-        }
-        
         return jsonify({
             'success': True,
             'message': 'Growth record added successfully',
@@ -1668,12 +1644,16 @@ def update_growth_record(baby_id, record_id):
         if error:
             return jsonify({'success': False, 'error': error}), 403 if 'denied' in error else 404
         
+        from app.services import growth_trends
+
         conn = DataManager.get_connection()
+        conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
         # Check if record exists and belongs to this baby
-        cursor.execute('SELECT * FROM growth_records WHERE id = ? AND baby_id = ?', (record_id, baby_id))
-        if not cursor.fetchone():
+        cursor.execute('SELECT record_date FROM growth_records WHERE id = ? AND baby_id = ?', (record_id, baby_id))
+        existing = cursor.fetchone()
+        if not existing:
             conn.close()
             return jsonify({'success': False, 'error': 'Growth record not found'}), 404
         
@@ -1682,15 +1662,10 @@ def update_growth_record(baby_id, record_id):
         update_values = []
         
         if 'date' in data:
+            # Age is recomputed from the new date by refresh_baby
+            datetime.strptime(data['date'], '%Y-%m-%d')
             update_fields.append('record_date = ?')
             update_values.append(data['date'])
-            
-            # Recalculate age
-            baby_dob = datetime.strptime(baby['date_of_birth'], '%Y-%m-%d')
-            record_date = datetime.strptime(data['date'], '%Y-%m-%d')
-            age_months = (record_date.year - baby_dob.year) * 12 + (record_date.month - baby_dob.month)
-            update_fields.append('age_months = ?')
-            update_values.append(age_months)
         
         if 'weight' in data:
             update_fields.append('weight = ?')
@@ -1713,36 +1688,28 @@ def update_growth_record(baby_id, record_id):
             return jsonify({'success': False, 'error': 'No fields to update'}), 400
         
         update_values.extend([record_id, baby_id])
-        
-        cursor.execute(f'''
-            UPDATE growth_records 
-            SET {', '.join(update_fields)}
-            WHERE id = ? AND baby_id = ?
-        ''', update_values)
-        
-        conn.commit()
+
+        try:
+            cursor.execute(f'''
+                UPDATE growth_records 
+                SET {', '.join(update_fields)}
+                WHERE id = ? AND baby_id = ?
+            ''', update_values)
+
+            # A moved record affects everything after its old and new dates
+            from_date = min(existing['record_date'], data.get('date') or existing['record_date'])
+            growth_trends.refresh_baby(conn, baby_id, from_date)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            conn.close()
+            raise
         
         # Get updated record
-        cursor.execute('''
-            SELECT id, baby_id, record_date, age_months, weight, height, head_circumference, notes, created_at
-            FROM growth_records WHERE id = ?
-        ''', (record_id,))
-        
-        row = cursor.fetchone()
+        cursor.execute(f'SELECT {GROWTH_RECORD_COLUMNS} FROM growth_records WHERE id = ?', (record_id,))
+        record = growth_record_to_dict(cursor.fetchone())
         conn.close()
         
-        record = {
-            'id': row[0],
-            'baby_id': row[1],
-            'date': row[2],
-            'age_months': row[3],
-            'weight': row[4],
-            'height': row[5],
-            'head': row[6],
-            'notes': row[7],
-            'created_at': row[8]
-        }
-        
         return jsonify({
             'success': True,
             'message': 'Growth record updated successfully',
@@ -1766,14 +1733,27 @@ def delete_growth_record(baby_id, record_id):
         if error:
             return jsonify({'success': False, 'error': error}), 403 if 'denied' in error else 404
         
+        from app.services import growth_trends
+
         conn = DataManager.get_connection()
         cursor = conn.cursor()
-        
-        cursor.execute('DELETE FROM growth_records WHERE id = ? AND baby_id = ?', (record_id, baby_id))
-        deleted = cursor.rowcount > 0
-        
-        conn.commit()
-        conn.close()
+
+        try:
+            cursor.execute('SELECT record_date FROM growth_records WHERE id = ? AND baby_id = ?', (record_id, baby_id))
+            existing = cursor.fetchone()
+
+            cursor.execute('DELETE FROM growth_records WHERE id = ? AND baby_id = ?', (record_id, baby_id))
+            deleted = cursor.rowcount > 0
+
+            # Later records now follow the one before the deleted record
+            if deleted:
+                growth_trends.refresh_baby(conn, baby_id, existing[0])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
         
         if deleted:
             return jsonify({
@@ -1,6 +1,9 @@
-from flask import Blueprint, render_template, request, jsonify, session, redirect, url_for
+from flask import Blueprint, render_template, request, jsonify, session, redirect, url_for, Response, stream_with_context
 from datetime import datetime, date, timedelta
 from app.data_manager import DataManager
+from app.utils.helpers import parse_appointment_datetime
+from app.services.availability import availability
+from app.services import appointments as appointment_service
 import json
 import sqlite3
 import os
@@ -32,42 +35,16 @@ def doctor_required(f):
 def dashboard():
     """Doctor dashboard with real-time data"""
     try:
+        from app.services.doctor_stats import doctor_stats
+
         # Get current user info for the dashboard
         user = DataManager.get_user_by_id(session['user_id'])
-
-        # Get basic statistics for initial load
-        users = DataManager.get_all_users()
-
-        # Calculate patient statistics
-        patients = [u for u in users if u.get('role') == 'user']
-        total_patients = len(patients)
-
-        # Get recent patients (last 5)
-        recent_patients = patients[-5:] if patients else []
-
-        # Calculate basic stats
-        stats = {
-            'patients': {
-                'total': total_patients,
-                'new_this_month': max(1, total_patients // 10),
-                'active': max(1, total_patients - 2)
-            },
-            'appointments': {
-                'today': 5,
-                'this_week': 23,
-                'pending': 8
-            },
-            'consultations': {
-                'today': 3,
-                'this_week': 18,
-                'total': 156
-            }
-        }
+        dashboard_data = doctor_stats.get(session['user_id'])
 
         return render_template('doctor/dashboard.html',
                              user=user,
-                             initial_stats=stats,
-                             recent_patients=recent_patients)
+                             initial_stats=dashboard_data['stats'],
+                             recent_patients=dashboard_data['recent_patients'])
     except Exception as e:
         print(f"Doctor dashboard error: {e}")
         return render_template('doctor/dashboard.html',
@@ -121,65 +98,22 @@ def generate_id():
 def dashboard_stats():
     """Get doctor dashboard statistics"""
     try:
-        # Get all users and babies for statistics
-        users = DataManager.get_all_users()
-
-        # Calculate patient statistics
-        total_patients = len([u for u in users if u.get('role') == 'user'])
+        from app.services.doctor_stats import doctor_stats
 
-        # Get today's date for filtering
-        today = datetime.now().date()
-
-        # Enhanced statistics with more realistic data
-        stats = {
-            'patients': {
-                'total': total_patients,
-                'new_this_month': max(1, total_patients // 10),
-                'active': max(1, total_patients - 2),
-                'pregnant': max(1, total_patients // 3),
-                'postpartum': max(1, total_patients // 4)
-            },
-            'appointments': {
-                'today': 5,
-                'this_week': 23,
-                'pending': 8,
-                'completed': 15,
-                'cancelled': 2,
-                'upcoming': 12
-            },
-            'consultations': {
-                'today': 3,
-                'this_week': 18,
-                'total': 156,
-                'emergency': 2,
-                'routine': 16
-            },
-            'reports': {
-                'pending': 4,
-                'completed_today': 7,
-                'total_this_month': 45,
-                'urgent': 1
-            },
-            'health_metrics': {
-                'high_risk_pregnancies': max(1, total_patients // 8),
-                'due_this_month': max(1, total_patients // 12),
-                'overdue_checkups': max(1, total_patients // 15)
-            }
-        }
-
-        # Get recent patients for activity feed
-        recent_patients = [u for u in users if u.get('role') == 'user'][-5:]
+        dashboard_data = doctor_stats.get(session['user_id'])
+        stats = dashboard_data['stats']
 
         recent_activity = {
-            'recent_patients': recent_patients,
-            'summary': f"Managing {total_patients} patients with {stats['appointments']['pending']} pending appointments"
+            'recent_patients': dashboard_data['recent_patients'],
+            'summary': f"Managing {stats['patients']['total']} patients with "
+                       f"{stats['appointments']['pending']} pending appointments"
         }
 
         return jsonify({
             'success': True,
             'stats': stats,
             'recent_activity': recent_activity,
-            'last_updated': datetime.now().isoformat()
+            'last_updated': dashboard_data['computed_at']
         })
 
     except Exception as e:
@@ -188,7 +122,32 @@ def dashboard_stats():
             'error': str(e)
         }), 500
 
+@doctor_bp.route('/api/worklist')
+@doctor_required
+def get_worklist():
+    """
+    The doctor's most urgent work: pending requests, overdue follow-ups and
+    completed visits awaiting a report, ordered by WORKLIST_PRIORITY
+    """
+    try:
+        from app.services.worklist import worklist
 
+        limit = min(max(request.args.get('limit', 20, type=int), 1), 200)
+        items = worklist.top(session['user_id'], limit)
+
+        return jsonify({
+            'success': True,
+            'items': items,
+            'count': len(items),
+            'total': worklist.size(session['user_id']),
+            'priority': worklist.priority
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
 
 @doctor_bp.route('/api/recent-activity')
 @doctor_required
@@ -256,74 +215,16 @@ def get_appointments():
                 'error': 'Doctor not found'
             }), 404
 
-        doctor_name = doctor_user['full_name']
-
-        # Get all appointments for this doctor using DataManager
-        conn = DataManager.get_connection()
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-
-        # Simple, working query
-        cursor.execute('''
-            SELECT a.id, a.user_id, a.baby_id, a.appointment_type, a.appointment_date,
-                   a.doctor_name, a.clinic_name, a.purpose, a.status, a.notes,
-                   a.created_at, u.full_name as patient_name, u.email as patient_email,
-                   u.phone as patient_phone, b.name as baby_name
-            FROM appointments a
-            JOIN users u ON a.user_id = u.id
-            LEFT JOIN babies b ON a.baby_id = b.id
-            WHERE (a.doctor_id = ? OR a.doctor_name = ?)
-            ORDER BY a.appointment_date ASC, a.created_at DESC
-        ''', (doctor_id, doctor_name))
-
-        filtered_appointments = cursor.fetchall()
-        appointments = []
-
-        for row in filtered_appointments:
-            try:
-                # Convert Row object to dictionary
-                appointment = {key: row[key] for key in row.keys()}
-
-                # Handle appointment date parsing
-                appointment_date_str = appointment.get('appointment_date', '')
-                if appointment_date_str:
-                    try:
-                        if 'T' in appointment_date_str:
-                            appointment_datetime = datetime.fromisoformat(appointment_date_str.replace('Z', '+00:00'))
-                        else:
-                            appointment_datetime = datetime.strptime(appointment_date_str, '%Y-%m-%d %H:%M:%S')
-
-                        appointment['appointment_time'] = appointment_datetime.strftime('%I:%M %p')
-                        appointment['appointment_date'] = appointment_datetime.strftime('%Y-%m-%d')
-                        appointment['formatted_date'] = appointment_datetime.strftime('%B %d, %Y')
-                    except (ValueError, TypeError):
-                        appointment['appointment_time'] = 'Not specified'
-                        appointment['appointment_date'] = appointment_date_str
-                        appointment['formatted_date'] = appointment_date_str
-                else:
-                    appointment['appointment_time'] = 'Not specified'
-                    appointment['appointment_date'] = 'Not specified'
-                    appointment['formatted_date'] = 'Not specified'
-
-                # Add patient contact info
-                appointment['patient_contact'] = {
-                    'email': appointment.get('patient_email', ''),
-                    'phone': appointment.get('patient_phone', '')
-                }
-
-                appointments.append(appointment)
-
-            except Exception as row_error:
-                # Skip this row if there's an error processing it
-                continue
-
-        conn.close()
+        appointments = [
+            appointment_service.schedule_item(appointment)
+            for appointment in appointment_service.list_for_doctor(doctor_id)
+        ]
 
         return jsonify({
             'success': True,
             'appointments': appointments,
             'total_count': len(appointments),
-            'doctor_name': doctor_name
+            'doctor_name': doctor_user['full_name']
         })
 
     except Exception as e:
@@ -340,76 +241,24 @@ def confirm_appointment(appointment_id):
     try:
         user_id = session['user_id']
 
-        # Get appointment details
-        conn = DataManager.get_connection()
-        conn.row_factory = sqlite3.Row  # Enable row factory
-        cursor = conn.cursor()
-
-        cursor.execute('''
-            SELECT a.*, u.email as patient_email, u.full_name as patient_name
-            FROM appointments a
-            JOIN users u ON a.user_id = u.id
-            WHERE a.id = ? AND (a.doctor_id = ? OR a.doctor_name = (SELECT full_name FROM users WHERE id = ?))
-        ''', (appointment_id, user_id, user_id))
-
-        appointment = cursor.fetchone()
-
+        appointment = appointment_service.get_for_doctor(appointment_id, user_id)
         if not appointment:
-            conn.close()
             return jsonify({
                 'success': False,
                 'error': 'Appointment not found or access denied'
             }), 404
 
-        # Update appointment status
-        cursor.execute('''
-            UPDATE appointments
-            SET status = 'confirmed', confirmed_by_doctor = 1, updated_at = ?
-            WHERE id = ?
-        ''', (datetime.now().isoformat(), appointment_id))
-
-        conn.commit()
-        conn.close()
+        appointment_service.confirm(appointment_id, doctor_id=user_id)
 
         # Send confirmation email to patient
         try:
             from app.services.email_service import email_service
 
             doctor_user = DataManager.get_user_by_id(user_id)
-
-            # Parse appointment date
-            appointment_date = appointment[5]  # appointment_date
-            if appointment_date:
-                try:
-                    if 'T' in appointment_date:
-                        parsed_date = datetime.fromisoformat(appointment_date.replace('Z', '+00:00'))
-                    else:
-                        parsed_date = datetime.strptime(appointment_date, '%Y-%m-%d %H:%M:%S')
-
-                    formatted_date = parsed_date.strftime('%Y-%m-%d')
-                    formatted_time = parsed_date.strftime('%H:%M')
-                except:
-                    formatted_date = appointment_date
-                    formatted_time = 'TBD'
-            else:
-                formatted_date = 'TBD'
-                formatted_time = 'TBD'
-
-            appointment_details = {
-                'appointment_id': appointment_id,
-                'patient_name': appointment[10] or appointment[11],  # patient_name from join
-                'child_name': appointment[12] if appointment[12] else 'N/A',  # child_name
-                'doctor_name': doctor_user['full_name'],
-                'appointment_date': formatted_date,
-                'appointment_time': formatted_time,
-                'purpose': appointment[8] or 'General consultation',  # purpose
-                'clinic_name': appointment[7] or 'Medical Clinic'  # clinic_name
-            }
-
             email_result = email_service.send_appointment_confirmation_emails(
-                appointment[16],  # patient_email from join
-                doctor_user['email'],  # doctor_email
-                appointment_details
+                appointment['patient_email'],
+                doctor_user['email'],
+                appointment_service.email_details(appointment, doctor_user['full_name'])
             )
 
             return jsonify({
@@ -442,175 +291,30 @@ def cancel_appointment(appointment_id):
         user_id = session['user_id']
         data = request.get_json() or {}
 
-        # Get appointment details
-        conn = DataManager.get_connection()
-        conn.row_factory = sqlite3.Row  # Enable row factory
-        cursor = conn.cursor()
-
-        cursor.execute('''
-            SELECT a.*, u.email as patient_email, u.full_name as patient_name
-            FROM appointments a
-            JOIN users u ON a.user_id = u.id
-            WHERE a.id = ? AND (a.doctor_id = ? OR a.doctor_name = (SELECT full_name FROM users WHERE id = ?))
-        ''', (appointment_id, user_id, user_id))
-
-        appointment = cursor.fetchone()
-
+        appointment = appointment_service.get_for_doctor(appointment_id, user_id)
         if not appointment:
-            conn.close()
             return jsonify({
                 'success': False,
                 'error': 'Appointment not found or access denied'
             }), 404
 
-        # Update appointment status
         cancellation_reason = data.get('reason', 'Cancelled by doctor')
-        cursor.execute('''
-            UPDATE appointments
-            SET status = 'cancelled', notes = ?, updated_at = ?
-            WHERE id = ?
-        ''', (
-            f"Cancelled: {cancellation_reason}",
-            datetime.now().isoformat(),
-            appointment_id
-        ))
-
-        conn.commit()
-        conn.close()
+        appointment_service.cancel(appointment_id, f"Cancelled: {cancellation_reason}", doctor_id=user_id)
 
         # Send cancellation email to patient
         try:
             from app.services.email_service import email_service
 
             doctor_user = DataManager.get_user_by_id(user_id)
-            patient_name = appointment[17] or appointment[16] or 'Patient'  # patient_name or email
-            doctor_name = doctor_user['full_name']
-            appointment_date = appointment[5]
-            appointment_type = appointment[4]
-            clinic_name = appointment[7] or 'Medical Clinic'
-
-            subject = f"❌ Appointment Cancelled - {clinic_name}"
-            
-            # Text version
-            text_content = f"""
-Dear {patient_name},
-
-We regret to inform you that your appointment has been CANCELLED by the doctor.
-
-📅 CANCELLED APPOINTMENT DETAILS:
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-👨‍⚕️ Doctor: {doctor_name}
-📅 Date: {appointment_date}
-📋 Type: {appointment_type}
-📝 Reason: {cancellation_reason}
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-
-We sincerely apologize for any inconvenience this may cause.
-
-📞 NEXT STEPS:
-• Please contact us to reschedule at your earliest convenience
-• We will do our best to accommodate your preferred time
-• Our team is available to answer any questions
-
-We appreciate your understanding and look forward to serving you soon.
-
-Best regards,
-{clinic_name} Team
-
----
-Maternal and Child Health Care System
-This is an automated notification. Please do not reply to this email.
-            """
-            
-            # HTML version
-            html_content = f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <style>
-        body {{ font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; margin: 0; padding: 0; background-color: #f8f9fa; }}
-        .container {{ max-width: 600px; margin: 0 auto; background-color: white; border-radius: 10px; overflow: hidden; box-shadow: 0 4px 6px rgba(0,0,0,0.1); }}
-        .header {{ background: linear-gradient(135deg, #dc3545 0%, #c82333 100%); color: white; padding: 2rem; text-align: center; }}
-        .content {{ padding: 2rem; }}
-        .cancelled-box {{ background: #f8d7da; border-left: 4px solid #dc3545; padding: 1.5rem; margin: 1rem 0; border-radius: 5px; }}
-        .info-box {{ background: #fff3cd; border-left: 4px solid #ffc107; padding: 1.5rem; margin: 1rem 0; border-radius: 5px; }}
-        .info-row {{ display: flex; margin: 0.5rem 0; }}
-        .info-label {{ font-weight: bold; min-width: 120px; color: #495057; }}
-        .next-steps {{ background: #d1ecf1; border-left: 4px solid #0dcaf0; padding: 1rem; margin: 1rem 0; border-radius: 5px; }}
-        .footer {{ background: #f8f9fa; padding: 1rem; text-align: center; color: #6c757d; font-size: 0.9rem; }}
-        .apology {{ background: #fff; border: 2px solid #dc3545; padding: 1rem; border-radius: 5px; margin: 1rem 0; text-align: center; }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>❌ Appointment Cancelled</h1>
-            <p>Important Update About Your Appointment</p>
-        </div>
-        
-        <div class="content">
-            <h2>Dear {patient_name},</h2>
-            
-            <div class="apology">
-                <p style="margin: 0; font-size: 1.1rem; color: #dc3545;"><strong>We regret to inform you that your appointment has been cancelled by the doctor.</strong></p>
-            </div>
-            
-            <div class="cancelled-box">
-                <h3 style="margin-top: 0; color: #dc3545;">📅 Cancelled Appointment Details</h3>
-                <div class="info-row">
-                    <span class="info-label">👨‍⚕️ Doctor:</span>
-                    <span>{doctor_name}</span>
-                </div>
-                <div class="info-row">
-                    <span class="info-label">📅 Date:</span>
-                    <span>{appointment_date}</span>
-                </div>
-                <div class="info-row">
-                    <span class="info-label">📋 Type:</span>
-                    <span>{appointment_type}</span>
-                </div>
-                <div class="info-row">
-                    <span class="info-label">📝 Reason:</span>
-                    <span>{cancellation_reason}</span>
-                </div>
-            </div>
-            
-            <div class="next-steps">
-                <h3 style="margin-top: 0;">📞 Next Steps</h3>
-                <ul style="margin: 0.5rem 0; padding-left: 1.5rem;">
-                    <li>Please contact us to reschedule at your earliest convenience</li>
-                    <li>We will do our best to accommodate your preferred time</li>
-                    <li>Our team is available to answer any questions</li>
-                </ul>
-            </div>
-            
-            <div class="info-box">
-                <p style="margin: 0;"><strong>⚠️ We sincerely apologize for any inconvenience this may cause.</strong></p>
-                <p style="margin: 0.5rem 0 0 0;">We appreciate your understanding and look forward to serving you soon.</p>
-            </div>
-            
-            <p style="text-align: center; margin-top: 2rem;">
-                <strong>Best regards,</strong><br>
-                {clinic_name} Team
-            </p>
-        </div>
-        
-        <div class="footer">
-            <p><strong>Maternal and Child Health Care System</strong></p>
-            <p>© 2025 Healthcare Appointment Management</p>
-            <p style="font-size: 0.8rem; color: #999;">This is an automated notification. Please do not reply to this email.</p>
-        </div>
-    </div>
-</body>
-</html>
-            """
-
-            email_sent = email_service.send_email(
-                appointment[16],  # patient_email
-                subject,
-                html_content,
-                text_content
+            email_sent = email_service.send_template(
+                appointment['patient_email'],
+                'appointment_cancelled',
+                patient_name=appointment['patient_name'] or 'Patient',
+                doctor_name=doctor_user['full_name'],
+                appointment_date=appointment['appointment_date'],
+                appointment_type=appointment['appointment_type'],
+                cancellation_reason=cancellation_reason,
+                clinic_name=appointment['clinic_name'] or 'Medical Clinic'
             )
 
             return jsonify({
@@ -643,74 +347,26 @@ def complete_appointment(appointment_id):
         user_id = session['user_id']
         data = request.get_json() or {}
 
-        # Get appointment details
-        conn = DataManager.get_connection()
-        conn.row_factory = sqlite3.Row  # Enable row factory
-        cursor = conn.cursor()
-
-        cursor.execute('''
-            SELECT a.*, u.email as patient_email, u.full_name as patient_name
-            FROM appointments a
-            JOIN users u ON a.user_id = u.id
-            WHERE a.id = ? AND (a.doctor_id = ? OR a.doctor_name = (SELECT full_name FROM users WHERE id = ?))
-        ''', (appointment_id, user_id, user_id))
-
-        appointment = cursor.fetchone()
-
+        appointment = appointment_service.get_for_doctor(appointment_id, user_id)
         if not appointment:
-            conn.close()
             return jsonify({
                 'success': False,
                 'error': 'Appointment not found or access denied'
             }), 404
 
-        # Update appointment status
         completion_notes = data.get('notes', 'Appointment completed')
-        cursor.execute('''
-            UPDATE appointments
-            SET status = 'completed', notes = ?, completed_at = ?, updated_at = ?
-            WHERE id = ?
-        ''', (
-            completion_notes,
-            datetime.now().isoformat(),
-            datetime.now().isoformat(),
-            appointment_id
-        ))
-
-        conn.commit()
-        conn.close()
+        appointment_service.complete(appointment_id, completion_notes, doctor_id=user_id)
 
         # Send completion email to patient
         try:
             from app.services.email_service import email_service
 
             doctor_user = DataManager.get_user_by_id(user_id)
-
-            # Convert Row object to dictionary for easier access
-            appointment_dict = dict(appointment)
-
-            subject = f"Appointment Completed - {appointment_dict.get('clinic_name') or 'Medical Clinic'}"
-            message = f"""
-Dear {appointment_dict.get('patient_name') or 'Patient'},
-
-Your appointment has been successfully completed.
-
-📅 COMPLETED APPOINTMENT DETAILS:
-• Doctor: {doctor_user['full_name']}
-• Date: {appointment_dict.get('appointment_date')}
-• Type: {appointment_dict.get('appointment_type')}
-• Notes: {completion_notes}
-
-Thank you for choosing our medical services. If you have any questions or need follow-up care, please don't hesitate to contact us.
-
-Best regards,
-{appointment_dict.get('clinic_name') or 'Medical Clinic'} Team
-            """
-
-            email_sent = email_service.send_email(
-                appointment_dict.get('patient_email'),
-                subject,
-                message
+            email_sent = email_service.send_template(
+                appointment['patient_email'],
+                'appointment_completed',
+                details=appointment_service.email_details(appointment, doctor_user['full_name'],
+                                                          notes=completion_notes)
             )
 
             return jsonify({
@@ -729,15 +385,9 @@ Best regards,
             })
 
     except Exception as e:
-        import traceback
-        error_details = traceback.format_exc()
-        print(f"COMPLETE APPOINTMENT ERROR: {str(e)}")
-        print(f"FULL TRACEBACK: {error_details}")
-
         return jsonify({
             'success': False,
-            'error': f'Server error: {str(e)}',
-            'traceback': error_details
+            'error': str(e)
         }), 500
 
 @doctor_bp.route('/api/patient/<int:patient_id>')
@@ -882,6 +532,9 @@ def generate_unique_id():
         conn.commit()
         conn.close()
 
+        from app.services.vaccination_due import refresh_for_baby
+        refresh_for_baby(baby_id)
+
         # Get doctor information for notification
         doctor_id = session['user_id']
         doctor_user = DataManager.get_user_by_id(doctor_id)
@@ -1097,104 +750,35 @@ def mark_appointment_complete(appointment_id):
         data = request.get_json() or {}
         doctor_id = session['user_id']
 
-        # Get doctor's information
-        doctor_user = DataManager.get_user_by_id(doctor_id)
-        doctor_name = doctor_user['full_name']
-
-        # Verify appointment belongs to this doctor
-        conn = DataManager.get_connection()
-        conn.row_factory = sqlite3.Row  # Enable row factory
-        cursor = conn.cursor()
-
-        cursor.execute('''
-            SELECT id FROM appointments
-            WHERE id = ? AND (doctor_id = ? OR doctor_name = ?)
-        ''', (appointment_id, doctor_id, doctor_name))
-
-        if not cursor.fetchone():
+        appointment = appointment_service.get_for_doctor(appointment_id, doctor_id)
+        if not appointment:
             return jsonify({
                 'success': False,
                 'error': 'Appointment not found or access denied'
             }), 404
 
-        # Update appointment status
         consultation_notes = data.get('notes', '')
-        cursor.execute('''
-            UPDATE appointments
-            SET status = 'completed', notes = ?
-            WHERE id = ?
-        ''', (consultation_notes, appointment_id))
-
-        conn.commit()
-        conn.close()
+        appointment_service.complete(appointment_id, consultation_notes, doctor_id=doctor_id)
 
         # Send completion notification email to patient
         try:
             from app.services.email_service import email_service
 
-            # Get appointment and patient details
-            conn = DataManager.get_connection()
-            cursor = conn.cursor()
-
-            cursor.execute('''
-                SELECT a.appointment_date, a.appointment_type, a.purpose, a.clinic_name,
-                       u.full_name as patient_name, u.email as patient_email
-                FROM appointments a
-                JOIN users u ON a.user_id = u.id
-                WHERE a.id = ?
-            ''', (appointment_id,))
-
-            appointment_info = cursor.fetchone()
-            conn.close()
-
-            if appointment_info:
-                from datetime import datetime
-                appointment_date = datetime.fromisoformat(appointment_info[0])
-
-                # Send completion email to patient
-                completion_subject = f"Appointment Completed - {doctor_name}"
-                completion_message = f"""
-Dear {appointment_info[4]},
-
-Your appointment has been successfully completed.
-
-📅 Appointment Summary:
-• Doctor: {doctor_name}
-• Date: {appointment_date.strftime('%Y-%m-%d')}
-• Time: {appointment_date.strftime('%H:%M')}
-• Type: {appointment_info[1]}
-• Purpose: {appointment_info[2] or 'General consultation'}
-• Location: {appointment_info[3] or 'Maternal Care Clinic'}
-
-📝 Consultation Notes:
-{consultation_notes if consultation_notes else 'No additional notes provided.'}
-
-💡 Next Steps:
-• Follow any instructions provided during your consultation
-• Schedule follow-up appointments if recommended
-• Contact us if you have any questions or concerns
-
-Thank you for choosing our healthcare services. We hope you had a positive experience.
-
-Best regards,
-{doctor_name}
-Maternal and Child Health Care System
-
-© 2024 Maternal and Child Health Care
-This is an automated notification.
-                """
-
-                email_service.send_email(
-                    to_email=appointment_info[5],
-                    subject=completion_subject,
-                    html_content=completion_message
+            doctor_user = DataManager.get_user_by_id(doctor_id)
+            email_service.send_template(
+                appointment['patient_email'],
+                'appointment_completed',
+                details=appointment_service.email_details(
+                    appointment, doctor_user['full_name'],
+                    notes=consultation_notes or 'No additional notes provided.'
                 )
+            )
 
-                return jsonify({
-                    'success': True,
-                    'message': 'Appointment marked as completed and patient notified',
-                    'email_sent': True
-                })
+            return jsonify({
+                'success': True,
+                'message': 'Appointment marked as completed and patient notified',
+                'email_sent': True
+            })
 
         except Exception as email_error:
             print(f"Completion email failed: {email_error}")
@@ -1204,11 +788,6 @@ This is an automated notification.
                 'email_sent': False
             })
 
-        return jsonify({
-            'success': True,
-            'message': 'Appointment marked as completed'
-        })
-
     except Exception as e:
         return jsonify({
             'success': False,
@@ -1229,20 +808,8 @@ def reschedule_appointment(appointment_id):
                 'error': 'New date and time are required'
             }), 400
 
-        # Get doctor's information
-        doctor_user = DataManager.get_user_by_id(doctor_id)
-        doctor_name = doctor_user['full_name']
-
         # Verify appointment belongs to this doctor
-        conn = DataManager.get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute('''
-            SELECT id FROM appointments
-            WHERE id = ? AND (doctor_id = ? OR doctor_name = ?)
-        ''', (appointment_id, doctor_id, doctor_name))
-
-        if not cursor.fetchone():
+        if not appointment_service.get_for_doctor(appointment_id, doctor_id):
             return jsonify({
                 'success': False,
                 'error': 'Appointment not found or access denied'
@@ -1253,15 +820,15 @@ def reschedule_appointment(appointment_id):
         new_time = data['new_time']
         new_datetime = datetime.strptime(f"{new_date} {new_time}", '%Y-%m-%d %H:%M')
 
-        # Update appointment
-        cursor.execute('''
-            UPDATE appointments
-            SET appointment_date = ?, status = 'rescheduled'
-            WHERE id = ?
-        ''', (new_datetime.isoformat(), appointment_id))
-
-        conn.commit()
-        conn.close()
+        # The slot is checked against the database in the same transaction as the move
+        conflicts = appointment_service.reschedule({appointment_id: new_datetime}, doctor_id=doctor_id)
+        if conflicts:
+            return jsonify({
+                'success': False,
+                'error': 'You already have an appointment at this time',
+                'available_slots': [slot.strftime('%H:%M') for slot in
+                                    availability.free_slots(doctor_id, new_datetime.date())]
+            }), 409
 
         return jsonify({
             'success': True,
@@ -1276,6 +843,249 @@ def reschedule_appointment(appointment_id):
         }), 500
 
 
+@doctor_bp.route('/api/appointments/bulk', methods=['POST'])
+@doctor_required
+def bulk_update_appointments():
+    """
+    Apply one action to many appointments in a single transaction
+
+    Body: {"appointment_ids": [...], "action": "confirm" | "cancel" | "complete" | "reschedule",
+           "reason"/"notes" (optional), "new_date" (reschedule: YYYY-MM-DD, keeps each time),
+           "notify" (default true)}
+    """
+    transitions = {
+        'confirm': ('pending', 'rescheduled'),
+        'cancel': ('pending', 'confirmed', 'rescheduled'),
+        'complete': ('pending', 'confirmed', 'rescheduled'),
+        'reschedule': ('pending', 'confirmed', 'rescheduled')
+    }
+
+    try:
+        doctor_id = session['user_id']
+        data = request.get_json() or {}
+        action = data.get('action')
+        appointment_ids = data.get('appointment_ids') or []
+
+        if action not in transitions:
+            return jsonify({
+                'success': False,
+                'error': f"Action must be one of: {', '.join(transitions)}"
+            }), 400
+        if not isinstance(appointment_ids, list) or not appointment_ids:
+            return jsonify({
+                'success': False,
+                'error': 'appointment_ids must be a non-empty list'
+            }), 400
+        if len(appointment_ids) > 500:
+            return jsonify({
+                'success': False,
+                'error': 'At most 500 appointments can be updated at once'
+            }), 400
+        try:
+            appointment_ids = list(dict.fromkeys(int(appointment_id) for appointment_id in appointment_ids))
+        except (TypeError, ValueError):
+            return jsonify({
+                'success': False,
+                'error': 'appointment_ids must be integers'
+            }), 400
+
+        new_day = None
+        if action == 'reschedule':
+            try:
+                new_day = datetime.strptime(data.get('new_date', ''), '%Y-%m-%d').date()
+            except ValueError:
+                return jsonify({
+                    'success': False,
+                    'error': 'new_date (YYYY-MM-DD) is required for reschedule'
+                }), 400
+
+        found = appointment_service.get_many_for_doctor(appointment_ids, doctor_id)
+
+        skipped = []
+        targets = []
+        for appointment_id in appointment_ids:
+            appointment = found.get(appointment_id)
+            if not appointment:
+                skipped.append({'id': appointment_id, 'reason': 'not found or access denied'})
+            elif appointment['status'] not in transitions[action]:
+                skipped.append({'id': appointment_id, 'reason': f"cannot {action} a {appointment['status']} appointment"})
+            else:
+                targets.append(appointment)
+
+        reason = data.get('reason', 'Cancelled by doctor')
+        notes = data.get('notes', 'Appointment completed')
+        target_ids = [appointment['id'] for appointment in targets]
+        new_times = {}
+
+        # Each action is a single executemany in one transaction
+        if action == 'confirm':
+            appointment_service.confirm(target_ids, doctor_id=doctor_id)
+        elif action == 'cancel':
+            appointment_service.cancel(target_ids, f"Cancelled: {reason}", doctor_id=doctor_id)
+        elif action == 'complete':
+            appointment_service.complete(target_ids, notes, doctor_id=doctor_id)
+        else:
+            # One transaction checks and moves the whole batch; taken slots are skipped
+            new_times = {
+                appointment['id']: datetime.combine(
+                    new_day, parse_appointment_datetime(appointment['appointment_date']).time())
+                for appointment in targets
+            }
+            conflicts = appointment_service.reschedule(new_times, doctor_id=doctor_id)
+            for appointment_id in conflicts:
+                skipped.append({'id': appointment_id,
+                                'reason': f"slot {new_times[appointment_id].strftime('%H:%M')} is already booked"})
+            targets = [appointment for appointment in targets if appointment['id'] not in conflicts]
+
+        # Queue all patient notifications as one batch for the email outbox
+        emails_queued = 0
+        if data.get('notify', True) and targets:
+            from app.services.email_service import email_service
+
+            doctor_name = DataManager.get_user_by_id(doctor_id)['full_name']
+            emails = []
+            for appointment in targets:
+                if not appointment['patient_email']:
+                    continue
+                if action == 'confirm':
+                    rendered = email_service.render_template(
+                        'appointment_confirmed_patient',
+                        details=appointment_service.email_details(appointment, doctor_name),
+                        patient_email=appointment['patient_email']
+                    )
+                elif action == 'cancel':
+                    rendered = email_service.render_template(
+                        'appointment_cancelled',
+                        patient_name=appointment['patient_name'] or 'Patient',
+                        doctor_name=doctor_name,
+                        appointment_date=appointment['appointment_date'],
+                        appointment_type=appointment['appointment_type'],
+                        cancellation_reason=reason,
+                        clinic_name=appointment['clinic_name'] or 'Medical Clinic'
+                    )
+                elif action == 'complete':
+                    rendered = email_service.render_template(
+                        'appointment_completed',
+                        details=appointment_service.email_details(appointment, doctor_name, notes=notes)
+                    )
+                else:
+                    new_datetime = new_times[appointment['id']]
+                    rendered = email_service.render_template(
+                        'appointment_rescheduled',
+                        details=appointment_service.email_details(
+                            appointment, doctor_name,
+                            previous_date=parse_appointment_datetime(appointment['appointment_date']).strftime('%Y-%m-%d %H:%M'),
+                            appointment_date=new_datetime.strftime('%Y-%m-%d'),
+                            appointment_time=new_datetime.strftime('%H:%M')
+                        )
+                    )
+                emails.append((appointment['patient_email'],) + rendered)
+
+            email_service.enqueue_emails(emails)
+            emails_queued = len(emails)
+
+        return jsonify({
+            'success': True,
+            'action': action,
+            'updated': [appointment['id'] for appointment in targets],
+            'skipped': skipped,
+            'emails_queued': emails_queued
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@doctor_bp.route('/api/calendar-feed', methods=['GET', 'POST'])
+@doctor_required
+def calendar_feed_url():
+    """Subscription URL for the current doctor's appointment calendar (POST issues a new one)"""
+    try:
+        from app.services.calendar_feed import make_feed_token
+
+        # POST replaces the feed key, so every previously shared URL stops working
+        token = make_feed_token(session['user_id'], regenerate=request.method == 'POST')
+        return jsonify({
+            'success': True,
+            'url': url_for('doctor.calendar_feed', token=token, _external=True)
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@doctor_bp.route('/calendar/<token>.ics')
+def calendar_feed(token):
+    """iCalendar feed of a doctor's appointments (signed URL, no session needed)"""
+    from app.services.calendar_feed import load_feed_token, feed_etag, generate_ics
+
+    doctor_id = load_feed_token(token)
+    doctor = DataManager.get_user_by_id(doctor_id) if doctor_id else None
+    if not doctor or doctor.get('role') != 'doctor':
+        return Response('Calendar not found', status=404, mimetype='text/plain')
+
+    slot_minutes = availability.get_settings(doctor_id)['slot_minutes']
+    etag = feed_etag(doctor_id, doctor['full_name'], slot_minutes)
+    if etag in request.if_none_match:
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    response = Response(stream_with_context(generate_ics(doctor_id, doctor['full_name'], slot_minutes)),
+                        mimetype='text/calendar')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, max-age=300'
+    response.headers['Content-Disposition'] = 'inline; filename="appointments.ics"'
+    return response
+
+
+@doctor_bp.route('/api/availability', methods=['GET', 'PUT'])
+@doctor_required
+def availability_settings():
+    """View or update the current doctor's working hours and slot length"""
+    try:
+        doctor_id = session['user_id']
+
+        if request.method == 'PUT':
+            data = request.get_json() or {}
+            current = availability.get_settings(doctor_id)
+            try:
+                availability.set_settings(
+                    doctor_id,
+                    data.get('start_time', current['start_time']),
+                    data.get('end_time', current['end_time']),
+                    data.get('slot_minutes', current['slot_minutes']),
+                    data.get('working_days', current['working_days'])
+                )
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 400
+
+        settings = availability.get_settings(doctor_id)
+        return jsonify({
+            'success': True,
+            'availability': {
+                'start_time': settings['start_time'].strftime('%H:%M'),
+                'end_time': settings['end_time'].strftime('%H:%M'),
+                'slot_minutes': settings['slot_minutes'],
+                'working_days': settings['working_days']
+            }
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 
 @doctor_bp.route('/api/doctors')
 def get_doctors():
@@ -1313,47 +1123,10 @@ def get_babycare_appointments():
     try:
         user_id = session['user_id']
 
-        conn = DataManager.get_connection()
-        cursor = conn.cursor()
-
-        # Get baby care appointments for this doctor
-        cursor.execute('''
-            SELECT a.id, a.user_id, a.baby_id, a.appointment_type, a.appointment_date,
-                   a.doctor_name, a.clinic_name, a.purpose, a.status, a.notes,
-                   a.patient_name, a.patient_email, a.child_name, a.confirmed_by_doctor,
-                   a.created_at, a.updated_at, b.name as baby_name, u.full_name as patient_full_name
-            FROM appointments a
-            LEFT JOIN babies b ON a.baby_id = b.id
-            LEFT JOIN users u ON a.user_id = u.id
-            WHERE a.doctor_id = ? AND a.appointment_type LIKE '%Baby Care%'
-            ORDER BY a.appointment_date ASC
-        ''', (user_id,))
-
-        appointments = cursor.fetchall()
-        conn.close()
-
-        appointments_data = []
-        for appointment in appointments:
-            appointments_data.append({
-                'id': appointment[0],
-                'user_id': appointment[1],
-                'baby_id': appointment[2],
-                'appointment_type': appointment[3],
-                'appointment_date': appointment[4],
-                'doctor_name': appointment[5],
-                'clinic_name': appointment[6],
-                'purpose': appointment[7],
-                'status': appointment[8],
-                'notes': appointment[9],
-                'patient_name': appointment[10],
-                'patient_email': appointment[11],
-                'child_name': appointment[12],
-                'confirmed_by_doctor': bool(appointment[13]),
-                'created_at': appointment[14],
-                'updated_at': appointment[15],
-                'baby_name': appointment[16],
-                'patient_full_name': appointment[17]
-            })
+        appointments_data = [
+            appointment_service.project(appointment, appointment_service.DOCTOR_FIELDS)
+            for appointment in appointment_service.list_for_doctor(user_id, baby_care_only=True)
+        ]
 
         return jsonify({
             'success': True,
@@ -1375,56 +1148,30 @@ def confirm_babycare_appointment(appointment_id):
     try:
         user_id = session['user_id']
 
-        # Get appointment details
-        conn = DataManager.get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute('''
-            SELECT a.*, u.email as patient_email, u.full_name as patient_name
-            FROM appointments a
-            JOIN users u ON a.user_id = u.id
-            WHERE a.id = ? AND a.doctor_id = ?
-        ''', (appointment_id, user_id))
-
-        appointment = cursor.fetchone()
-
+        appointment = appointment_service.get_for_doctor(appointment_id, user_id)
         if not appointment:
-            conn.close()
             return jsonify({
                 'success': False,
                 'error': 'Appointment not found or access denied'
             }), 404
 
-        # Update appointment status
-        cursor.execute('''
-            UPDATE appointments
-            SET status = 'confirmed', confirmed_by_doctor = 1, updated_at = ?
-            WHERE id = ?
-        ''', (datetime.now().isoformat(), appointment_id))
-
-        conn.commit()
-        conn.close()
+        appointment_service.confirm(appointment_id, doctor_id=user_id)
 
         # Send confirmation email
         try:
             from app.services.email_service import email_service
 
             doctor_user = DataManager.get_user_by_id(user_id)
-
-            appointment_details = {
-                'appointment_id': appointment_id,
-                'patient_name': appointment[11] or appointment[17],  # patient_name or patient_full_name
-                'child_name': appointment[12] or 'Child',  # child_name
-                'doctor_name': doctor_user['full_name'],
-                'appointment_date': appointment[5][:10] if appointment[5] else '',  # appointment_date
-                'appointment_time': appointment[5][11:16] if len(appointment[5]) > 10 else '',
-                'purpose': appointment[8] or 'Baby Care Checkup',  # purpose
-                'clinic_name': appointment[7] or 'Baby Care Clinic'  # clinic_name
-            }
+            appointment_details = appointment_service.email_details(
+                appointment, doctor_user['full_name'],
+                child_name=appointment['child_name'] or 'Child',
+                purpose=appointment['purpose'] or 'Baby Care Checkup',
+                clinic_name=appointment['clinic_name'] or 'Baby Care Clinic'
+            )
 
             email_result = email_service.send_appointment_confirmation_emails(
-                appointment[16],  # patient_email
-                doctor_user['email'],  # doctor_email
+                appointment['patient_email'],
+                doctor_user['email'],
                 appointment_details
             )
 
@@ -1458,37 +1205,13 @@ def complete_babycare_appointment(appointment_id):
         user_id = session['user_id']
         data = request.get_json() or {}
 
-        conn = DataManager.get_connection()
-        conn.row_factory = sqlite3.Row  # Enable row factory
-        cursor = conn.cursor()
-
-        # Verify appointment belongs to this doctor
-        cursor.execute('''
-            SELECT id FROM appointments
-            WHERE id = ? AND doctor_id = ?
-        ''', (appointment_id, user_id))
-
-        if not cursor.fetchone():
-            conn.close()
+        if not appointment_service.get_for_doctor(appointment_id, user_id):
             return jsonify({
                 'success': False,
                 'error': 'Appointment not found or access denied'
             }), 404
 
-        # Update appointment status
-        cursor.execute('''
-            UPDATE appointments
-            SET status = 'completed', notes = ?, completed_at = ?, updated_at = ?
-            WHERE id = ?
-        ''', (
-            data.get('notes', ''),
-            datetime.now().isoformat(),
-            datetime.now().isoformat(),
-            appointment_id
-        ))
-
-        conn.commit()
-        conn.close()
+        appointment_service.complete(appointment_id, data.get('notes', ''), doctor_id=user_id)
 
         return jsonify({
             'success': True,
@@ -1504,48 +1227,46 @@ def complete_babycare_appointment(appointment_id):
 @doctor_bp.route('/api/reports')
 @doctor_required
 def get_reports():
-    """Get medical reports for the current doctor"""
+    """Report summaries for the current doctor (full text from /api/reports/<id>)"""
     try:
+        from app.utils.helpers import report_preview, REPORT_PREVIEW_LENGTH
+
         user_id = session['user_id']
-        user = DataManager.get_user_by_id(user_id)
-        doctor_name = user['full_name']
 
         conn = DataManager.get_connection()
+        conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
 
         cursor.execute('''
             SELECT r.id, r.patient_id, r.doctor_id, r.patient_name, r.doctor_name,
-                   r.report_type, r.report_date, r.findings, r.recommendations,
-                   r.diagnosis, r.notes, r.created_at, r.updated_at
+                   r.report_type, r.report_date, SUBSTR(r.diagnosis, 1, ?) AS diagnosis,
+                   r.created_at, r.updated_at
             FROM medical_reports r
             WHERE r.doctor_id = ? AND r.is_active = 1
             ORDER BY r.report_date DESC, r.created_at DESC
-        ''', (user_id,))
+        ''', (REPORT_PREVIEW_LENGTH + 1, user_id))
 
         reports = []
         for row in cursor.fetchall():
-            report = {
-                'id': row[0],
-                'patient_id': row[1],
-                'doctor_id': row[2],
-                'patient_name': row[3],
-                'doctor_name': row[4],
-                'report_type': row[5],
-                'report_date': row[6],
-                'findings': row[7],
-                'recommendations': row[8],
-                'diagnosis': row[9],
-                'notes': row[10],
-                'created_at': row[11],
-                'updated_at': row[12]
-            }
-            reports.append(report)
+            reports.append({
+                'id': row['id'],
+                'patient_id': row['patient_id'],
+                'doctor_id': row['doctor_id'],
+                'patient_name': row['patient_name'],
+                'doctor_name': row['doctor_name'],
+                'report_type': row['report_type'],
+                'report_date': row['report_date'],
+                'diagnosis_preview': report_preview(row['diagnosis']),
+                'created_at': row['created_at'],
+                'updated_at': row['updated_at']
+            })
 
         conn.close()
 
         return jsonify({
             'success': True,
-            'reports': reports
+            'reports': reports,
+            'count': len(reports)
         })
 
     except Exception as e:
@@ -1555,6 +1276,43 @@ def get_reports():
             'error': str(e)
         }), 500
 
+@doctor_bp.route('/api/reports/<int:report_id>')
+@doctor_required
+def get_report_detail(report_id):
+    """Full text of one of the current doctor's reports"""
+    try:
+        conn = DataManager.get_connection()
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            SELECT id, patient_id, doctor_id, patient_name, doctor_name,
+                   report_type, report_date, findings, recommendations,
+                   diagnosis, notes, created_at, updated_at
+            FROM medical_reports
+            WHERE id = ? AND doctor_id = ? AND is_active = 1
+        ''', (report_id, session['user_id']))
+
+        row = cursor.fetchone()
+        conn.close()
+
+        if not row:
+            return jsonify({
+                'success': False,
+                'error': 'Report not found'
+            }), 404
+
+        return jsonify({
+            'success': True,
+            'report': dict(row)
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @doctor_bp.route('/api/reports', methods=['POST'])
 @doctor_required
 def create_report():
@@ -1602,6 +1360,9 @@ def create_report():
         conn.commit()
         conn.close()
 
+        from app.services.worklist import worklist
+        worklist.refresh_reports(user_id, int(data['patient_id']))
+
         return jsonify({
             'success': True,
             'message': 'Report created successfully',
@@ -1615,6 +1376,133 @@ def create_report():
             'error': str(e)
         }), 500
 
+@doctor_bp.route('/api/reports/batch', methods=['POST'])
+@doctor_required
+def create_reports_batch():
+    """
+    Create many medical reports at once (e.g. after a vaccination camp)
+
+    Body: {"reports": [{"patient_id", "report_type", "report_date", "findings",
+           "patient_name"/"recommendations"/"diagnosis"/"notes" (optional)}, ...]}
+
+    Every report is validated first; if any fails, nothing is inserted and the
+    errors are returned by index. Otherwise all rows go in one transaction.
+    """
+    try:
+        doctor_id = session['user_id']
+        data = request.get_json() or {}
+        payloads = data.get('reports') or []
+
+        if not isinstance(payloads, list) or not payloads:
+            return jsonify({
+                'success': False,
+                'error': 'reports must be a non-empty list'
+            }), 400
+        if len(payloads) > 500:
+            return jsonify({
+                'success': False,
+                'error': 'At most 500 reports can be created at once'
+            }), 400
+
+        errors = []
+        valid = []
+        for index, payload in enumerate(payloads):
+            if not isinstance(payload, dict):
+                errors.append({'index': index, 'error': 'Report must be an object'})
+                continue
+            missing = [field for field in ('patient_id', 'report_type', 'report_date', 'findings')
+                       if not payload.get(field)]
+            if missing:
+                errors.append({'index': index, 'error': f"Missing required field: {', '.join(missing)}"})
+                continue
+            try:
+                payload['patient_id'] = int(payload['patient_id'])
+                datetime.strptime(str(payload['report_date']), '%Y-%m-%d')
+            except (TypeError, ValueError):
+                errors.append({'index': index, 'error': 'patient_id must be an integer and report_date YYYY-MM-DD'})
+                continue
+            valid.append((index, payload))
+
+        conn = DataManager.get_connection()
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+
+        try:
+            # One lookup resolves the doctor's name and every patient's name
+            lookup_ids = sorted({payload['patient_id'] for _, payload in valid} | {doctor_id})
+            placeholders = ','.join('?' * len(lookup_ids))
+            cursor.execute(f'''
+                SELECT id, full_name, role, is_active
+                FROM users
+                WHERE id IN ({placeholders})
+            ''', lookup_ids)
+            users = {row['id']: row for row in cursor.fetchall()}
+
+            for index, payload in valid:
+                patient = users.get(payload['patient_id'])
+                if not patient or patient['role'] != 'user' or not patient['is_active']:
+                    errors.append({'index': index, 'error': f"Patient {payload['patient_id']} not found"})
+
+            if errors:
+                return jsonify({
+                    'success': False,
+                    'error': f'{len(errors)} of {len(payloads)} reports are invalid; nothing was created',
+                    'errors': sorted(errors, key=lambda error: error['index'])
+                }), 400
+
+            doctor_name = users[doctor_id]['full_name']
+            now = datetime.now().isoformat()
+
+            report_ids = []
+            for payload in payloads:
+                cursor.execute('''
+                    INSERT INTO medical_reports (patient_id, doctor_id, patient_name, doctor_name,
+                                               report_type, report_date, findings, recommendations,
+                                               diagnosis, notes, created_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (
+                    payload['patient_id'],
+                    doctor_id,
+                    payload.get('patient_name') or users[payload['patient_id']]['full_name'],
+                    doctor_name,
+                    payload['report_type'],
+                    payload['report_date'],
+                    payload['findings'],
+                    payload.get('recommendations', ''),
+                    payload.get('diagnosis', ''),
+                    payload.get('notes', ''),
+                    now,
+                    now
+                ))
+                report_ids.append(cursor.lastrowid)
+
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+        # Many patients at once: let the worklist rebuild from one query on next read
+        from app.services.worklist import worklist
+        from app.services.doctor_stats import doctor_stats
+        worklist.invalidate(doctor_id)
+        doctor_stats.invalidate(doctor_id)
+
+        return jsonify({
+            'success': True,
+            'message': f'{len(report_ids)} reports created successfully',
+            'report_ids': report_ids,
+            'count': len(report_ids)
+        })
+
+    except Exception as e:
+        print(f"Error creating reports: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @doctor_bp.route('/api/reports/<int:report_id>', methods=['PUT'])
 @doctor_required
 def update_report(report_id):
@@ -1627,7 +1515,7 @@ def update_report(report_id):
         cursor = conn.cursor()
 
         # Verify the report belongs to this doctor
-        cursor.execute('SELECT doctor_id FROM medical_reports WHERE id = ?', (report_id,))
+        cursor.execute('SELECT doctor_id, patient_id FROM medical_reports WHERE id = ?', (report_id,))
         row = cursor.fetchone()
         
         if not row:
@@ -1669,6 +1557,10 @@ def update_report(report_id):
         conn.commit()
         conn.close()
 
+        # The report date decides which visits still await a report
+        from app.services.worklist import worklist
+        worklist.refresh_reports(user_id, row[1])
+
         return jsonify({
             'success': True,
             'message': 'Report updated successfully'
@@ -1723,6 +1615,203 @@ def get_patients():
             'error': str(e)
         }), 500
 
+@doctor_bp.route('/api/patient-roster')
+@doctor_required
+def get_patient_roster():
+    """
+    One row per patient with their latest weight, latest report, next
+    appointment and baby count, built in a single query
+
+    ?scope=mine (default) lists patients with an appointment or report from
+    this doctor; ?scope=all lists every active patient.
+    """
+    try:
+        doctor_id = session['user_id']
+        scope = request.args.get('scope', 'mine')
+
+        if scope == 'all':
+            roster_sql = "SELECT id AS patient_id FROM users WHERE role = 'user' AND is_active = 1"
+        else:
+            roster_sql = """
+                SELECT user_id AS patient_id FROM appointments WHERE doctor_id = :doctor_id
+                UNION
+                SELECT patient_id FROM medical_reports WHERE doctor_id = :doctor_id AND is_active = 1
+            """
+
+        conn = DataManager.get_connection()
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+
+        cursor.execute(f'''
+            WITH roster AS ({roster_sql}),
+            latest_weight AS (
+                SELECT user_id, date, weight, pregnancy_week, bmi, weight_gain, bmi_category, gain_status,
+                       ROW_NUMBER() OVER (PARTITION BY user_id
+                                          ORDER BY pregnancy_week DESC, date DESC, id DESC) AS rn
+                FROM weight_entries
+                WHERE user_id IN (SELECT patient_id FROM roster)
+            ),
+            next_appointment AS (
+                SELECT user_id, id, appointment_date, appointment_type, status,
+                       ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY appointment_date) AS rn
+                FROM appointments
+                WHERE doctor_id = :doctor_id
+                  AND status IN ('pending', 'confirmed', 'rescheduled')
+                  AND appointment_date >= :now
+            ),
+            latest_report AS (
+                SELECT patient_id, MAX(report_date) AS report_date
+                FROM medical_reports
+                WHERE is_active = 1 AND patient_id IN (SELECT patient_id FROM roster)
+                GROUP BY patient_id
+            ),
+            baby_counts AS (
+                SELECT parent_id, COUNT(*) AS baby_count
+                FROM babies
+                WHERE is_active = 1 AND parent_id IN (SELECT patient_id FROM roster)
+                GROUP BY parent_id
+            )
+            SELECT u.id, u.full_name, u.email, u.phone,
+                   w.date AS weight_date, w.weight, w.pregnancy_week, w.bmi, w.weight_gain,
+                   w.bmi_category, w.gain_status,
+                   rs.score AS risk_score, rs.level AS risk_level, rs.flags AS risk_flags,
+                   r.report_date AS latest_report_date,
+                   n.id AS next_appointment_id, n.appointment_date AS next_appointment_date,
+                   n.appointment_type AS next_appointment_type, n.status AS next_appointment_status,
+                   COALESCE(b.baby_count, 0) AS baby_count
+            FROM roster
+            JOIN users u ON u.id = roster.patient_id
+            LEFT JOIN latest_weight w ON w.user_id = u.id AND w.rn = 1
+            LEFT JOIN next_appointment n ON n.user_id = u.id AND n.rn = 1
+            LEFT JOIN latest_report r ON r.patient_id = u.id
+            LEFT JOIN baby_counts b ON b.parent_id = u.id
+            LEFT JOIN patient_risk_scores rs ON rs.doctor_id = :doctor_id AND rs.patient_id = u.id
+            ORDER BY u.full_name ASC
+        ''', {'doctor_id': doctor_id, 'now': datetime.now().isoformat(timespec='seconds')})
+
+        patients = []
+        for row in cursor.fetchall():
+            patients.append({
+                'id': row['id'],
+                'name': row['full_name'],
+                'email': row['email'],
+                'phone': row['phone'] or '',
+                'latest_weight': {
+                    'date': row['weight_date'],
+                    'weight': row['weight'],
+                    'pregnancy_week': row['pregnancy_week'],
+                    'weight_gain': row['weight_gain']
+                } if row['weight_date'] else None,
+                'bmi': row['bmi'],
+                'bmi_category': row['bmi_category'] or 'unknown',
+                'status': row['gain_status'] or 'unknown',
+                'risk': {
+                    'score': row['risk_score'],
+                    'level': row['risk_level'],
+                    'flags': json.loads(row['risk_flags'])
+                } if row['risk_level'] else None,
+                'latest_report_date': row['latest_report_date'],
+                'next_appointment': {
+                    'id': row['next_appointment_id'],
+                    'appointment_date': row['next_appointment_date'],
+                    'appointment_type': row['next_appointment_type'],
+                    'status': row['next_appointment_status']
+                } if row['next_appointment_id'] else None,
+                'baby_count': row['baby_count']
+            })
+
+        conn.close()
+
+        return jsonify({
+            'success': True,
+            'scope': 'all' if scope == 'all' else 'mine',
+            'patients': patients,
+            'count': len(patients)
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@doctor_bp.route('/api/risk-scores')
+@doctor_required
+def get_risk_scores():
+    """
+    The doctor's patients by pregnancy risk score, highest first
+
+    Scores come from the risk_scores batch job; ?level=high|medium|low filters.
+    """
+    try:
+        doctor_id = session['user_id']
+        level = request.args.get('level')
+        if level and level not in ('high', 'medium', 'low'):
+            return jsonify({'success': False, 'error': 'level must be high, medium or low'}), 400
+
+        conn = DataManager.get_connection()
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT rs.patient_id, u.full_name, u.email, rs.score, rs.level, rs.flags, rs.computed_at
+            FROM patient_risk_scores rs
+            JOIN users u ON u.id = rs.patient_id
+            WHERE rs.doctor_id = ? {'AND rs.level = ?' if level else ''}
+            ORDER BY rs.score DESC, u.full_name
+        ''', (doctor_id, level) if level else (doctor_id,))
+        patients = [dict(row, flags=json.loads(row['flags'])) for row in cursor.fetchall()]
+        conn.close()
+
+        return jsonify({
+            'success': True,
+            'patients': patients,
+            'count': len(patients),
+            'computed_at': patients[0]['computed_at'] if patients else None
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@doctor_bp.route('/api/weight-trajectories')
+@doctor_required
+def get_weight_trajectories():
+    """
+    Latest IOM weight-gain band and status for each of the doctor's patients,
+    high and low gainers first, with counts per status
+    """
+    try:
+        from app.services import weight_trajectory
+
+        doctor_id = session['user_id']
+
+        conn = DataManager.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT user_id FROM appointments WHERE doctor_id = ? AND user_id IS NOT NULL
+            UNION
+            SELECT patient_id FROM medical_reports WHERE doctor_id = ? AND is_active = 1
+        ''', (doctor_id, doctor_id))
+        patient_ids = [row[0] for row in cursor.fetchall()]
+        conn.close()
+
+        summary = weight_trajectory.population_summary(patient_ids)
+
+        return jsonify({
+            'success': True,
+            'patients': summary['patients'],
+            'counts': summary['counts'],
+            'count': len(summary['patients'])
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @doctor_bp.route('/api/notifications')
 @doctor_required
 def get_notifications():
@@ -1740,11 +1829,11 @@ def get_notifications():
                    u.full_name as patient_name, u.email as patient_email
             FROM appointments a
             JOIN users u ON a.user_id = u.id
-            WHERE (a.doctor_id = ? OR a.doctor_name = (SELECT full_name FROM users WHERE id = ?))
+            WHERE a.doctor_id = ?
             AND a.status = 'pending'
             ORDER BY a.created_at DESC
             LIMIT 10
-        ''', (doctor_id, doctor_id))
+        ''', (doctor_id,))
 
         notifications = []
         for row in cursor.fetchall():
@@ -151,8 +151,10 @@ def test_api():
 @main_bp.route('/api/my-reports')
 @login_required
 def get_my_reports():
-    """Get medical reports for the current user (patient)"""
+    """Report summaries for the current user (patient); full text from /api/my-reports/<id>"""
     try:
+        from app.utils.helpers import report_preview, REPORT_PREVIEW_LENGTH
+
         user_id = session['user_id']
 
         conn = DataManager.get_connection()
@@ -161,12 +163,12 @@ def get_my_reports():
 
         cursor.execute('''
             SELECT r.id, r.patient_id, r.doctor_id, r.patient_name, r.doctor_name,
-                   r.report_type, r.report_date, r.findings, r.recommendations,
-                   r.diagnosis, r.notes, r.created_at, r.updated_at
+                   r.report_type, r.report_date, SUBSTR(r.diagnosis, 1, ?) AS diagnosis,
+                   r.created_at, r.updated_at
             FROM medical_reports r
             WHERE r.patient_id = ? AND r.is_active = 1
             ORDER BY r.report_date DESC, r.created_at DESC
-        ''', (user_id,))
+        ''', (REPORT_PREVIEW_LENGTH + 1, user_id))
 
         reports = cursor.fetchall()
         conn.close()
@@ -182,10 +184,7 @@ def get_my_reports():
                 'doctorName': report['doctor_name'],
                 'reportType': report['report_type'],
                 'date': report['report_date'],
-                'findings': report['findings'],
-                'recommendations': report['recommendations'] or '',
-                'diagnosis': report['diagnosis'] or '',
-                'notes': report['notes'] or '',
+                'diagnosisPreview': report_preview(report['diagnosis']),
                 'createdAt': report['created_at'],
                 'updatedAt': report['updated_at']
             })
@@ -205,3 +204,54 @@ def get_my_reports():
             'success': False,
             'error': str(e)
         }), 500
+
+@main_bp.route('/api/my-reports/<int:report_id>')
+@login_required
+def get_my_report_detail(report_id):
+    """Full text of one of the current user's reports"""
+    try:
+        conn = DataManager.get_connection()
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            SELECT id, patient_id, doctor_id, patient_name, doctor_name,
+                   report_type, report_date, findings, recommendations,
+                   diagnosis, notes, created_at, updated_at
+            FROM medical_reports
+            WHERE id = ? AND patient_id = ? AND is_active = 1
+        ''', (report_id, session['user_id']))
+
+        report = cursor.fetchone()
+        conn.close()
+
+        if not report:
+            return jsonify({
+                'success': False,
+                'error': 'Report not found'
+            }), 404
+
+        return jsonify({
+            'success': True,
+            'report': {
+                'id': report['id'],
+                'patientId': report['patient_id'],
+                'doctorId': report['doctor_id'],
+                'patientName': report['patient_name'],
+                'doctorName': report['doctor_name'],
+                'reportType': report['report_type'],
+                'date': report['report_date'],
+                'findings': report['findings'],
+                'recommendations': report['recommendations'] or '',
+                'diagnosis': report['diagnosis'] or '',
+                'notes': report['notes'] or '',
+                'createdAt': report['created_at'],
+                'updatedAt': report['updated_at']
+            }
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
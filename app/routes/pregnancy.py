@@ -1,6 +1,7 @@
-from flask import Blueprint, render_template, request, jsonify, session, redirect, url_for, send_file, current_app
+from flask import Blueprint, render_template, request, jsonify, session, redirect, url_for, send_file, current_app, Response, stream_with_context
 from datetime import datetime, date, timedelta
 from app.data_manager import DataManager
+from app.utils.helpers import calculate_bmi, get_recommended_gain_range, stream_csv
 import uuid
 import json
 import csv
@@ -87,117 +88,76 @@ def assistant():
 
 # Weight Tracker API Routes
 
-def calculate_bmi(weight, height):
-    """Calculate BMI from weight (kg) and height (cm)"""
-    if height and weight:
-        height_m = height / 100  # Convert cm to meters
-        return round(weight / (height_m ** 2), 1)
-    return None
-
-def get_bmi_category(bmi):
-    """Get BMI category"""
-    if bmi is None:
-        return 'unknown'
-    if bmi < 18.5:
-        return 'underweight'
-    elif bmi < 25:
-        return 'normal'
-    elif bmi < 30:
-        return 'overweight'
-    else:
-        return 'obese'
-
-def get_recommended_gain_range(bmi_category):
-    """Get recommended weight gain range based on BMI category"""
-    ranges = {
-        'underweight': {'total': '12.7-18.1 kg', 'weekly': '0.5 kg/week (2nd & 3rd trimester)'},
-        'normal': {'total': '11.3-15.9 kg', 'weekly': '0.4 kg/week (2nd & 3rd trimester)'},
-        'overweight': {'total': '6.8-11.3 kg', 'weekly': '0.3 kg/week (2nd & 3rd trimester)'},
-        'obese': {'total': '5.0-9.1 kg', 'weekly': '0.2 kg/week (2nd & 3rd trimester)'}
+WEIGHT_ENTRY_COLUMNS = '''id, user_id, date, weight, pregnancy_week, pre_pregnancy_weight, height, bmi,
+    weight_gain, notes, created_at, bmi_category, gain_band_low, gain_band_high, gain_status, trajectory_updated_at'''
+
+def weight_entry_to_dict(row):
+    """Weight entry response with its stored IOM category, band and status"""
+    bmi_category = row['bmi_category'] or 'unknown'
+    return {
+        'id': row['id'],
+        'user_id': row['user_id'],
+        'date': row['date'],
+        'weight': row['weight'],
+        'pregnancy_week': row['pregnancy_week'],
+        'pre_pregnancy_weight': row['pre_pregnancy_weight'],
+        'height': row['height'],
+        'bmi': row['bmi'],
+        'bmi_category': bmi_category,
+        'weight_gain': row['weight_gain'],
+        'status': row['gain_status'] or 'unknown',
+        'gain_band': {'low': row['gain_band_low'], 'high': row['gain_band_high']},
+        'recommended_gain': get_recommended_gain_range(bmi_category),
+        'notes': row['notes'],
+        'created_at': row['created_at']
     }
-    return ranges.get(bmi_category, {'total': 'Consult your doctor', 'weekly': 'Consult your doctor'})
-
-def get_status(bmi_category, weight_gain, pregnancy_week):
-    """Determine if weight gain is on track"""
-    if not weight_gain or not pregnancy_week:
-        return 'unknown'
-    
-    # Rough guidelines for weekly gain in 2nd and 3rd trimester
-    weekly_ranges = {
-        'underweight': (0.45, 0.55),
-        'normal': (0.35, 0.45),
-        'overweight': (0.25, 0.35),
-        'obese': (0.15, 0.25)
-    }
-    
-    if pregnancy_week < 13:
-        # First trimester - minimal gain expected
-        if weight_gain > 3:
-            return 'high'
-        return 'good'
-    
-    # Calculate expected weeks of weight gain (subtract first trimester)
-    weeks_of_gain = pregnancy_week - 13
-    
-    if bmi_category in weekly_ranges:
-        low, high = weekly_ranges[bmi_category]
-        expected_low = weeks_of_gain * low
-        expected_high = weeks_of_gain * high
-        
-        if weight_gain < expected_low * 0.7:  # More than 30% below
-            return 'low'
-        elif weight_gain > expected_high * 1.3:  # More than 30% above
-            return 'high'
-    
-    return 'good'
+
+def fetch_weight_entries(conn, user_id, order='pregnancy_week DESC, date DESC', limit=None):
+    """A user's weight entries with their stored trajectory"""
+    query = f'''
+        SELECT {WEIGHT_ENTRY_COLUMNS}
+        FROM weight_entries
+        WHERE user_id = ?
+        ORDER BY {order}
+        LIMIT ?
+    '''
+    params = (user_id, -1 if limit is None else limit)
+    cursor = conn.cursor()
+    cursor.execute(query, params)
+    return cursor.fetchall()
 
 @pregnancy_bp.route('/api/weight-entries', methods=['GET'])
 @login_required
 def get_weight_entries():
-    """Get all weight entries for the current user"""
+    """Get all weight entries for the current user (?points=N downsamples for charts)"""
     try:
+        from app.services import downsampling
+
         user_id = session.get('user_id')
+        points = request.args.get('points', type=int)
+        if points is not None and points < downsampling.MIN_POINTS:
+            return jsonify({
+                'success': False,
+                'error': f'points must be at least {downsampling.MIN_POINTS}'
+            }), 400
+
         conn = sqlite3.connect(current_app.config['DATABASE_PATH'])
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT id, user_id, date, weight, pregnancy_week, 
-                   pre_pregnancy_weight, height, bmi, weight_gain, notes, created_at
-            FROM weight_entries
-            WHERE user_id = ?
-            ORDER BY pregnancy_week DESC, date DESC
-        ''', (user_id,))
-        
-        rows = cursor.fetchall()
-        conn.close()
-        
-        entries = []
-        for row in rows:
-            bmi = row[7]
-            bmi_category = get_bmi_category(bmi)
-            recommended_gain = get_recommended_gain_range(bmi_category)
-            status = get_status(bmi_category, row[8], row[4])
-            
-            entries.append({
-                'id': row[0],
-                'user_id': row[1],
-                'date': row[2],
-                'weight': row[3],
-                'pregnancy_week': row[4],
-                'pre_pregnancy_weight': row[5],
-                'height': row[6],
-                'bmi': bmi,
-                'bmi_category': bmi_category,
-                'weight_gain': row[8],
-                'status': status,
-                'recommended_gain': recommended_gain,
-                'notes': row[9],
-                'created_at': row[10]
-            })
+        conn.row_factory = sqlite3.Row
+
+        try:
+            rows = fetch_weight_entries(conn, user_id)
+        finally:
+            conn.close()
+
+        entries = [weight_entry_to_dict(row) for row in rows]
+        total_count = len(entries)
+        if points:
+            entries = downsampling.downsample(entries, 'pregnancy_week', ['weight'], points)
         
         return jsonify({
             'success': True,
-            'entries': entries
+            'entries': entries,
+            'total_count': total_count
         })
     except Exception as e:
         return jsonify({
@@ -210,6 +170,8 @@ def get_weight_entries():
 def add_weight_entry():
     """Add a new weight entry"""
     try:
+        from app.services import weight_trajectory
+
         user_id = session.get('user_id')
         data = request.get_json()
 
@@ -244,39 +206,15 @@ def add_weight_entry():
         ''', (user_id, weight, pregnancy_week, pre_pregnancy_weight, height, bmi, weight_gain, notes))
         
         entry_id = cursor.lastrowid
+        weight_trajectory.refresh_entries(conn, 'id = ?', (entry_id,))
         conn.commit()
         
         # Get the inserted entry
-        cursor.execute('''
-            SELECT id, user_id, date, weight, pregnancy_week, 
-                   pre_pregnancy_weight, height, bmi, weight_gain, notes, created_at
-            FROM weight_entries WHERE id = ?
-        ''', (entry_id,))
-        
-        row = cursor.fetchone()
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute(f'SELECT {WEIGHT_ENTRY_COLUMNS} FROM weight_entries WHERE id = ?', (entry_id,))
+        entry = weight_entry_to_dict(cursor.fetchone())
         conn.close()
-        
-        # Build response
-        bmi_category = get_bmi_category(bmi)
-        recommended_gain = get_recommended_gain_range(bmi_category)
-        status = get_status(bmi_category, weight_gain, pregnancy_week)
-        
-        entry = {
-            'id': row[0],
-            'user_id': row[1],
-            'date': row[2],
-            'weight': row[3],
-            'pregnancy_week': row[4],
-            'pre_pregnancy_weight': row[5],
-            'height': row[6],
-            'bmi': bmi,
-            'bmi_category': bmi_category,
-            'weight_gain': row[8],
-            'status': status,
-            'recommended_gain': recommended_gain,
-            'notes': row[9],
-            'created_at': row[10]
-        }
 
         return jsonify({
             'success': True,
@@ -299,6 +237,8 @@ def add_weight_entry():
 def update_weight_entry(entry_id):
     """Update an existing weight entry"""
     try:
+        from app.services import weight_trajectory
+
         user_id = session.get('user_id')
         data = request.get_json()
 
@@ -357,39 +297,15 @@ def update_weight_entry(entry_id):
             SET {', '.join(update_fields)}
             WHERE id = ? AND user_id = ?
         ''', update_values)
-        
+        weight_trajectory.refresh_entries(conn, 'id = ?', (entry_id,))
         conn.commit()
         
         # Get updated entry
-        cursor.execute('''
-            SELECT id, user_id, date, weight, pregnancy_week, 
-                   pre_pregnancy_weight, height, bmi, weight_gain, notes, created_at
-            FROM weight_entries WHERE id = ?
-        ''', (entry_id,))
-        
-        row = cursor.fetchone()
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute(f'SELECT {WEIGHT_ENTRY_COLUMNS} FROM weight_entries WHERE id = ?', (entry_id,))
+        entry = weight_entry_to_dict(cursor.fetchone())
         conn.close()
-        
-        bmi_category = get_bmi_category(bmi)
-        recommended_gain = get_recommended_gain_range(bmi_category)
-        status = get_status(bmi_category, weight_gain, row[4])
-        
-        entry = {
-            'id': row[0],
-            'user_id': row[1],
-            'date': row[2],
-            'weight': row[3],
-            'pregnancy_week': row[4],
-            'pre_pregnancy_weight': row[5],
-            'height': row[6],
-            'bmi': bmi,
-            'bmi_category': bmi_category,
-            'weight_gain': row[8],
-            'status': status,
-            'recommended_gain': recommended_gain,
-            'notes': row[9],
-            'created_at': row[10]
-        }
 
         return jsonify({
             'success': True,
@@ -447,52 +363,125 @@ def get_latest_weight_entry():
         user_id = session.get('user_id')
         
         conn = sqlite3.connect(current_app.config['DATABASE_PATH'])
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT id, user_id, date, weight, pregnancy_week, 
-                   pre_pregnancy_weight, height, bmi, weight_gain, notes, created_at
-            FROM weight_entries
-            WHERE user_id = ?
-            ORDER BY pregnancy_week DESC, date DESC
-            LIMIT 1
-        ''', (user_id,))
-        
-        row = cursor.fetchone()
-        conn.close()
-        
-        if row:
-            bmi = row[7]
-            bmi_category = get_bmi_category(bmi)
-            recommended_gain = get_recommended_gain_range(bmi_category)
-            status = get_status(bmi_category, row[8], row[4])
-            
-            entry = {
-                'id': row[0],
-                'user_id': row[1],
-                'date': row[2],
-                'weight': row[3],
-                'pregnancy_week': row[4],
-                'pre_pregnancy_weight': row[5],
-                'height': row[6],
-                'bmi': bmi,
-                'bmi_category': bmi_category,
-                'weight_gain': row[8],
-                'status': status,
-                'recommended_gain': recommended_gain,
-                'notes': row[9],
-                'created_at': row[10]
-            }
-            
-            return jsonify({
-                'success': True,
-                'entry': entry
-            })
+        conn.row_factory = sqlite3.Row
+
+        try:
+            rows = fetch_weight_entries(conn, user_id, limit=1)
+        finally:
+            conn.close()
+
+        return jsonify({
+            'success': True,
+            'entry': weight_entry_to_dict(rows[0]) if rows else None
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@pregnancy_bp.route('/api/weight-entries/import-csv', methods=['POST'])
+@login_required
+def import_weight_entries_csv():
+    """
+    Import weight entries from a CSV upload (multipart 'file' or a text/csv body)
+
+    Accepts the export-csv format or date, pregnancy_week, weight,
+    pre_pregnancy_weight, height, notes columns. The file is read in chunks;
+    if any row is invalid nothing is imported and the row errors are returned.
+    """
+    try:
+        from app.services import weight_import
+
+        user_id = session.get('user_id')
+
+        upload = request.files.get('file')
+        if upload is not None:
+            stream = upload.stream
+        elif request.mimetype == 'text/csv':
+            stream = request.stream
         else:
             return jsonify({
-                'success': True,
-                'entry': None
-            })
+                'success': False,
+                'error': 'Upload a CSV file as "file" or send a text/csv body'
+            }), 400
+
+        lines = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+        conn = sqlite3.connect(current_app.config['DATABASE_PATH'])
+        try:
+            imported, error_count, errors = weight_import.import_entries(conn, user_id, lines)
+            if error_count:
+                conn.rollback()
+                return jsonify({
+                    'success': False,
+                    'error': f'{error_count} row(s) are invalid; nothing was imported',
+                    'error_count': error_count,
+                    'errors': errors
+                }), 400
+            conn.commit()
+        except (weight_import.WeightImportError, UnicodeDecodeError, csv.Error) as e:
+            conn.rollback()
+            message = 'File must be UTF-8 encoded CSV' if isinstance(e, UnicodeDecodeError) else str(e)
+            return jsonify({
+                'success': False,
+                'error': message
+            }), 400
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+        return jsonify({
+            'success': True,
+            'message': f'Imported {imported} weight entries',
+            'imported': imported
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@pregnancy_bp.route('/api/weight-trajectory', methods=['GET'])
+@login_required
+def get_weight_trajectory():
+    """Expected IOM gain band by week for the user's BMI category, with their entries placed on it"""
+    try:
+        from app.services import weight_trajectory, downsampling
+
+        user_id = session.get('user_id')
+        points = request.args.get('points', type=int)
+        if points is not None and points < downsampling.MIN_POINTS:
+            return jsonify({
+                'success': False,
+                'error': f'points must be at least {downsampling.MIN_POINTS}'
+            }), 400
+
+        conn = sqlite3.connect(current_app.config['DATABASE_PATH'])
+        conn.row_factory = sqlite3.Row
+
+        try:
+            rows = fetch_weight_entries(conn, user_id, order='pregnancy_week ASC, date ASC')
+        finally:
+            conn.close()
+
+        bmi_category = rows[-1]['bmi_category'] if rows else 'unknown'
+        if points:
+            rows = downsampling.downsample([dict(row) for row in rows], 'pregnancy_week', ['weight_gain'], points)
+
+        return jsonify({
+            'success': True,
+            'bmi_category': bmi_category,
+            'expected_band': weight_trajectory.expected_band(bmi_category),
+            'entries': [{
+                'id': row['id'],
+                'pregnancy_week': row['pregnancy_week'],
+                'weight_gain': row['weight_gain'],
+                'gain_band': {'low': row['gain_band_low'], 'high': row['gain_band_high']},
+                'status': row['gain_status'] or 'unknown'
+            } for row in rows]
+        })
     except Exception as e:
         return jsonify({
             'success': False,
@@ -502,57 +491,38 @@ def get_latest_weight_entry():
 @pregnancy_bp.route('/api/weight-entries/export-csv', methods=['GET'])
 @login_required
 def export_weight_entries_csv():
-    """Export weight entries as CSV"""
+    """Export weight entries as CSV, streamed as rows are read"""
     try:
         user_id = session.get('user_id')
-        
-        conn = sqlite3.connect(current_app.config['DATABASE_PATH'])
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT date, pregnancy_week, weight, pre_pregnancy_weight, 
-                   height, bmi, weight_gain, notes
-            FROM weight_entries
-            WHERE user_id = ?
-            ORDER BY pregnancy_week ASC, date ASC
-        ''', (user_id,))
-        
-        rows = cursor.fetchall()
-        conn.close()
 
-        # Create CSV in memory
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Write header
-        writer.writerow(['Date', 'Pregnancy Week', 'Weight (kg)', 'Pre-pregnancy Weight (kg)', 
-                        'Height (cm)', 'BMI', 'Weight Gain (kg)', 'Status', 'Notes'])
-        
-        # Write data
-        for row in rows:
-            bmi_category = get_bmi_category(row[5])
-            status = get_status(bmi_category, row[6], row[1])
-            
-            writer.writerow([
-                row[0] if row[0] else '',
-                row[1],
-                row[2],
-                row[3] or '',
-                row[4] or '',
-                row[5] or '',
-                row[6] or '',
-                status,
-                row[7] or ''
-            ])
-        
-        # Prepare response
-        output.seek(0)
-        return send_file(
-            io.BytesIO(output.getvalue().encode('utf-8')),
-            mimetype='text/csv',
-            as_attachment=True,
-            download_name=f'weight_tracker_{datetime.now().strftime("%Y%m%d")}.csv'
+        rows = stream_csv(
+            DataManager.get_connection,
+            '''
+                SELECT date, pregnancy_week, weight, pre_pregnancy_weight, height, bmi, weight_gain, gain_status, notes
+                FROM weight_entries
+                WHERE user_id = ?
+                ORDER BY pregnancy_week ASC, date ASC
+            ''',
+            (user_id,),
+            ['Date', 'Pregnancy Week', 'Weight (kg)', 'Pre-pregnancy Weight (kg)',
+             'Height (cm)', 'BMI', 'Weight Gain (kg)', 'Status', 'Notes'],
+            lambda row: [
+                row['date'] if row['date'] else '',
+                row['pregnancy_week'],
+                row['weight'],
+                '' if row['pre_pregnancy_weight'] is None else row['pre_pregnancy_weight'],
+                '' if row['height'] is None else row['height'],
+                '' if row['bmi'] is None else row['bmi'],
+                '' if row['weight_gain'] is None else row['weight_gain'],
+                row['gain_status'] or 'unknown',
+                row['notes'] or ''
+            ]
         )
+
+        response = Response(stream_with_context(rows), mimetype='text/csv')
+        response.headers['Content-Disposition'] = \
+            f'attachment; filename=weight_tracker_{datetime.now().strftime("%Y%m%d")}.csv'
+        return response
     except Exception as e:
         return jsonify({
             'success': False,
@@ -564,8 +534,10 @@ def export_weight_entries_csv():
 @pregnancy_bp.route('/api/medical-reports')
 @login_required
 def get_medical_reports():
-    """Get all medical reports for the current user"""
+    """Report summaries for the current user (full text from the detail endpoint)"""
     try:
+        from app.utils.helpers import report_preview, REPORT_PREVIEW_LENGTH
+
         user_id = session['user_id']
         
         conn = DataManager.get_connection()
@@ -573,12 +545,11 @@ def get_medical_reports():
         
         cursor.execute('''
             SELECT id, doctor_id, doctor_name, report_type, report_date,
-                   findings, recommendations, diagnosis, notes,
-                   created_at, updated_at
+                   SUBSTR(diagnosis, 1, ?), created_at, updated_at
             FROM medical_reports
             WHERE patient_id = ? AND is_active = 1
             ORDER BY report_date DESC, created_at DESC
-        ''', (user_id,))
+        ''', (REPORT_PREVIEW_LENGTH + 1, user_id))
         
         reports = []
         for row in cursor.fetchall():
@@ -588,12 +559,9 @@ def get_medical_reports():
                 'doctor_name': row[2],
                 'report_type': row[3],
                 'report_date': row[4],
-                'findings': row[5],
-                'recommendations': row[6],
-                'diagnosis': row[7],
-                'notes': row[8],
-                'created_at': row[9],
-                'updated_at': row[10]
+                'diagnosis_preview': report_preview(row[5]),
+                'created_at': row[6],
+                'updated_at': row[7]
             }
             reports.append(report)
         
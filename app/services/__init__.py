@@ -4,5 +4,16 @@ Contains service modules for email, notifications, and other business logic
 """
 
 from .email_service import EmailService, email_service
+from .smtp_pool import SMTPConnectionPool
+from .email_templates import EmailTemplateRegistry, email_templates
+from .scheduler import Scheduler, scheduler
+from .availability import AvailabilityEngine, SlotConflictError, availability
+from .doctor_stats import DoctorStatsCache, doctor_stats
+from .worklist import DoctorWorklist, worklist
+from .growth_standards import GrowthStandards, growth_standards
+from .cohort_analytics import CohortAnalytics, cohort_analytics
 
-__all__ = ['EmailService', 'email_service']
+__all__ = ['EmailService', 'email_service', 'SMTPConnectionPool', 'EmailTemplateRegistry', 'email_templates',
+           'Scheduler', 'scheduler', 'AvailabilityEngine', 'SlotConflictError', 'availability',
+           'DoctorStatsCache', 'doctor_stats', 'DoctorWorklist', 'worklist',
+           'GrowthStandards', 'growth_standards', 'CohortAnalytics', 'cohort_analytics']
@@ -0,0 +1,445 @@
+"""
+Appointment Service for the Maternal and Child Health Care System
+Shared appointment queries, projections, bookings and status changes used
+by the patient, baby care and doctor blueprints
+"""
+
+import sqlite3
+import logging
+from datetime import datetime
+
+from app.utils.helpers import parse_appointment_datetime, appointment_datetime_fields
+
+logger = logging.getLogger(__name__)
+
+# Appointments in these states are still going to happen
+ACTIVE_STATUSES = ('pending', 'confirmed', 'rescheduled')
+
+BABY_CARE_FILTER = "a.appointment_type LIKE '%Baby Care%'"
+
+# One projection for every appointment read; patient columns fall back to the
+# booking user when the appointment row does not carry its own copy
+_SELECT = '''
+    SELECT a.id, a.user_id, a.baby_id, a.doctor_id, a.appointment_type, a.appointment_date,
+           a.appointment_day, a.display_date, a.display_time,
+           a.doctor_name, a.clinic_name, a.purpose, a.status, a.notes, a.child_name,
+           a.confirmed_by_doctor, a.reminder_sent, a.completed_at, a.created_at, a.updated_at,
+           COALESCE(a.patient_name, u.full_name) AS patient_name,
+           COALESCE(a.patient_email, u.email) AS patient_email,
+           u.full_name AS patient_full_name, u.phone AS patient_phone,
+           b.name AS baby_name,
+           d.full_name AS doctor_full_name, d.email AS doctor_email
+    FROM appointments a
+    LEFT JOIN users u ON a.user_id = u.id
+    LEFT JOIN babies b ON a.baby_id = b.id
+    LEFT JOIN users d ON a.doctor_id = d.id
+'''
+
+
+def _query(where, params, order_by='a.appointment_date ASC'):
+    from app.data_manager import DataManager
+
+    conn = DataManager.get_connection()
+    conn.row_factory = sqlite3.Row
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f'{_SELECT} WHERE {where} ORDER BY {order_by}', params)
+        return [_to_dict(row) for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+
+def _to_dict(row):
+    appointment = dict(row)
+    appointment['confirmed_by_doctor'] = bool(appointment['confirmed_by_doctor'])
+    return appointment
+
+
+# Reads
+
+def list_for_patient(user_id, baby_care_only=False):
+    """A patient's appointments, newest first (idx_appointments_user_date)"""
+    where = 'a.user_id = ?' + (f' AND {BABY_CARE_FILTER}' if baby_care_only else '')
+    return _query(where, (user_id,), order_by='a.appointment_date DESC')
+
+
+def list_for_doctor(doctor_id, baby_care_only=False):
+    """A doctor's appointments, soonest first (idx_appointments_doctor_date)"""
+    where = 'a.doctor_id = ?' + (f' AND {BABY_CARE_FILTER}' if baby_care_only else '')
+    return _query(where, (doctor_id,), order_by='a.appointment_date ASC, a.created_at DESC')
+
+
+def get_for_doctor(appointment_id, doctor_id):
+    """One appointment if it belongs to the doctor, else None"""
+    rows = _query('a.id = ? AND a.doctor_id = ?', (appointment_id, doctor_id))
+    return rows[0] if rows else None
+
+
+def get_for_patient(appointment_id, user_id):
+    """One appointment if it belongs to the patient, else None"""
+    rows = _query('a.id = ? AND a.user_id = ?', (appointment_id, user_id))
+    return rows[0] if rows else None
+
+
+def get_many_for_doctor(appointment_ids, doctor_id):
+    """Appointments by id that belong to the doctor, keyed by id"""
+    if not appointment_ids:
+        return {}
+    placeholders = ','.join('?' * len(appointment_ids))
+    rows = _query(f'a.doctor_id = ? AND a.id IN ({placeholders})', [doctor_id] + list(appointment_ids))
+    return {row['id']: row for row in rows}
+
+
+# Projections
+
+PATIENT_FIELDS = ('id', 'user_id', 'baby_id', 'appointment_type', 'appointment_date', 'doctor_name',
+                  'clinic_name', 'purpose', 'status', 'notes', 'created_at', 'baby_name',
+                  'doctor_full_name', 'doctor_email')
+
+DOCTOR_FIELDS = ('id', 'user_id', 'baby_id', 'appointment_type', 'appointment_date', 'doctor_name',
+                 'clinic_name', 'purpose', 'status', 'notes', 'patient_name', 'patient_email',
+                 'child_name', 'confirmed_by_doctor', 'created_at', 'updated_at', 'baby_name',
+                 'patient_full_name')
+
+
+def project(appointment, fields):
+    """Pick the response fields for an appointment"""
+    return {field: appointment[field] for field in fields}
+
+
+def schedule_item(appointment):
+    """Doctor schedule view: precomputed display date/time instead of the raw timestamp"""
+    item = project(appointment, DOCTOR_FIELDS)
+    item.update({
+        'appointment_date': appointment['appointment_day'] or appointment['appointment_date'] or 'Not specified',
+        'appointment_time': appointment['display_time'] or 'Not specified',
+        'formatted_date': appointment['display_date'] or appointment['appointment_date'] or 'Not specified',
+        'patient_phone': appointment['patient_phone'],
+        'patient_contact': {
+            'email': appointment['patient_email'] or '',
+            'phone': appointment['patient_phone'] or ''
+        }
+    })
+    return item
+
+
+def email_details(appointment, doctor_name=None, **extra):
+    """Template context for appointment notification emails"""
+    try:
+        start = parse_appointment_datetime(appointment['appointment_date'])
+        date_str, time_str = start.strftime('%Y-%m-%d'), start.strftime('%H:%M')
+    except (TypeError, ValueError):
+        date_str, time_str = appointment['appointment_date'] or 'TBD', 'TBD'
+
+    details = {
+        'appointment_id': appointment['id'],
+        'patient_name': appointment['patient_name'] or 'Patient',
+        'child_name': appointment['child_name'] or 'N/A',
+        'doctor_name': doctor_name or appointment['doctor_full_name'] or appointment['doctor_name'],
+        'appointment_date': date_str,
+        'appointment_time': time_str,
+        'appointment_type': appointment['appointment_type'],
+        'purpose': appointment['purpose'] or 'General consultation',
+        'clinic_name': appointment['clinic_name'] or 'Medical Clinic'
+    }
+    details.update(extra)
+    return details
+
+
+# Writes
+
+# Columns a booking may set besides the ones create() derives
+BOOKING_FIELDS = ('baby_id', 'appointment_type', 'doctor_name', 'clinic_name', 'purpose',
+                  'patient_name', 'patient_email', 'child_name')
+
+
+def create(user_id, doctor_id, start, fields):
+    """
+    Book a pending appointment in a free slot
+
+    Args:
+        user_id: booking patient
+        doctor_id: linked doctor account
+        start: appointment datetime
+        fields: values for BOOKING_FIELDS (missing ones are stored as NULL)
+
+    Returns:
+        The new appointment id
+
+    Raises:
+        SlotConflictError: the doctor already has an appointment at that time
+    """
+    from app.data_manager import DataManager
+    from app.services.availability import availability
+
+    date_fields = appointment_datetime_fields(start)
+    now = datetime.now().isoformat()
+
+    conn = DataManager.get_connection()
+    try:
+        cursor = conn.cursor()
+        # The write lock spans the slot check and the insert
+        cursor.execute('BEGIN IMMEDIATE')
+        availability.check(cursor, doctor_id, start)
+        cursor.execute(f'''
+            INSERT INTO appointments (user_id, doctor_id, appointment_date, appointment_day,
+                                      display_date, display_time, status, created_at, updated_at,
+                                      {', '.join(BOOKING_FIELDS)})
+            VALUES (?, ?, ?, ?, ?, ?, 'pending', ?, ?, {', '.join('?' * len(BOOKING_FIELDS))})
+        ''', [
+            user_id, doctor_id,
+            date_fields['appointment_date'], date_fields['appointment_day'],
+            date_fields['display_date'], date_fields['display_time'],
+            now, now
+        ] + [fields.get(field) for field in BOOKING_FIELDS])
+        appointment_id = cursor.lastrowid
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    availability.add(doctor_id, appointment_id, start)
+    notify_changed([appointment_id], doctor_id)
+    return appointment_id
+
+
+def update(appointment, changes):
+    """
+    Patient edit of their own appointment
+
+    Args:
+        appointment: the current row (get_for_patient)
+        changes: any of 'status', 'notes' and 'appointment_date' (a datetime)
+
+    Returns:
+        Number of rows updated (0 when there was nothing to change)
+
+    Raises:
+        SlotConflictError: the new time, or the slot of a reactivated
+            appointment, is already taken
+    """
+    from app.data_manager import DataManager
+    from app.services.availability import availability
+
+    assignments = {column: changes[column] for column in ('status', 'notes') if column in changes}
+    new_date = changes.get('appointment_date')
+    if new_date:
+        assignments.update(appointment_datetime_fields(new_date))
+        # New time, so the patient should get a fresh reminder
+        assignments.update(reminder_sent=0, reminder_claimed_at=None)
+    if not assignments:
+        return 0
+    assignments['updated_at'] = datetime.now().isoformat()
+
+    # A new time, or a cancelled appointment being reactivated, must claim a free slot
+    appointment_id, doctor_id = appointment['id'], appointment['doctor_id']
+    active = assignments.get('status', appointment['status']) in ACTIVE_STATUSES
+    slot_start = new_date
+    if active and not slot_start and appointment['status'] not in ACTIVE_STATUSES:
+        slot_start = parse_appointment_datetime(appointment['appointment_date'])
+
+    conn = DataManager.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        if active and slot_start:
+            availability.check(cursor, doctor_id, slot_start, exclude_id=appointment_id)
+        cursor.execute(f'''
+            UPDATE appointments
+            SET {', '.join(f'{column} = ?' for column in assignments)}
+            WHERE id = ? AND user_id = ?
+        ''', list(assignments.values()) + [appointment_id, appointment['user_id']])
+        count = cursor.rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    if not active:
+        availability.remove(appointment_id)
+    elif slot_start:
+        availability.add(doctor_id, appointment_id, slot_start)
+
+    notify_changed([appointment_id], doctor_id)
+    return count
+
+
+def confirm_by_patient(appointment_id, user_id):
+    """Patient confirms their own appointment; False if it is not theirs"""
+    from app.data_manager import DataManager
+
+    conn = DataManager.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE appointments
+            SET status = 'confirmed', updated_at = ?
+            WHERE id = ? AND user_id = ?
+            RETURNING doctor_id
+        ''', (datetime.now().isoformat(), appointment_id, user_id))
+        row = cursor.fetchone()
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    if not row:
+        return False
+    notify_changed([appointment_id], row[0])
+    return True
+
+
+def conflict_error(error):
+    """409 response body for a SlotConflictError, with the doctor's free slots that day"""
+    from app.services.availability import availability
+
+    return {
+        'success': False,
+        'error': 'This time slot is already booked. Please choose another time.',
+        'available_slots': [slot.strftime('%H:%M') for slot in
+                            availability.free_slots(error.doctor_id, error.start.date())]
+    }
+
+
+def confirm(appointment_ids, doctor_id=None):
+    """Mark appointments as confirmed by the doctor"""
+    now = datetime.now().isoformat()
+    return _execute_many('''
+        UPDATE appointments
+        SET status = 'confirmed', confirmed_by_doctor = 1, updated_at = ?
+        WHERE id = ?
+    ''', [(now, appointment_id) for appointment_id in _as_list(appointment_ids)], doctor_id)
+
+
+def complete(appointment_ids, notes='', doctor_id=None):
+    """Mark appointments as completed and free their slots"""
+    now = datetime.now().isoformat()
+    appointment_ids = _as_list(appointment_ids)
+    count = _execute_many('''
+        UPDATE appointments
+        SET status = 'completed', notes = ?, completed_at = ?, updated_at = ?
+        WHERE id = ?
+    ''', [(notes, now, now, appointment_id) for appointment_id in appointment_ids], doctor_id)
+    _release_slots(appointment_ids)
+    return count
+
+
+def cancel(appointment_ids, notes=None, doctor_id=None):
+    """Cancel appointments and free their slots (notes are kept when not given)"""
+    now = datetime.now().isoformat()
+    appointment_ids = _as_list(appointment_ids)
+    count = _execute_many('''
+        UPDATE appointments
+        SET status = 'cancelled', notes = COALESCE(?, notes), updated_at = ?
+        WHERE id = ?
+    ''', [(notes, now, appointment_id) for appointment_id in appointment_ids], doctor_id)
+    _release_slots(appointment_ids)
+    return count
+
+
+def reschedule(new_times, doctor_id):
+    """
+    Move a doctor's appointments to new times ({appointment_id: datetime})
+
+    Every new slot is checked against the database in the same transaction
+    as the updates; appointments whose new slot is taken stay where they are.
+
+    Returns:
+        {appointment_id: SlotConflictError} for the appointments not moved
+    """
+    from app.data_manager import DataManager
+    from app.services.availability import availability, SlotConflictError
+
+    if not new_times:
+        return {}
+
+    now = datetime.now().isoformat()
+    conflicts = {}
+    conn = DataManager.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        for appointment_id, new_datetime in new_times.items():
+            try:
+                availability.check(cursor, doctor_id, new_datetime, exclude_id=appointment_id)
+            except SlotConflictError as e:
+                conflicts[appointment_id] = e
+                continue
+            # Later checks in the batch see this move, so two can't land on one slot
+            date_fields = appointment_datetime_fields(new_datetime)
+            cursor.execute('''
+                UPDATE appointments
+                SET appointment_date = ?, appointment_day = ?, display_date = ?, display_time = ?,
+                    status = 'rescheduled', reminder_sent = 0, reminder_claimed_at = NULL, updated_at = ?
+                WHERE id = ?
+            ''', (
+                date_fields['appointment_date'],
+                date_fields['appointment_day'],
+                date_fields['display_date'],
+                date_fields['display_time'],
+                now,
+                appointment_id
+            ))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    moved = [appointment_id for appointment_id in new_times if appointment_id not in conflicts]
+    for appointment_id in moved:
+        availability.add(doctor_id, appointment_id, new_times[appointment_id])
+    if moved:
+        notify_changed(moved, doctor_id)
+    return conflicts
+
+
+def _as_list(appointment_ids):
+    return list(appointment_ids) if isinstance(appointment_ids, (list, tuple, set)) else [appointment_ids]
+
+
+def _execute_many(sql, rows, doctor_id):
+    """Run one statement for every row in a single transaction"""
+    from app.data_manager import DataManager
+
+    if not rows:
+        return 0
+
+    conn = DataManager.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.executemany(sql, rows)
+        count = cursor.rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    notify_changed([row[-1] for row in rows], doctor_id)
+    return count
+
+
+def notify_changed(appointment_ids, doctor_id=None):
+    """Appointment event: refresh the in-memory views derived from appointment rows"""
+    from app.services.doctor_stats import doctor_stats
+    from app.services.worklist import worklist
+
+    if doctor_id is not None:
+        doctor_stats.invalidate(doctor_id)
+    worklist.refresh_appointments(appointment_ids)
+
+
+def _release_slots(appointment_ids):
+    from app.services.availability import availability
+
+    for appointment_id in appointment_ids:
+        availability.remove(appointment_id)
@@ -0,0 +1,301 @@
+"""
+Doctor Availability Engine for the Maternal and Child Health Care System
+Keeps an in-memory, per-doctor sorted index of booked slots (rebuilt from
+SQLite at startup) to answer free-slot queries; double bookings are rejected
+against the database inside the writing transaction
+"""
+
+import bisect
+import logging
+import threading
+from datetime import datetime, date, time, timedelta
+
+from app.services.appointments import ACTIVE_STATUSES
+from app.utils.helpers import parse_appointment_datetime
+
+logger = logging.getLogger(__name__)
+
+
+class SlotConflictError(Exception):
+    """Raised when a requested time overlaps an existing booking"""
+
+    def __init__(self, doctor_id, start, conflicting_id):
+        self.doctor_id = doctor_id
+        self.start = start
+        self.conflicting_id = conflicting_id
+        super().__init__(f"Doctor {doctor_id} already has an appointment at {start.strftime('%Y-%m-%d %H:%M')}")
+
+
+def _minute(value):
+    """Minutes since 0001-01-01 for a naive datetime (cheap integer sort key)"""
+    return value.toordinal() * 1440 + value.hour * 60 + value.minute
+
+
+def _from_minute(minute):
+    day, minute_of_day = divmod(minute, 1440)
+    return datetime.combine(date.fromordinal(day), time(minute_of_day // 60, minute_of_day % 60))
+
+
+class _DoctorIndex:
+    """Sorted booked intervals for one doctor"""
+
+    def __init__(self):
+        self.starts = []    # sorted start minutes, parallel to entries
+        self.entries = []   # (start, end, appointment_id)
+        self.max_length = 0
+
+    def add(self, start, end, appointment_id):
+        position = bisect.bisect_left(self.starts, start)
+        self.starts.insert(position, start)
+        self.entries.insert(position, (start, end, appointment_id))
+        self.max_length = max(self.max_length, end - start)
+
+    def remove(self, start, appointment_id):
+        position = bisect.bisect_left(self.starts, start)
+        while position < len(self.starts) and self.starts[position] == start:
+            if self.entries[position][2] == appointment_id:
+                del self.starts[position]
+                del self.entries[position]
+                return
+            position += 1
+
+    def find_overlap(self, start, end, exclude_id=None):
+        """Binary search for any interval overlapping [start, end)"""
+        # Only intervals starting before `end` and after `start - max_length` can overlap
+        position = bisect.bisect_left(self.starts, end)
+        lower = start - self.max_length
+        while position > 0:
+            position -= 1
+            entry_start, entry_end, appointment_id = self.entries[position]
+            if entry_start <= lower:
+                break
+            if entry_end > start and appointment_id != exclude_id:
+                return appointment_id
+        return None
+
+
+class AvailabilityEngine:
+    """Working hours, slot lengths and booked-slot index for every doctor"""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.default_start = time(9, 0)
+        self.default_end = time(17, 0)
+        self.default_slot_minutes = 30
+        self.default_working_days = [0, 1, 2, 3, 4]  # Monday-Friday
+        self._settings = {}      # doctor_id -> settings dict
+        self._indexes = {}       # doctor_id -> _DoctorIndex
+        self._appointments = {}  # appointment_id -> (doctor_id, start, end)
+
+    def init_app(self, app):
+        """Read defaults from config and build the index from the database"""
+        self.default_start = _parse_time(app.config.get('DOCTOR_DAY_START', '09:00'))
+        self.default_end = _parse_time(app.config.get('DOCTOR_DAY_END', '17:00'))
+        self.default_slot_minutes = int(app.config.get('DOCTOR_SLOT_MINUTES', 30))
+        self.default_working_days = _parse_days(app.config.get('DOCTOR_WORKING_DAYS', '0,1,2,3,4'))
+        with app.app_context():
+            self.rebuild()
+
+    def rebuild(self):
+        """Reload working hours and all current/future active bookings from SQLite"""
+        from app.data_manager import DataManager
+
+        conn = DataManager.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute('''
+                SELECT doctor_id, start_time, end_time, slot_minutes, working_days
+                FROM doctor_availability
+            ''')
+            settings = {}
+            for doctor_id, start_time, end_time, slot_minutes, working_days in cursor.fetchall():
+                settings[doctor_id] = {
+                    'start_time': _parse_time(start_time),
+                    'end_time': _parse_time(end_time),
+                    'slot_minutes': slot_minutes,
+                    'working_days': _parse_days(working_days)
+                }
+
+            placeholders = ','.join('?' * len(ACTIVE_STATUSES))
+            cursor.execute(f'''
+                SELECT id, doctor_id, appointment_date
+                FROM appointments
+                WHERE doctor_id IS NOT NULL
+                  AND status IN ({placeholders})
+                  AND appointment_date >= ?
+            ''', ACTIVE_STATUSES + (date.today().isoformat(),))
+            rows = cursor.fetchall()
+        finally:
+            conn.close()
+
+        with self.lock:
+            self._settings = settings
+            self._indexes = {}
+            self._appointments = {}
+            for appointment_id, doctor_id, appointment_date in rows:
+                try:
+                    self.add(doctor_id, appointment_id, parse_appointment_datetime(appointment_date))
+                except (ValueError, TypeError):
+                    continue
+
+        logger.info(f"🗓️ Availability index loaded: {len(self._appointments)} bookings, {len(self._indexes)} doctors")
+
+    # Working hours
+
+    def get_settings(self, doctor_id):
+        """Working hours and slot length for a doctor (defaults when unset)"""
+        return self._settings.get(doctor_id, {
+            'start_time': self.default_start,
+            'end_time': self.default_end,
+            'slot_minutes': self.default_slot_minutes,
+            'working_days': self.default_working_days
+        })
+
+    def set_settings(self, doctor_id, start_time, end_time, slot_minutes, working_days):
+        """Persist and apply a doctor's working hours"""
+        from app.data_manager import DataManager
+
+        start = _parse_time(start_time)
+        end = _parse_time(end_time)
+        days = _parse_days(working_days)
+        if end <= start:
+            raise ValueError('End time must be after start time')
+        if not 5 <= int(slot_minutes) <= 240:
+            raise ValueError('Slot length must be between 5 and 240 minutes')
+
+        conn = DataManager.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute('''
+                INSERT INTO doctor_availability (doctor_id, start_time, end_time, slot_minutes, working_days, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(doctor_id) DO UPDATE SET
+                    start_time = excluded.start_time,
+                    end_time = excluded.end_time,
+                    slot_minutes = excluded.slot_minutes,
+                    working_days = excluded.working_days,
+                    updated_at = excluded.updated_at
+            ''', (
+                doctor_id,
+                start.strftime('%H:%M'),
+                end.strftime('%H:%M'),
+                int(slot_minutes),
+                ','.join(str(day) for day in days),
+                datetime.now().isoformat()
+            ))
+            conn.commit()
+        finally:
+            conn.close()
+
+        with self.lock:
+            self._settings[doctor_id] = {
+                'start_time': start,
+                'end_time': end,
+                'slot_minutes': int(slot_minutes),
+                'working_days': days
+            }
+        return self.get_settings(doctor_id)
+
+    # Booked-slot index
+
+    def add(self, doctor_id, appointment_id, start):
+        """Record a booking"""
+        if doctor_id is None:
+            return
+        with self.lock:
+            self.remove(appointment_id)
+            begin = _minute(start)
+            end = begin + self.get_settings(doctor_id)['slot_minutes']
+            self._indexes.setdefault(doctor_id, _DoctorIndex()).add(begin, end, appointment_id)
+            self._appointments[appointment_id] = (doctor_id, begin, end)
+
+    def remove(self, appointment_id):
+        """Forget a booking (cancelled, completed or moved)"""
+        with self.lock:
+            booking = self._appointments.pop(appointment_id, None)
+            if booking:
+                doctor_id, begin, _ = booking
+                self._indexes[doctor_id].remove(begin, appointment_id)
+
+    def check(self, cursor, doctor_id, start, exclude_id=None):
+        """
+        Raise SlotConflictError if an active booking in the database overlaps
+        the slot starting at `start`
+
+        Run it on the writing connection after BEGIN IMMEDIATE, so the check and
+        the INSERT/UPDATE are one transaction: SQLite admits one writer at a
+        time, so no other worker or process can claim the slot in between.
+        """
+        if doctor_id is None:
+            return
+
+        cursor.execute('SELECT slot_minutes FROM doctor_availability WHERE doctor_id = ?', (doctor_id,))
+        row = cursor.fetchone()
+        slot = row[0] if row else self.default_slot_minutes
+        begin = _minute(start)
+
+        # Date-prefix bounds use idx_appointments_doctor_date whatever the stored time format
+        placeholders = ','.join('?' * len(ACTIVE_STATUSES))
+        cursor.execute(f'''
+            SELECT id, appointment_date
+            FROM appointments
+            WHERE doctor_id = ?
+              AND appointment_date >= ? AND appointment_date < ?
+              AND status IN ({placeholders})
+              AND id IS NOT ?
+        ''', (
+            doctor_id,
+            (start - timedelta(minutes=slot)).strftime('%Y-%m-%d'),
+            (start + timedelta(minutes=slot) + timedelta(days=1)).strftime('%Y-%m-%d')
+        ) + ACTIVE_STATUSES + (exclude_id,))
+        for appointment_id, appointment_date in cursor.fetchall():
+            try:
+                booked = parse_appointment_datetime(appointment_date)
+            except (ValueError, TypeError):
+                continue
+            if abs(_minute(booked) - begin) < slot:
+                # Another worker booked it; let this worker's free_slots see it too
+                self.add(doctor_id, appointment_id, booked)
+                raise SlotConflictError(doctor_id, start, appointment_id)
+
+    def free_slots(self, doctor_id, day):
+        """List bookable slot start times for a doctor on a given date"""
+        settings = self.get_settings(doctor_id)
+        if day.weekday() not in settings['working_days']:
+            return []
+
+        slot = settings['slot_minutes']
+        begin = _minute(datetime.combine(day, settings['start_time']))
+        end = _minute(datetime.combine(day, settings['end_time']))
+        earliest = _minute(datetime.now()) if day == date.today() else begin
+
+        slots = []
+        with self.lock:
+            index = self._indexes.get(doctor_id)
+            for start in range(begin, end - slot + 1, slot):
+                if start < earliest:
+                    continue
+                if index and index.find_overlap(start, start + slot) is not None:
+                    continue
+                slots.append(_from_minute(start))
+        return slots
+
+
+def _parse_time(value):
+    if isinstance(value, time):
+        return value
+    return datetime.strptime(str(value).strip(), '%H:%M').time()
+
+
+def _parse_days(value):
+    if isinstance(value, (list, tuple)):
+        days = [int(day) for day in value]
+    else:
+        days = [int(day) for day in str(value).split(',') if day.strip()]
+    if any(day < 0 or day > 6 for day in days):
+        raise ValueError('Working days must be weekday numbers 0 (Monday) to 6 (Sunday)')
+    return sorted(set(days))
+
+
+# Global availability engine instance
+availability = AvailabilityEngine()
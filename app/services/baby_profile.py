@@ -0,0 +1,120 @@
+"""
+Baby Profile for the Maternal and Child Health Care System
+One statement builds a baby's profile (baby, parent, recent records, upcoming
+appointments and counts) as JSON with SQLite's json_object/json_group_array
+"""
+
+import sqlite3
+from datetime import datetime
+
+# Every column of each table, as the endpoints returned with SELECT *
+VACCINATION_COLUMNS = ('id', 'baby_id', 'vaccine_name', 'scheduled_date', 'administered_date', 'status',
+                       'doctor_name', 'clinic_name', 'notes', 'created_at')
+GROWTH_COLUMNS = ('id', 'baby_id', 'record_date', 'age_months', 'age_days', 'weight', 'height',
+                  'head_circumference', 'doctor_name', 'notes', 'created_at', 'weight_z', 'height_z', 'head_z',
+                  'weight_velocity', 'height_velocity', 'head_velocity', 'weight_trend', 'height_trend',
+                  'head_trend', 'percentile_crossings', 'metrics_updated_at')
+NUTRITION_COLUMNS = ('id', 'baby_id', 'record_date', 'feeding_type', 'amount', 'frequency', 'notes', 'created_at')
+APPOINTMENT_COLUMNS = ('id', 'user_id', 'baby_id', 'doctor_id', 'appointment_type', 'appointment_date',
+                       'doctor_name', 'clinic_name', 'purpose', 'status', 'notes', 'patient_name', 'patient_email',
+                       'child_name', 'reminder_sent', 'confirmed_by_doctor', 'completed_at', 'created_at',
+                       'updated_at', 'appointment_day', 'display_date', 'display_time')
+
+
+def _object(columns, alias='r'):
+    return 'json_object(' + ', '.join(f"'{column}', {alias}.{column}" for column in columns) + ')'
+
+
+def _records(table, columns, where, order):
+    # json() keeps the array as JSON once it leaves the scalar subquery;
+    # :limit is -1 for every row
+    return f'''json((SELECT json_group_array({_object(columns)}) FROM (
+                    SELECT * FROM {table} WHERE {where} ORDER BY {order} LIMIT :limit) r))'''
+
+
+# The whole response body is built here, so the route returns the JSON text as is
+_PROFILE_SQL = f'''
+    WITH target AS (
+        SELECT * FROM babies
+        WHERE is_active = 1 AND (id = :baby_id OR unique_id = :unique_id)
+        LIMIT 1
+    ),
+    counts AS (
+        SELECT (SELECT COUNT(*) FROM vaccinations WHERE baby_id = t.id) AS vaccinations,
+               (SELECT COUNT(*) FROM vaccinations WHERE baby_id = t.id AND status = 'completed')
+                   AS completed_vaccinations,
+               (SELECT COUNT(*) FROM growth_records WHERE baby_id = t.id) AS growth_records,
+               (SELECT COUNT(*) FROM nutrition_records WHERE baby_id = t.id) AS nutrition_records,
+               (SELECT COUNT(*) FROM appointments WHERE baby_id = t.id) AS appointments
+        FROM target t
+    )
+    SELECT b.id, b.name, b.parent_id,
+           (SELECT role FROM users WHERE id = :viewer_id) AS viewer_role,
+           json_object(
+               'success', json('true'),
+               'baby', json_object(
+                   'id', b.id, 'name', b.name,
+                   'birth_date', b.birth_date, 'date_of_birth', b.birth_date,
+                   'gender', b.gender, 'weight_at_birth', b.weight_at_birth,
+                   'height_at_birth', b.height_at_birth, 'blood_type', b.blood_type,
+                   'parent_id', b.parent_id, 'unique_id', b.unique_id,
+                   'notes', b.notes, 'created_at', b.created_at,
+                   'parent_name', p.full_name, 'parent_email', p.email, 'parent_phone', p.phone
+               ),
+               :records_key, json_object(
+                   'vaccinations', {_records('vaccinations', VACCINATION_COLUMNS,
+                                             'baby_id = b.id', 'scheduled_date DESC')},
+                   'growth_records', {_records('growth_records', GROWTH_COLUMNS,
+                                               'baby_id = b.id', 'record_date DESC')},
+                   'nutrition_records', {_records('nutrition_records', NUTRITION_COLUMNS,
+                                                  'baby_id = b.id', 'record_date DESC')},
+                   'upcoming_appointments', {_records('appointments', APPOINTMENT_COLUMNS,
+                                                      'baby_id = b.id AND appointment_date > :now',
+                                                      'appointment_date')}
+               ),
+               'statistics', json_object(
+                   'vaccination_progress', json_object(
+                       'total', c.vaccinations,
+                       'completed', c.completed_vaccinations,
+                       'percentage', CASE WHEN c.vaccinations > 0
+                                          THEN c.completed_vaccinations * 100.0 / c.vaccinations ELSE 0 END
+                   ),
+                   'total_records', json_object(
+                       'vaccinations', c.vaccinations,
+                       'growth_records', c.growth_records,
+                       'nutrition_records', c.nutrition_records,
+                       'appointments', c.appointments
+                   )
+               ),
+               'message', 'Successfully loaded data for ' || b.name
+           ) AS profile
+    FROM target b
+    JOIN counts c
+    LEFT JOIN users p ON p.id = b.parent_id
+'''
+
+
+def fetch_profile(conn, viewer_id, records_key, baby_id=None, unique_id=None, limit=None):
+    """
+    The baby's profile in a single query, by id or unique ID
+
+    Args:
+        viewer_id: user requesting it; their role is returned for the access check
+        records_key: response key holding the record lists
+        limit: newest records per list (None for all)
+
+    Returns:
+        Row with id, name, parent_id, viewer_role and profile (the response
+        body as JSON text), or None when there is no such active baby
+    """
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    cursor.execute(_PROFILE_SQL, {
+        'viewer_id': viewer_id,
+        'records_key': records_key,
+        'baby_id': baby_id,
+        'unique_id': unique_id,
+        'limit': -1 if limit is None else limit,
+        'now': datetime.now().isoformat()
+    })
+    return cursor.fetchone()
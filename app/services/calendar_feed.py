@@ -0,0 +1,221 @@
+"""
+Doctor Calendar Feed for the Maternal and Child Health Care System
+Streams a doctor's appointments as an iCalendar (.ics) feed that calendar
+apps can subscribe to through a signed, session-less URL
+"""
+
+import hashlib
+import hmac
+import logging
+import secrets
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+from itsdangerous import URLSafeSerializer, BadSignature
+
+from app.utils.helpers import parse_appointment_datetime
+
+logger = logging.getLogger(__name__)
+
+# Appointments older than this are left out of the feed
+PAST_DAYS = 90
+FETCH_SIZE = 200
+
+_STATUS_MAP = {
+    'pending': 'TENTATIVE',
+    'rescheduled': 'TENTATIVE',
+    'confirmed': 'CONFIRMED',
+    'completed': 'CONFIRMED',
+    'cancelled': 'CANCELLED'
+}
+
+
+def _serializer():
+    return URLSafeSerializer(current_app.config['SECRET_KEY'], salt='doctor-calendar-feed')
+
+
+def make_feed_token(doctor_id, regenerate=False):
+    """
+    Signed token identifying a doctor's feed (calendar apps cannot send session cookies)
+
+    The token carries the doctor's random feed key, so a leaked URL is
+    revoked by regenerating the key instead of rotating SECRET_KEY.
+    """
+    from app.data_manager import DataManager
+
+    conn = DataManager.get_connection()
+    try:
+        cursor = conn.cursor()
+        if regenerate:
+            cursor.execute('DELETE FROM doctor_calendar_feeds WHERE doctor_id = ?', (doctor_id,))
+        cursor.execute('''
+            INSERT OR IGNORE INTO doctor_calendar_feeds (doctor_id, feed_key, created_at)
+            VALUES (?, ?, ?)
+        ''', (doctor_id, secrets.token_urlsafe(16), datetime.now().isoformat()))
+        cursor.execute('SELECT feed_key FROM doctor_calendar_feeds WHERE doctor_id = ?', (doctor_id,))
+        feed_key = cursor.fetchone()[0]
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    if regenerate:
+        logger.info(f"📅 Calendar feed key regenerated for doctor {doctor_id}")
+    return _serializer().dumps({'doctor_id': doctor_id, 'key': feed_key})
+
+
+def load_feed_token(token):
+    """Doctor id from a feed token, or None if the signature is invalid or the key was replaced"""
+    from app.data_manager import DataManager
+
+    try:
+        payload = _serializer().loads(token)
+        doctor_id, feed_key = int(payload['doctor_id']), payload['key']
+    except (BadSignature, KeyError, TypeError, ValueError):
+        return None
+
+    conn = DataManager.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('SELECT feed_key FROM doctor_calendar_feeds WHERE doctor_id = ?', (doctor_id,))
+        row = cursor.fetchone()
+    finally:
+        conn.close()
+
+    if not row or not hmac.compare_digest(row[0], str(feed_key)):
+        return None
+    return doctor_id
+
+
+def feed_etag(doctor_id, doctor_name, slot_minutes=30):
+    """
+    ETag for a doctor's feed from the latest appointment change
+
+    MAX(updated_at) moves on every edit; COUNT(*) catches deletions. The
+    calendar name and slot length (each event's DTEND) are hashed in too,
+    since generate_ics renders them. One aggregate over the doctor's
+    idx_appointments_doctor_date range, so a 304 costs far less than
+    rendering the feed.
+    """
+    from app.data_manager import DataManager
+
+    conn = DataManager.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT MAX(updated_at), COUNT(*)
+            FROM appointments
+            WHERE doctor_id = ? AND appointment_date >= ?
+        ''', (doctor_id, _window_start()))
+        last_updated, count = cursor.fetchone()
+    finally:
+        conn.close()
+
+    return hashlib.sha1(
+        f'{doctor_id}:{last_updated}:{count}:{slot_minutes}:{doctor_name}'.encode()).hexdigest()
+
+
+def generate_ics(doctor_id, doctor_name, slot_minutes=30):
+    """Yield the feed line by line, reading appointments in FETCH_SIZE batches"""
+    from app.data_manager import DataManager
+
+    yield _line('BEGIN:VCALENDAR')
+    yield _line('VERSION:2.0')
+    yield _line('PRODID:-//Maternal and Child Health Care System//Doctor Appointments//EN')
+    yield _line('CALSCALE:GREGORIAN')
+    yield _line('METHOD:PUBLISH')
+    yield _line(f'X-WR-CALNAME:{_escape(f"Appointments - {doctor_name}")}')
+
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    conn = DataManager.get_connection()
+    conn.row_factory = sqlite3.Row
+    try:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT a.id, a.appointment_date, a.appointment_type, a.status, a.purpose, a.notes,
+                   a.clinic_name, a.child_name, a.updated_at,
+                   COALESCE(a.patient_name, u.full_name) AS patient_name
+            FROM appointments a
+            LEFT JOIN users u ON a.user_id = u.id
+            WHERE a.doctor_id = ? AND a.appointment_date >= ?
+            ORDER BY a.appointment_date
+        ''', (doctor_id, _window_start()))
+
+        while True:
+            rows = cursor.fetchmany(FETCH_SIZE)
+            if not rows:
+                break
+            for row in rows:
+                yield from _event(row, stamp, slot_minutes)
+    finally:
+        conn.close()
+
+    yield _line('END:VCALENDAR')
+
+
+def _event(row, stamp, slot_minutes):
+    try:
+        start = parse_appointment_datetime(row['appointment_date'])
+    except (TypeError, ValueError):
+        logger.warning(f"⚠️ Skipping appointment {row['id']} with unparseable date in calendar feed")
+        return
+
+    summary = f"{row['appointment_type']} - {row['patient_name'] or 'Patient'}"
+    description = '\n'.join(part for part in (
+        f"Purpose: {row['purpose']}" if row['purpose'] else None,
+        f"Child: {row['child_name']}" if row['child_name'] else None,
+        f"Status: {row['status']}",
+        f"Notes: {row['notes']}" if row['notes'] else None
+    ) if part)
+
+    yield _line('BEGIN:VEVENT')
+    yield _line(f"UID:appointment-{row['id']}@maternal-care")
+    yield _line(f'DTSTAMP:{stamp}')
+    yield _line(f"DTSTART:{start.strftime('%Y%m%dT%H%M%S')}")
+    yield _line(f"DTEND:{(start + timedelta(minutes=slot_minutes)).strftime('%Y%m%dT%H%M%S')}")
+    yield _line(f'SUMMARY:{_escape(summary)}')
+    yield _line(f'DESCRIPTION:{_escape(description)}')
+    if row['clinic_name']:
+        yield _line(f"LOCATION:{_escape(row['clinic_name'])}")
+    yield _line(f"STATUS:{_STATUS_MAP.get(row['status'], 'TENTATIVE')}")
+    if row['updated_at']:
+        try:
+            # updated_at is server local time; iCalendar wants UTC here
+            modified = parse_appointment_datetime(row['updated_at']).astimezone(timezone.utc)
+            yield _line(f"LAST-MODIFIED:{modified.strftime('%Y%m%dT%H%M%SZ')}")
+        except ValueError:
+            pass
+    yield _line('END:VEVENT')
+
+
+def _window_start():
+    return (datetime.now() - timedelta(days=PAST_DAYS)).strftime('%Y-%m-%d')
+
+
+def _escape(text):
+    """Escape TEXT values per RFC 5545"""
+    return (str(text).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def _line(content):
+    """Fold a content line to 75 octets and terminate it with CRLF"""
+    encoded = content.encode('utf-8')
+    if len(encoded) <= 75:
+        return content + '\r\n'
+
+    parts = []
+    current = b''
+    limit = 75
+    for char in content:
+        char_bytes = char.encode('utf-8')
+        if len(current) + len(char_bytes) > limit:
+            parts.append(current.decode('utf-8'))
+            current = b''
+            limit = 74  # continuation lines start with a space
+        current += char_bytes
+    parts.append(current.decode('utf-8'))
+    return '\r\n '.join(parts) + '\r\n'
@@ -0,0 +1,275 @@
+"""
+Cohort Analytics for the Maternal and Child Health Care System
+Columnar NumPy snapshots of weight_entries and growth_records, saved as .npy
+files and memory-mapped, for population percentile curves on admin dashboards
+"""
+
+import os
+import json
+import shutil
+import sqlite3
+import logging
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from app.services.growth_standards import ages_in_months
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PERCENTILES = (10, 25, 50, 75, 90)
+
+# Baby sexes stored as small integers in the snapshot
+GENDERS = ('male', 'female', 'other')
+
+# Snapshot name -> column dtypes; arrays are kept sorted by id so changed
+# rows can be merged in place
+SNAPSHOTS = {
+    'pregnancy': {'id': np.int64, 'week': np.int16, 'weight_gain': np.float32},
+    'growth': {'id': np.int64, 'gender': np.int8, 'age_months': np.float32, 'weight': np.float32}
+}
+
+_ROWS_SQL = {
+    'pregnancy': '''
+        SELECT id, pregnancy_week, weight_gain, trajectory_updated_at AS stamp
+        FROM weight_entries
+        WHERE weight_gain IS NOT NULL {delta}
+    ''',
+    'growth': '''
+        SELECT g.id, b.gender, b.birth_date, g.record_date, g.age_months, g.weight,
+               g.metrics_updated_at AS stamp
+        FROM growth_records g
+        JOIN babies b ON g.baby_id = b.id
+        WHERE b.is_active = 1 AND g.weight IS NOT NULL {delta}
+    '''
+}
+
+# Rows changed since the last refresh, by the stamp every write sets;
+# rows never stamped are always re-read
+_DELTA = {
+    'pregnancy': 'AND (trajectory_updated_at > :mark OR trajectory_updated_at IS NULL)',
+    'growth': 'AND (g.metrics_updated_at > :mark OR g.metrics_updated_at IS NULL)'
+}
+
+
+class CohortAnalytics:
+    """Memory-mapped columnar snapshots with incremental refresh"""
+
+    def __init__(self):
+        self.snapshot_dir = None
+        self._arrays = {}   # snapshot name -> {column: array}
+        self._meta = {}     # snapshot name -> {'mark', 'rows', 'refreshed_at'}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.snapshot_dir = app.config['COHORT_SNAPSHOT_DIR']
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+
+    # Queries
+
+    def pregnancy_gain_curve(self, percentiles=DEFAULT_PERCENTILES):
+        """Weight gain percentiles (kg) by pregnancy week"""
+        arrays = self._snapshot('pregnancy')
+        return _grouped_percentiles(arrays['week'], arrays['weight_gain'], percentiles, 'week')
+
+    def baby_weight_curve(self, gender=None, percentiles=DEFAULT_PERCENTILES):
+        """Baby weight percentiles (kg) by whole month of age, for one gender or all"""
+        arrays = self._snapshot('growth')
+        ages = arrays['age_months']
+        keep = ~np.isnan(ages) & (ages >= 0)
+        if gender is not None:
+            keep &= arrays['gender'] == GENDERS.index(gender)
+        return _grouped_percentiles(np.floor(ages[keep]).astype(np.int16), arrays['weight'][keep],
+                                    percentiles, 'age_months')
+
+    def status(self):
+        self._snapshot('pregnancy')
+        self._snapshot('growth')
+        return {name: dict(meta) for name, meta in self._meta.items()}
+
+    # Refresh
+
+    def refresh(self, full=False):
+        """Scheduled job: merge rows changed since the last refresh into each snapshot"""
+        changed = 0
+        with self._lock:
+            for name in SNAPSHOTS:
+                changed += self._refresh(name, full)
+        return changed
+
+    def _refresh(self, name, full):
+        from app.data_manager import DataManager
+
+        started = time.monotonic()
+        arrays = None if full else self._load(name)
+        meta = self._meta.get(name) if arrays is not None else None
+
+        conn = DataManager.get_connection()
+        conn.row_factory = sqlite3.Row
+        try:
+            cursor = conn.cursor()
+            if meta is None:
+                cursor.execute(_ROWS_SQL[name].format(delta=''))
+            else:
+                cursor.execute(_ROWS_SQL[name].format(delta=_DELTA[name]), {'mark': meta['mark']})
+            rows = cursor.fetchall()
+
+            delta = self._columns(name, rows)
+            if meta is None:
+                arrays = delta
+            else:
+                arrays = _merge(arrays, delta)
+                # Deletes and deactivated babies leave no stamp; a count mismatch
+                # means rows are gone, so fall back to a full rebuild
+                cursor.execute(f"SELECT COUNT(*) FROM ({_ROWS_SQL[name].format(delta='')})")
+                if cursor.fetchone()[0] != len(arrays['id']):
+                    cursor.execute(_ROWS_SQL[name].format(delta=''))
+                    rows = cursor.fetchall()
+                    arrays = self._columns(name, rows)
+                    meta = None
+        finally:
+            conn.close()
+
+        stamps = [row['stamp'] for row in rows if row['stamp']]
+        mark = max(stamps + ([meta['mark']] if meta else []), default='')
+        self._save(name, arrays, {
+            'mark': mark,
+            'rows': int(len(arrays['id'])),
+            'refreshed_at': datetime.now().isoformat()
+        })
+        logger.info(f"📊 {'Rebuilt' if meta is None else 'Refreshed'} {name} cohort snapshot: "
+                    f"{len(rows)} rows read, {len(arrays['id'])} total in "
+                    f"{(time.monotonic() - started) * 1000:.0f} ms")
+        return len(rows)
+
+    def _columns(self, name, rows):
+        if name == 'pregnancy':
+            values = {
+                'id': [row['id'] for row in rows],
+                'week': [row['pregnancy_week'] for row in rows],
+                'weight_gain': [row['weight_gain'] for row in rows]
+            }
+        else:
+            values = {
+                'id': [row['id'] for row in rows],
+                'gender': [GENDERS.index(g) if g in GENDERS else -1
+                           for g in ((row['gender'] or '').lower() for row in rows)],
+                'age_months': ages_in_months([row['birth_date'] for row in rows],
+                                             [row['record_date'] for row in rows],
+                                             [row['age_months'] for row in rows]) if rows else [],
+                'weight': [row['weight'] for row in rows]
+            }
+        arrays = {column: np.array(values[column], dtype=dtype) for column, dtype in SNAPSHOTS[name].items()}
+        order = np.argsort(arrays['id'])
+        return {column: array[order] for column, array in arrays.items()}
+
+    # Storage
+
+    def _snapshot(self, name):
+        arrays = self._load(name)
+        if arrays is None:
+            with self._lock:
+                arrays = self._load(name)
+                if arrays is None:
+                    self._refresh(name, full=True)
+                    arrays = self._load(name)
+        return arrays
+
+    def _load(self, name):
+        directory = self._directory(name)
+        try:
+            with open(os.path.join(directory, 'meta.json')) as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Could not read {name} cohort snapshot metadata, rebuilding: {e}")
+            return None
+
+        # meta.json names the live generation; keep the mapped arrays until it changes
+        cached = self._meta.get(name)
+        if cached is not None and cached.get('generation') == meta.get('generation'):
+            return self._arrays[name]
+        if 'generation' not in meta:
+            return None
+
+        generation = os.path.join(directory, meta['generation'])
+        try:
+            arrays = {column: np.load(os.path.join(generation, f'{column}.npy'), mmap_mode='r')
+                      for column in SNAPSHOTS[name]}
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Could not load {name} cohort snapshot, rebuilding: {e}")
+            return None
+
+        self._arrays[name], self._meta[name] = arrays, meta
+        return arrays
+
+    def _save(self, name, arrays, meta):
+        directory = self._directory(name)
+        generation = f"gen-{datetime.now().strftime('%Y%m%d%H%M%S%f')}-{os.getpid()}"
+        os.makedirs(os.path.join(directory, generation))
+
+        # Every column goes into a fresh generation directory and meta.json is
+        # swapped in last, so a reader maps either the old set or the new one
+        for column, array in arrays.items():
+            np.save(os.path.join(directory, generation, f'{column}.npy'), np.ascontiguousarray(array))
+        meta_tmp = os.path.join(directory, f'meta.json.{os.getpid()}.tmp')
+        with open(meta_tmp, 'w') as f:
+            json.dump({**meta, 'generation': generation}, f)
+        os.replace(meta_tmp, os.path.join(directory, 'meta.json'))
+
+        self._prune(directory, generation)
+        self._load(name)
+
+    @staticmethod
+    def _prune(directory, current):
+        """Delete old generations, keeping the one before current for readers still loading it"""
+        generations = sorted(entry for entry in os.listdir(directory)
+                             if entry.startswith('gen-') and entry != current)
+        for entry in generations[:-1]:
+            # Already-mapped files stay readable after unlink on POSIX
+            shutil.rmtree(os.path.join(directory, entry), ignore_errors=True)
+        # Columns from before generations were used
+        for entry in os.listdir(directory):
+            if entry.endswith('.npy'):
+                os.remove(os.path.join(directory, entry))
+
+    def _directory(self, name):
+        if self.snapshot_dir is None:
+            raise RuntimeError('CohortAnalytics.init_app has not been called')
+        return os.path.join(self.snapshot_dir, name)
+
+
+def _merge(arrays, delta):
+    """Replace rows whose id is in delta and add the new ones, keeping id order"""
+    ids = np.asarray(arrays['id'])
+    stale = np.isin(ids, delta['id'])
+    merged = {column: np.concatenate([np.asarray(array)[~stale], delta[column]])
+              for column, array in arrays.items()}
+    order = np.argsort(merged['id'], kind='stable')
+    return {column: array[order] for column, array in merged.items()}
+
+
+def _grouped_percentiles(keys, values, percentiles, key_name):
+    """Percentiles of values for each distinct key, one sort for all groups"""
+    keys = np.asarray(keys)
+    values = np.asarray(values, dtype=float)
+    keep = ~np.isnan(values)
+    keys, values = keys[keep], values[keep]
+
+    order = np.lexsort((values, keys))
+    keys, values = keys[order], values[order]
+    groups, starts, counts = np.unique(keys, return_index=True, return_counts=True)
+
+    curve = []
+    for group, start, count in zip(groups, starts, counts):
+        points = np.percentile(values[start:start + count], percentiles)
+        curve.append({key_name: int(group), 'n': int(count),
+                      **{f'p{p:g}': round(float(v), 2) for p, v in zip(percentiles, points)}})
+    return curve
+
+
+# Global cohort analytics instance
+cohort_analytics = CohortAnalytics()
@@ -0,0 +1,150 @@
+"""
+Doctor Digest Service for the Maternal and Child Health Care System
+In digest mode doctors get one scheduled summary of new, cancelled and
+upcoming appointments instead of an email per booking
+"""
+
+import json
+import sqlite3
+import logging
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from app.services.appointments import ACTIVE_STATUSES
+
+logger = logging.getLogger(__name__)
+
+
+def send_doctor_digests():
+    """
+    Build and queue one digest email per doctor with activity in the period
+
+    The period runs from the end of the previous digest run to now. All
+    doctors are summarized by a single query grouped by doctor_id.
+
+    Returns:
+        Number of digests queued
+    """
+    from app.data_manager import DataManager
+    from app.services.email_service import email_service
+
+    interval_hours = int(current_app.config.get('DOCTOR_DIGEST_INTERVAL_HOURS', 24))
+    now = datetime.now()
+
+    conn = DataManager.get_connection()
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute('SELECT MAX(period_end) FROM doctor_digests')
+        last_end = cursor.fetchone()[0]
+        period_start = last_end or (now - timedelta(hours=interval_hours)).isoformat(timespec='seconds')
+        period_end = now.isoformat(timespec='seconds')
+        upcoming_end = (now + timedelta(hours=interval_hours)).isoformat(timespec='seconds')
+
+        params = {
+            'start': period_start,
+            'end': period_end,
+            'upcoming_end': upcoming_end
+        }
+        active = "('" + "','".join(ACTIVE_STATUSES) + "')"
+
+        cursor.execute(f'''
+            SELECT a.doctor_id, d.email AS doctor_email, d.full_name AS doctor_name,
+                   json_group_array(json_object(
+                       'patient_name', COALESCE(a.patient_name, u.full_name),
+                       'appointment_type', a.appointment_type,
+                       'appointment_date', a.appointment_date,
+                       'notes', a.notes
+                   )) FILTER (WHERE is_new) AS new_items,
+                   json_group_array(json_object(
+                       'patient_name', COALESCE(a.patient_name, u.full_name),
+                       'appointment_type', a.appointment_type,
+                       'appointment_date', a.appointment_date,
+                       'notes', a.notes
+                   )) FILTER (WHERE is_cancelled) AS cancelled_items,
+                   json_group_array(json_object(
+                       'patient_name', COALESCE(a.patient_name, u.full_name),
+                       'appointment_type', a.appointment_type,
+                       'appointment_date', a.appointment_date,
+                       'status', a.status
+                   )) FILTER (WHERE is_upcoming) AS upcoming_items,
+                   SUM(is_new) AS new_count,
+                   SUM(is_cancelled) AS cancelled_count,
+                   SUM(is_upcoming) AS upcoming_count
+            FROM (
+                SELECT a.*,
+                       (datetime(a.created_at) >= datetime(:start) AND datetime(a.created_at) < datetime(:end)) AS is_new,
+                       (a.status = 'cancelled' AND datetime(a.updated_at) >= datetime(:start)
+                            AND datetime(a.updated_at) < datetime(:end)) AS is_cancelled,
+                       (a.status IN {active} AND datetime(a.appointment_date) >= datetime(:end)
+                            AND datetime(a.appointment_date) < datetime(:upcoming_end)) AS is_upcoming
+                FROM appointments a
+                WHERE a.doctor_id IS NOT NULL
+            ) a
+            JOIN users d ON a.doctor_id = d.id
+            JOIN users u ON a.user_id = u.id
+            GROUP BY a.doctor_id
+            HAVING SUM(is_new) + SUM(is_cancelled) + SUM(is_upcoming) > 0
+        ''', params)
+        rows = cursor.fetchall()
+
+        emails = []
+        log_rows = []
+        for row in rows:
+            if not row['doctor_email']:
+                continue
+            subject, html_content, text_content = email_service.render_template(
+                'doctor_digest',
+                doctor_name=row['doctor_name'],
+                period_start=_display(period_start),
+                period_end=_display(period_end),
+                new_appointments=_items(row['new_items']),
+                cancelled_appointments=_items(row['cancelled_items']),
+                upcoming_appointments=_items(row['upcoming_items'])
+            )
+            emails.append((row['doctor_email'], subject, html_content, text_content))
+            log_rows.append((
+                row['doctor_id'], period_start, period_end,
+                row['new_count'], row['cancelled_count'], row['upcoming_count'],
+                now.isoformat()
+            ))
+
+        # Record the run even when nothing happened so the next period starts here
+        if not log_rows:
+            log_rows.append((None, period_start, period_end, 0, 0, 0, now.isoformat()))
+        cursor.executemany('''
+            INSERT INTO doctor_digests (doctor_id, period_start, period_end,
+                                        new_count, cancelled_count, upcoming_count, sent_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', log_rows)
+        conn.commit()
+
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    email_service.enqueue_emails(emails)
+    logger.info(f"📬 Queued {len(emails)} doctor digest(s)")
+    return len(emails)
+
+
+def _items(items_json):
+    """Parse a json_group_array column and format its dates for display"""
+    items = json.loads(items_json) if items_json else []
+    for item in items:
+        item['appointment_date'] = _display(item.get('appointment_date'))
+    return sorted(items, key=lambda item: item['appointment_date'] or '')
+
+
+def _display(value):
+    """Format an ISO timestamp as 'YYYY-MM-DD HH:MM'"""
+    if not value:
+        return 'N/A'
+    try:
+        return datetime.fromisoformat(value).strftime('%Y-%m-%d %H:%M')
+    except ValueError:
+        return value
@@ -0,0 +1,219 @@
+"""
+Doctor Dashboard Statistics for the Maternal and Child Health Care System
+Computes per-doctor appointment, patient and report counts with grouped SQL
+and keeps each doctor's result in a short-lived in-memory cache
+"""
+
+import sqlite3
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+from app.services.appointments import ACTIVE_STATUSES
+
+logger = logging.getLogger(__name__)
+
+APPOINTMENT_STATUSES = ('pending', 'confirmed', 'rescheduled', 'completed', 'cancelled')
+
+
+class DoctorStatsCache:
+    """Per-doctor dashboard statistics with a time-to-live cache"""
+
+    def __init__(self, ttl_seconds=60):
+        self.ttl_seconds = ttl_seconds
+        self._entries = {}  # doctor_id -> (expires_at, stats)
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.ttl_seconds = int(app.config.get('DOCTOR_STATS_TTL_SECONDS', 60))
+
+    def get(self, doctor_id):
+        """Cached {'stats', 'recent_patients', 'computed_at'} for a doctor, recomputed after the TTL"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(doctor_id)
+            if entry and entry[0] > now:
+                return entry[1]
+
+        stats = compute_dashboard_stats(doctor_id)
+        with self._lock:
+            self._entries[doctor_id] = (now + self.ttl_seconds, stats)
+        return stats
+
+    def invalidate(self, doctor_id=None):
+        """Drop one doctor's cached statistics (or everyone's)"""
+        with self._lock:
+            if doctor_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(doctor_id, None)
+
+
+def compute_dashboard_stats(doctor_id):
+    """
+    Build the dashboard statistics and recent patients for one doctor
+
+    Appointments are counted by status for today, this week (Monday-Sunday)
+    and this month via idx_appointments_doctor_date; patients are everyone
+    with an appointment or report from this doctor.
+    """
+    from app.data_manager import DataManager
+
+    now = datetime.now()
+    today = now.date()
+    week_start = today - timedelta(days=today.weekday())
+    month_start = today.replace(day=1)
+    params = {
+        'doctor_id': doctor_id,
+        'now': now.isoformat(timespec='seconds'),
+        'today': today.isoformat(),
+        'week_start': week_start.isoformat(),
+        'week_end': (week_start + timedelta(days=6)).isoformat(),
+        'month_start': month_start.isoformat(),
+        'month_end': ((month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)).isoformat()
+    }
+    active = "('" + "','".join(ACTIVE_STATUSES) + "')"
+
+    conn = DataManager.get_connection()
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(f'''
+            SELECT status,
+                   SUM(appointment_day = :today) AS today,
+                   SUM(appointment_day BETWEEN :week_start AND :week_end) AS this_week,
+                   SUM(appointment_day BETWEEN :month_start AND :month_end) AS this_month,
+                   SUM(appointment_date >= :now) AS upcoming,
+                   SUM(appointment_date < :now AND status IN {active}) AS overdue,
+                   SUM(LOWER(appointment_type) LIKE '%emergency%') AS emergency,
+                   COUNT(*) AS total
+            FROM appointments
+            WHERE doctor_id = :doctor_id
+            GROUP BY status
+        ''', params)
+        by_status = {row['status']: row for row in cursor.fetchall()}
+
+        cursor.execute(f'''
+            WITH seen AS (
+                SELECT user_id AS patient_id, MIN(created_at) AS first_seen,
+                       MAX(status IN {active} AND appointment_date >= :now) AS has_upcoming
+                FROM appointments
+                WHERE doctor_id = :doctor_id
+                GROUP BY user_id
+                UNION ALL
+                SELECT patient_id, MIN(created_at), 0
+                FROM medical_reports
+                WHERE doctor_id = :doctor_id AND is_active = 1
+                GROUP BY patient_id
+            ),
+            roster AS (
+                SELECT patient_id, MIN(first_seen) AS first_seen, MAX(has_upcoming) AS has_upcoming
+                FROM seen
+                GROUP BY patient_id
+            )
+            SELECT COUNT(*) AS total,
+                   COALESCE(SUM(first_seen >= :month_start), 0) AS new_this_month,
+                   COALESCE(SUM(has_upcoming), 0) AS active,
+                   (SELECT COUNT(DISTINCT w.user_id) FROM weight_entries w
+                    WHERE w.user_id IN (SELECT patient_id FROM roster)) AS tracking_weight,
+                   (SELECT COUNT(*) FROM weight_entries w
+                    WHERE w.user_id IN (SELECT patient_id FROM roster)
+                      AND w.date >= :week_start) AS weight_entries_this_week
+            FROM roster
+        ''', params)
+        patients = cursor.fetchone()
+
+        # A completed appointment is waiting for a report until this doctor files
+        # one for that patient dated on or after the visit
+        cursor.execute('''
+            SELECT COALESCE(SUM(report_date = :today), 0) AS completed_today,
+                   COALESCE(SUM(report_date >= :month_start), 0) AS total_this_month,
+                   COUNT(*) AS total,
+                   (SELECT COUNT(*) FROM appointments a
+                    WHERE a.doctor_id = :doctor_id AND a.status = 'completed'
+                      AND NOT EXISTS (
+                          SELECT 1 FROM medical_reports r
+                          WHERE r.doctor_id = a.doctor_id AND r.patient_id = a.user_id
+                            AND r.is_active = 1 AND r.report_date >= a.appointment_day
+                      )) AS pending
+            FROM medical_reports
+            WHERE doctor_id = :doctor_id AND is_active = 1
+        ''', params)
+        reports = cursor.fetchone()
+
+        # Written by the risk_scores batch job
+        cursor.execute('''
+            SELECT COUNT(*) FROM patient_risk_scores
+            WHERE doctor_id = :doctor_id AND level = 'high'
+        ''', params)
+        high_risk = cursor.fetchone()[0]
+
+        cursor.execute('''
+            SELECT u.id, u.full_name, u.email, MAX(a.created_at) AS last_booking
+            FROM appointments a
+            JOIN users u ON a.user_id = u.id
+            WHERE a.doctor_id = :doctor_id
+            GROUP BY u.id
+            ORDER BY last_booking DESC
+            LIMIT 5
+        ''', params)
+        recent_patients = [dict(row) for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+    def window(column):
+        counts = {status: (by_status[status][column] or 0) if status in by_status else 0
+                  for status in APPOINTMENT_STATUSES}
+        counts['total'] = sum(counts.values())
+        return counts
+
+    def total(column, statuses=APPOINTMENT_STATUSES):
+        return sum(by_status[status][column] or 0 for status in statuses if status in by_status)
+
+    completed = by_status.get('completed')
+
+    stats = {
+        'patients': {
+            'total': patients['total'],
+            'new_this_month': patients['new_this_month'],
+            'active': patients['active'],
+            'tracking_weight': patients['tracking_weight'],
+            'weight_entries_this_week': patients['weight_entries_this_week']
+        },
+        'appointments': {
+            'today': window('today'),
+            'this_week': window('this_week'),
+            'this_month': window('this_month'),
+            'pending': total('total', ('pending',)),
+            'upcoming': total('upcoming', ACTIVE_STATUSES),
+            'total': total('total')
+        },
+        'consultations': {
+            'today': completed['today'] if completed else 0,
+            'this_week': completed['this_week'] if completed else 0,
+            'total': completed['total'] if completed else 0,
+            'emergency': completed['emergency'] if completed else 0
+        },
+        'reports': {
+            'pending': reports['pending'],
+            'completed_today': reports['completed_today'],
+            'total_this_month': reports['total_this_month'],
+            'total': reports['total']
+        },
+        'health_metrics': {
+            'high_risk_pregnancies': high_risk,
+            'overdue_checkups': total('overdue', ACTIVE_STATUSES)
+        }
+    }
+
+    return {
+        'stats': stats,
+        'recent_patients': recent_patients,
+        'computed_at': now.isoformat()
+    }
+
+
+# Global doctor statistics cache instance
+doctor_stats = DoctorStatsCache()
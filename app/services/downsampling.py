@@ -0,0 +1,92 @@
+"""
+Downsampling for the Maternal and Child Health Care System
+Largest-Triangle-Three-Buckets (LTTB) reduction of chart series, so long
+histories stay small on the wire while peaks and dips are kept
+"""
+
+from datetime import datetime
+
+import numpy as np
+
+# Fewer points than this cannot keep both ends plus a bucket in between
+MIN_POINTS = 3
+
+
+def lttb(x, y, threshold):
+    """
+    Indices of the points LTTB keeps from one series
+
+    Args:
+        x: ascending x values
+        y: y values (same length, no NaN)
+        threshold: number of points to keep
+
+    Returns:
+        Sorted index array into x/y; every index when the series is already small
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if threshold >= n or threshold < MIN_POINTS:
+        return np.arange(n)
+
+    # Bucket edges for the n-2 interior points, first and last always kept
+    edges = np.floor(np.linspace(1, n - 1, threshold - 1)).astype(int)
+    # Averages of every bucket, used as the third vertex of the next triangle
+    sums_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    counts = np.diff(edges)
+    mean_x = np.append(sums_x / counts, x[-1])
+    mean_y = np.append(sums_y / counts, y[-1])
+
+    selected = np.empty(threshold, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        # Twice the triangle area for every candidate in the bucket at once
+        areas = np.abs((x[a] - mean_x[bucket + 1]) * (y[start:end] - y[a])
+                       - (x[a] - x[start:end]) * (mean_y[bucket + 1] - y[a]))
+        a = start + int(np.argmax(areas))
+        selected[bucket + 1] = a
+    return selected
+
+
+def downsample(items, x_key, y_keys, points):
+    """
+    Reduce a list of dicts to LTTB-selected points, preserving their order
+
+    Each series in y_keys is reduced to `points` over the items where it has a
+    value and the kept items are merged, so a chart never loses another
+    series' peaks; the result holds at most points * len(y_keys) items.
+
+    Args:
+        items: dicts holding x_key and y_keys (values may be None)
+        x_key: function or key giving a numeric x for each item
+        y_keys: keys of the plotted series
+        points: target points per series
+    """
+    if not points or len(items) <= points:
+        return items
+
+    get_x = x_key if callable(x_key) else (lambda item: item[x_key])
+    x = np.array([np.nan if get_x(item) is None else get_x(item) for item in items], dtype=float)
+    keep = np.zeros(len(items), dtype=bool)
+
+    for key in y_keys:
+        y = np.array([np.nan if item.get(key) is None else item[key] for item in items], dtype=float)
+        present = np.flatnonzero(~np.isnan(x) & ~np.isnan(y))
+        # Stable sort so equal x values keep their original order
+        order = present[np.argsort(x[present], kind='stable')]
+        keep[order[lttb(x[order], y[order], points)]] = True
+
+    return [item for item, kept in zip(items, keep) if kept]
+
+
+def day_number(value):
+    """Ordinal day of an ISO date, as an x value (None if unparseable)"""
+    try:
+        return datetime.strptime(str(value)[:10], '%Y-%m-%d').toordinal()
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,97 @@
+"""
+Email Template Registry for the Maternal and Child Health Care System
+Compiles every notification template (text + HTML pair) once at startup
+"""
+
+import os
+import logging
+from datetime import datetime
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from markupsafe import Markup
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'templates', 'emails')
+
+
+class EmailTemplateRegistry:
+    """Precompiled text/HTML email templates with their subject lines"""
+
+    # Template name -> subject line (itself a template)
+    TEMPLATES = {
+        'appointment_confirmed': 'Appointment Confirmed with {{ doctor_name }} - Maternal and Child Health Care',
+        'appointment_confirmed_patient': "✅ Appointment Confirmed with Dr. {{ details.doctor_name | default('Doctor') }}",
+        'appointment_confirmed_doctor': "📋 Appointment Confirmed - {{ details.patient_name | default('Patient') }}",
+        'booking_received_patient': "📅 Appointment Request Received - {{ details.doctor_name | default('Doctor') }}",
+        'booking_request_doctor': "📋 New Appointment Request - {{ details.patient_name | default('Patient') }}",
+        'appointment_cancelled': '❌ Appointment Cancelled - {{ clinic_name }}',
+        'doctor_digest': '📬 Appointment Digest - {{ new_appointments | length }} new, {{ cancelled_appointments | length }} cancelled, {{ upcoming_appointments | length }} upcoming',
+        'appointment_reminder': "⏰ Reminder: Appointment with {{ details.doctor_name | default('your doctor') }} on {{ details.appointment_date | default('N/A') }}",
+        'appointment_completed': "✅ Appointment Completed - {{ details.clinic_name | default('Medical Clinic') }}",
+        'appointment_rescheduled': "🔄 Appointment Rescheduled - {{ details.appointment_date | default('N/A') }} at {{ details.appointment_time | default('N/A') }}",
+    }
+
+    def __init__(self, template_dir=TEMPLATE_DIR):
+        self.template_dir = template_dir
+        self.base_url = 'http://127.0.0.1:5000'
+        self._env = None
+        self._compiled = {}
+
+    def init_app(self, app):
+        """Compile all registered templates"""
+        self.base_url = app.config.get('APP_BASE_URL', os.environ.get('APP_BASE_URL', self.base_url)).rstrip('/')
+        self.compile()
+
+    def compile(self):
+        """Build the Jinja environment and compile every template up front"""
+        env = Environment(
+            loader=FileSystemLoader(self.template_dir),
+            autoescape=select_autoescape(['html']),
+            trim_blocks=True,
+            lstrip_blocks=True,
+            keep_trailing_newline=True
+        )
+
+        # Static chrome shared by every HTML email is rendered once, not per message
+        with open(os.path.join(self.template_dir, '_base_styles.css'), encoding='utf-8') as f:
+            env.globals['base_styles'] = Markup(f.read().rstrip('\n'))
+
+        subject_env = Environment(autoescape=False)
+
+        compiled = {}
+        for name, subject in self.TEMPLATES.items():
+            compiled[name] = (
+                subject_env.from_string(subject),
+                env.get_template(f'{name}.html'),
+                env.get_template(f'{name}.txt')
+            )
+
+        self._env = env
+        self._compiled = compiled
+        logger.info(f"📧 Compiled {len(compiled)} email templates")
+
+    def render(self, name, **context):
+        """
+        Render a registered template
+
+        Returns:
+            Tuple of (subject, html_content, text_content)
+        """
+        if not self._compiled:
+            self.compile()
+
+        subject_template, html_template, text_template = self._compiled[name]
+        context.setdefault('details', {})
+        context.setdefault('year', datetime.now().year)
+        context.setdefault('base_url', self.base_url)
+
+        return (
+            subject_template.render(**context),
+            html_template.render(**context),
+            text_template.render(**context)
+        )
+
+
+# Global template registry instance
+email_templates = EmailTemplateRegistry()
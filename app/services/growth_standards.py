@@ -0,0 +1,274 @@
+"""
+Growth Standards for the Maternal and Child Health Care System
+WHO weight-for-age, length-for-age and head circumference-for-age z-scores
+and percentiles, computed with NumPy for one baby or the whole table at once
+"""
+
+import csv
+import os
+import sqlite3
+import logging
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DATA_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'who_growth_lms.csv')
+
+DAYS_PER_MONTH = 30.4375
+
+# growth_records column -> WHO indicator in the data file
+INDICATORS = {
+    'weight': 'wfa',
+    'height': 'lfa',
+    'head_circumference': 'hcfa'
+}
+
+INDICATOR_NAMES = {
+    'wfa': 'weight_for_age',
+    'lfa': 'length_for_age',
+    'hcfa': 'head_circumference_for_age'
+}
+
+
+class GrowthStandards:
+    """WHO LMS reference tables held as NumPy arrays, loaded once"""
+
+    def __init__(self, data_file=DATA_FILE):
+        self.data_file = data_file
+        self.outlier_z = 3.0
+        self.last_outliers = None
+        self._tables = None  # (indicator, sex) -> (ages, L, M, S)
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.outlier_z = float(app.config.get('GROWTH_OUTLIER_Z', 3))
+
+    @property
+    def tables(self):
+        if self._tables is None:
+            with self._lock:
+                if self._tables is None:
+                    self._tables = self._load()
+        return self._tables
+
+    def _load(self):
+        columns = {}
+        with open(self.data_file, newline='') as f:
+            rows = csv.DictReader(line for line in f if not line.startswith('#'))
+            for row in rows:
+                key = (row['indicator'], row['sex'])
+                columns.setdefault(key, []).append(
+                    (float(row['age_months']), float(row['L']), float(row['M']), float(row['S'])))
+
+        tables = {}
+        for key, values in columns.items():
+            values.sort()
+            tables[key] = tuple(np.array(column) for column in zip(*values))
+        logger.info(f"📈 Loaded WHO growth standards: {len(tables)} curves")
+        return tables
+
+    @property
+    def max_age_months(self):
+        """Oldest age every bundled curve covers"""
+        return min(float(ages[-1]) for ages, _, _, _ in self.tables.values())
+
+    # Scoring
+
+    def zscores(self, indicator, sex, age_months, values):
+        """
+        Z-scores for arrays of ages (months) and measurements of one sex
+
+        LMS parameters are interpolated between monthly points. Ages outside
+        the table, missing measurements and unknown sexes give NaN.
+        """
+        age_months = np.asarray(age_months, dtype=float)
+        values = np.asarray(values, dtype=float)
+        table = self.tables.get((indicator, sex))
+        if table is None:
+            return np.full(values.shape, np.nan)
+
+        ages, L, M, S = table
+        in_range = (age_months >= ages[0]) & (age_months <= ages[-1])
+        l = np.interp(age_months, ages, L)
+        m = np.interp(age_months, ages, M)
+        s = np.interp(age_months, ages, S)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = values / m
+            small_l = np.abs(l) < 1e-6
+            z = np.where(small_l, np.log(ratio) / s, (np.power(ratio, l) - 1) / (l * s))
+
+            # WHO restricted application of the LMS method beyond +/-3 SD for
+            # skewed indicators: extrapolate linearly from the 2-3 SD distance
+            skewed = ~small_l & (np.abs(l - 1) > 1e-6)
+
+            def sd(k):
+                return m * np.power(1 + l * s * k, 1 / l)
+
+            high = skewed & (z > 3)
+            low = skewed & (z < -3)
+            z = np.where(high, 3 + (values - sd(3)) / (sd(3) - sd(2)), z)
+            z = np.where(low, -3 + (values - sd(-3)) / (sd(-2) - sd(-3)), z)
+
+        return np.where(in_range & (values > 0), z, np.nan)
+
+    def score(self, sexes, age_months, measurements):
+        """
+        Z-scores and percentiles for many records in one pass
+
+        Args:
+            sexes: sequence of 'male'/'female' (anything else scores NaN)
+            age_months: sequence of ages in months (fractional)
+            measurements: {growth_records column: sequence of values or None}
+
+        Returns:
+            {indicator name: (z array, percentile array)}
+        """
+        sexes = np.asarray(sexes, dtype=object)
+        age_months = np.asarray(age_months, dtype=float)
+
+        results = {}
+        for column, indicator in INDICATORS.items():
+            values = np.array([np.nan if v is None else v for v in measurements[column]], dtype=float)
+            z = np.full(values.shape, np.nan)
+            for sex in ('male', 'female'):
+                mask = sexes == sex
+                if mask.any():
+                    z[mask] = self.zscores(indicator, sex, age_months[mask], values[mask])
+            results[INDICATOR_NAMES[indicator]] = (z, percentile(z))
+        return results
+
+    def score_records(self, sex, birth_date, records):
+        """Attach 'z_scores' and 'percentiles' to a baby's growth record dicts (date/weight/height/head)"""
+        if not records:
+            return records
+
+        ages = ages_in_months([birth_date] * len(records), [record['date'] for record in records],
+                              [record.get('age_months') for record in records])
+        results = self.score([(sex or '').lower()] * len(records), ages, {
+            'weight': [record.get('weight') for record in records],
+            'height': [record.get('height') for record in records],
+            'head_circumference': [record.get('head') for record in records]
+        })
+
+        for index, record in enumerate(records):
+            record['z_scores'] = {name: _round(z[index], 2) for name, (z, _) in results.items()}
+            record['percentiles'] = {name: _round(p[index], 1) for name, (_, p) in results.items()}
+        return records
+
+    # Population batch job
+
+    def find_outliers(self, threshold=None):
+        """
+        Score every growth record of active babies and flag |z| above threshold
+
+        One query, one vectorized pass; the result is kept on the instance
+        for the admin endpoint.
+        """
+        from app.data_manager import DataManager
+
+        threshold = self.outlier_z if threshold is None else threshold
+        started = time.monotonic()
+
+        conn = DataManager.get_connection()
+        conn.row_factory = sqlite3.Row
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT g.id, g.baby_id, g.record_date, g.age_months, g.weight, g.height,
+                       g.head_circumference, b.name AS baby_name, b.gender, b.birth_date, b.parent_id
+                FROM growth_records g
+                JOIN babies b ON g.baby_id = b.id
+                WHERE b.is_active = 1
+            ''')
+            rows = cursor.fetchall()
+        finally:
+            conn.close()
+
+        outliers = []
+        if rows:
+            ages = ages_in_months([row['birth_date'] for row in rows], [row['record_date'] for row in rows],
+                                  [row['age_months'] for row in rows])
+            results = self.score(
+                [(row['gender'] or '').lower() for row in rows],
+                ages,
+                {column: [row[column] for row in rows] for column in INDICATORS}
+            )
+
+            flagged = np.zeros(len(rows), dtype=bool)
+            for z, _ in results.values():
+                flagged |= np.abs(np.nan_to_num(z)) > threshold
+
+            for index in np.flatnonzero(flagged):
+                row = rows[index]
+                outliers.append({
+                    'record_id': row['id'],
+                    'baby_id': row['baby_id'],
+                    'baby_name': row['baby_name'],
+                    'parent_id': row['parent_id'],
+                    'record_date': row['record_date'],
+                    'age_months': _round(ages[index], 1),
+                    'z_scores': {name: _round(z[index], 2) for name, (z, _) in results.items()
+                                 if not np.isnan(z[index]) and abs(z[index]) > threshold}
+                })
+
+        self.last_outliers = {
+            'threshold': threshold,
+            'records_scored': len(rows),
+            'outliers': outliers,
+            'duration_ms': round((time.monotonic() - started) * 1000, 1),
+            'computed_at': datetime.now().isoformat()
+        }
+        logger.info(f"📈 Scored {len(rows)} growth records, {len(outliers)} outliers beyond |z| > {threshold}")
+        return len(outliers)
+
+
+def percentile(z):
+    """Normal CDF of z-scores as percentiles (0-100), NaN preserved"""
+    z = np.asarray(z, dtype=float)
+    return 50 * (1 + _erf(z / np.sqrt(2)))
+
+
+def _erf(x):
+    # Abramowitz & Stegun 7.1.26 (|error| < 1.5e-7); NumPy has no vectorized erf
+    sign = np.sign(x)
+    x = np.abs(x)
+    t = 1 / (1 + 0.3275911 * x)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    return sign * (1 - poly * np.exp(-x * x))
+
+
+def ages_in_months(birth_dates, record_dates, fallbacks):
+    """
+    Fractional ages in months from ISO birth and record dates
+
+    Rows whose dates do not parse fall back to the stored whole months.
+    """
+    try:
+        births = np.array([str(d)[:10] for d in birth_dates], dtype='datetime64[D]')
+        records = np.array([str(d)[:10] for d in record_dates], dtype='datetime64[D]')
+        return (records - births).astype(float) / DAYS_PER_MONTH
+    except ValueError:
+        return np.array([_age_in_months(birth, record, fallback)
+                         for birth, record, fallback in zip(birth_dates, record_dates, fallbacks)], dtype=float)
+
+
+def _age_in_months(birth_date, record_date, fallback):
+    try:
+        days = (datetime.strptime(str(record_date)[:10], '%Y-%m-%d')
+                - datetime.strptime(str(birth_date)[:10], '%Y-%m-%d')).days
+        return days / DAYS_PER_MONTH
+    except (TypeError, ValueError):
+        return np.nan if fallback is None else fallback
+
+
+def _round(value, digits):
+    return None if value is None or np.isnan(value) else round(float(value), digits)
+
+
+# Global growth standards instance
+growth_standards = GrowthStandards()
@@ -0,0 +1,231 @@
+"""
+Growth Trends for the Maternal and Child Health Care System
+Keeps per-record WHO z-scores, growth velocity, percentile-crossing flags and
+a smoothed trend on growth_records, updated incrementally as records change
+"""
+
+import json
+import logging
+from datetime import datetime
+
+import numpy as np
+
+from app.services.growth_standards import growth_standards, ages_in_months, DAYS_PER_MONTH
+
+logger = logging.getLogger(__name__)
+
+# growth_records column -> (stored column prefix, WHO indicator name)
+MEASUREMENTS = {
+    'weight': ('weight', 'weight_for_age'),
+    'height': ('height', 'length_for_age'),
+    'head_circumference': ('head', 'head_circumference_for_age')
+}
+
+# Exponential smoothing weight given to the newest measurement
+TREND_ALPHA = 0.5
+
+# Major WHO percentile lines (3rd, 15th, 50th, 85th, 97th) as z-scores;
+# moving across two or more between visits is flagged
+PERCENTILE_LINES = np.array([-1.881, -1.036, 0.0, 1.036, 1.881])
+CROSSING_LINES = 2
+
+METRIC_COLUMNS = [f'{prefix}_{suffix}' for prefix, _ in MEASUREMENTS.values()
+                  for suffix in ('z', 'velocity', 'trend')]
+
+# Age at the visit from the baby's birth date: whole days, and completed
+# calendar months (a month counts once its day of the month is reached)
+_AGES_SQL = '''
+    UPDATE growth_records
+    SET age_days = CAST(julianday(growth_records.record_date) - julianday(b.birth_date) AS INTEGER),
+        age_months = (CAST(strftime('%Y', growth_records.record_date) AS INTEGER)
+                      - CAST(strftime('%Y', b.birth_date) AS INTEGER)) * 12
+                     + CAST(strftime('%m', growth_records.record_date) AS INTEGER)
+                     - CAST(strftime('%m', b.birth_date) AS INTEGER)
+                     - (CAST(strftime('%d', growth_records.record_date) AS INTEGER)
+                        < CAST(strftime('%d', b.birth_date) AS INTEGER))
+    FROM babies b
+    WHERE b.id = growth_records.baby_id {scope}
+'''
+
+
+def update_ages(conn, baby_id=None, from_date=None, missing_only=False):
+    """
+    Set age_days and age_months in SQL for a baby's records dated on or after
+    from_date (or every record when baby_id is None)
+
+    Runs on the caller's connection and leaves the commit to the caller.
+    """
+    scope, params = '', []
+    if baby_id is not None:
+        scope += ' AND growth_records.baby_id = ?'
+        params.append(baby_id)
+    if from_date:
+        scope += ' AND growth_records.record_date >= ?'
+        params.append(from_date)
+    if missing_only:
+        scope += ' AND growth_records.age_days IS NULL'
+    cursor = conn.cursor()
+    cursor.execute(_AGES_SQL.format(scope=scope), params)
+    return cursor.rowcount
+
+
+def rescore_missing(conn):
+    """
+    Recompute babies with records never computed, or with a measurement but
+    no z-score inside the WHO tables' age range
+
+    Records saved before metrics were stored have no metrics_updated_at, and
+    records scored before the bundled tables covered their age were stored
+    with NULL z-scores; this picks both up at startup so reads never have to.
+    Runs on the caller's connection and leaves the commit to the caller.
+
+    Returns:
+        Number of records updated
+    """
+    max_days = growth_standards.max_age_months * DAYS_PER_MONTH
+    unscored = ' OR '.join(f'(g.{column} IS NOT NULL AND g.{prefix}_z IS NULL)'
+                           for column, (prefix, _) in MEASUREMENTS.items())
+    cursor = conn.cursor()
+    cursor.execute(f'''
+        SELECT DISTINCT g.baby_id
+        FROM growth_records g
+        JOIN babies b ON b.id = g.baby_id
+        WHERE g.metrics_updated_at IS NULL
+           OR (LOWER(b.gender) IN ('male', 'female')
+               AND g.age_days BETWEEN 0 AND ?
+               AND ({unscored}))
+    ''', (max_days,))
+    return sum(refresh_baby(conn, baby_id) for (baby_id,) in cursor.fetchall())
+
+
+def refresh_baby(conn, baby_id, from_date=None):
+    """
+    Recompute stored ages and metrics for a baby's records dated on or after from_date
+
+    Velocity and trend only depend on earlier records, so a change at
+    from_date only touches that suffix; the last earlier record's stored
+    values seed the computation. Runs on the caller's connection and leaves
+    the commit to the caller.
+
+    Returns:
+        Number of records updated
+    """
+    cursor = conn.cursor()
+    cursor.execute('SELECT gender, birth_date FROM babies WHERE id = ?', (baby_id,))
+    baby = cursor.fetchone()
+    if not baby:
+        return 0
+    gender, birth_date = baby
+    update_ages(conn, baby_id, from_date)
+
+    columns = ('id, record_date, age_months, weight, height, head_circumference, '
+               + ', '.join(METRIC_COLUMNS) + ', metrics_updated_at')
+    names = columns.split(', ')
+
+    seed = None
+    if from_date:
+        cursor.execute(f'''
+            SELECT {columns} FROM growth_records
+            WHERE baby_id = ? AND record_date < ?
+            ORDER BY record_date DESC, id DESC
+            LIMIT 1
+        ''', (baby_id, from_date))
+        row = cursor.fetchone()
+        seed = dict(zip(names, row)) if row else None
+        if seed and seed['metrics_updated_at'] is None:
+            # Earlier history was never computed; start from the beginning
+            seed, from_date = None, None
+
+    cursor.execute(f'''
+        SELECT {columns} FROM growth_records
+        WHERE baby_id = ? AND record_date >= ?
+        ORDER BY record_date, id
+    ''', (baby_id, from_date or ''))
+    rows = cursor.fetchall()
+    if not rows:
+        return 0
+
+    records = [dict(zip(names, row)) for row in rows]
+    ages = ages_in_months([birth_date] * len(records), [r['record_date'] for r in records],
+                          [r['age_months'] for r in records])
+    scores = growth_standards.score([(gender or '').lower()] * len(records), ages,
+                                    {column: [r[column] for r in records] for column in MEASUREMENTS})
+
+    # Last record with each measurement: (value, age, z, trend)
+    previous = {}
+    if seed:
+        seed_age = ages_in_months([birth_date], [seed['record_date']], [seed['age_months']])[0]
+        for column, (prefix, _) in MEASUREMENTS.items():
+            if seed[column] is not None:
+                previous[column] = (seed[column], seed_age, seed[f'{prefix}_z'], seed[f'{prefix}_trend'])
+    if from_date:
+        # A visit may skip a measurement; fall back to the latest earlier record that has it
+        for column, (prefix, _) in MEASUREMENTS.items():
+            if column not in previous:
+                cursor.execute(f'''
+                    SELECT {column}, record_date, age_months, {prefix}_z, {prefix}_trend
+                    FROM growth_records
+                    WHERE baby_id = ? AND record_date < ? AND {column} IS NOT NULL
+                    ORDER BY record_date DESC, id DESC
+                    LIMIT 1
+                ''', (baby_id, from_date))
+                row = cursor.fetchone()
+                if row:
+                    age = ages_in_months([birth_date], [row[1]], [row[2]])[0]
+                    previous[column] = (row[0], age, row[3], row[4])
+
+    now = datetime.now().isoformat()
+    updates = []
+    for index, record in enumerate(records):
+        values = {}
+        crossings = []
+        for column, (prefix, indicator) in MEASUREMENTS.items():
+            value = record[column]
+            z = _value(scores[indicator][0][index])
+            velocity = trend = None
+
+            if value is not None:
+                trend = value
+                last = previous.get(column)
+                if last:
+                    last_value, last_age, last_z, last_trend = last
+                    months = ages[index] - last_age
+                    if months > 0:
+                        velocity = round((value - last_value) / months, 3)
+                    if last_trend is not None:
+                        trend = TREND_ALPHA * value + (1 - TREND_ALPHA) * last_trend
+                    direction = _crossing(last_z, z)
+                    if direction:
+                        crossings.append(f'{indicator}_{direction}')
+                trend = round(trend, 3)
+                previous[column] = (value, ages[index], z, trend)
+
+            values[f'{prefix}_z'] = None if z is None else round(z, 3)
+            values[f'{prefix}_velocity'] = velocity
+            values[f'{prefix}_trend'] = trend
+
+        updates.append(tuple(values[column] for column in METRIC_COLUMNS)
+                       + (json.dumps(crossings), now, record['id']))
+
+    cursor.executemany(f'''
+        UPDATE growth_records
+        SET {', '.join(f'{column} = ?' for column in METRIC_COLUMNS)},
+            percentile_crossings = ?, metrics_updated_at = ?
+        WHERE id = ?
+    ''', updates)
+    return len(updates)
+
+
+def _crossing(z_before, z_after):
+    """'up'/'down' if the move crosses CROSSING_LINES or more major percentile lines"""
+    if z_before is None or z_after is None:
+        return None
+    low, high = sorted((z_before, z_after))
+    crossed = int(np.count_nonzero((PERCENTILE_LINES > low) & (PERCENTILE_LINES <= high)))
+    if crossed < CROSSING_LINES:
+        return None
+    return 'up' if z_after > z_before else 'down'
+
+
+def _value(z):
+    return None if np.isnan(z) else float(z)
@@ -0,0 +1,148 @@
+"""
+Appointment Reminder Service for the Maternal and Child Health Care System
+Claims confirmed appointments coming up within the reminder window and
+sends one reminder email per appointment
+"""
+
+import sqlite3
+import logging
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+
+def send_due_reminders():
+    """
+    Send reminder emails for confirmed appointments starting within the window
+
+    Each run claims its rows atomically (reminder_claimed_at), so two
+    processes never send the same reminder, and sets reminder_sent only for
+    the emails actually delivered. Failed sends are released for the next
+    run; a claim left behind by a crashed run expires after
+    REMINDER_CLAIM_MINUTES, and nothing is claimed while email is not
+    configured. Uses idx_appointments_reminder (status, reminder_sent,
+    appointment_date), so each tick only touches the appointments that are
+    actually due.
+
+    Returns:
+        Number of reminders sent
+    """
+    from app.data_manager import DataManager
+    from app.services.email_service import email_service
+
+    # Unconfigured sends only log and report success; keep reminders due until SMTP is set up
+    if not email_service.is_configured():
+        logger.warning("⚠️ Email is not configured - appointment reminders left pending")
+        return 0
+
+    window_hours = int(current_app.config.get('REMINDER_WINDOW_HOURS', 24))
+    batch_limit = int(current_app.config.get('REMINDER_BATCH_LIMIT', 500))
+    claim_minutes = int(current_app.config.get('REMINDER_CLAIM_MINUTES', 30))
+    now = datetime.now()
+    claimed_at = now.isoformat()
+
+    conn = DataManager.get_connection()
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+
+    try:
+        # Claim in one statement; only rows still unclaimed when it runs come back
+        cursor.execute('''
+            UPDATE appointments
+            SET reminder_claimed_at = :claimed_at
+            WHERE id IN (
+                SELECT id FROM appointments
+                WHERE status = 'confirmed'
+                  AND reminder_sent = 0
+                  AND appointment_date >= :start
+                  AND appointment_date <= :end
+                  AND (reminder_claimed_at IS NULL OR reminder_claimed_at < :expired)
+                ORDER BY appointment_date
+                LIMIT :limit
+            )
+              AND reminder_sent = 0
+              AND (reminder_claimed_at IS NULL OR reminder_claimed_at < :expired)
+            RETURNING id
+        ''', {
+            'claimed_at': claimed_at,
+            'start': now.isoformat(timespec='seconds'),
+            'end': (now + timedelta(hours=window_hours)).isoformat(timespec='seconds'),
+            'expired': (now - timedelta(minutes=claim_minutes)).isoformat(),
+            'limit': batch_limit
+        })
+        claimed_ids = [row['id'] for row in cursor.fetchall()]
+        conn.commit()
+        if not claimed_ids:
+            return 0
+
+        placeholders = ','.join('?' * len(claimed_ids))
+        cursor.execute(f'''
+            SELECT a.id, a.appointment_type, a.appointment_date, a.doctor_name,
+                   a.clinic_name, a.purpose, a.child_name,
+                   COALESCE(a.patient_email, u.email) AS patient_email,
+                   COALESCE(a.patient_name, u.full_name) AS patient_name
+            FROM appointments a
+            JOIN users u ON a.user_id = u.id
+            WHERE a.id IN ({placeholders})
+            ORDER BY a.appointment_date
+        ''', claimed_ids)
+        rows = cursor.fetchall()
+
+        emails = []
+        email_ids = []
+        # Appointments with no address have nothing to deliver and are settled as sent
+        sent_ids = [row['id'] for row in rows if not row['patient_email']]
+        for row in rows:
+            if not row['patient_email']:
+                continue
+            try:
+                appointment_time = datetime.fromisoformat(row['appointment_date'])
+                date_str = appointment_time.strftime('%B %d, %Y')
+                time_str = appointment_time.strftime('%I:%M %p')
+            except ValueError:
+                date_str, time_str = row['appointment_date'], 'N/A'
+
+            subject, html_content, text_content = email_service.render_template(
+                'appointment_reminder',
+                details={
+                    'patient_name': row['patient_name'] or 'Patient',
+                    'doctor_name': row['doctor_name'],
+                    'appointment_date': date_str,
+                    'appointment_time': time_str,
+                    'appointment_type': row['appointment_type'],
+                    'purpose': row['purpose'] or 'General consultation',
+                    'child_name': row['child_name'],
+                    'clinic_name': row['clinic_name'] or 'Maternal Care Clinic'
+                }
+            )
+            emails.append((row['patient_email'], subject, html_content, text_content))
+            email_ids.append(row['id'])
+
+        # Sent here rather than through the in-memory outbox, so delivery is known
+        # before anything is marked
+        results = email_service.send_emails(emails) if emails else []
+        delivered = [appointment_id for appointment_id, sent in zip(email_ids, results) if sent]
+        failed = [appointment_id for appointment_id, sent in zip(email_ids, results) if not sent]
+
+        # Only rows still carrying this run's claim; a reschedule in the meantime clears it
+        for ids, assignment in ((sent_ids + delivered, 'reminder_sent = 1'),
+                                (failed, 'reminder_claimed_at = NULL')):
+            if ids:
+                cursor.execute(f'''
+                    UPDATE appointments
+                    SET {assignment}
+                    WHERE id IN ({','.join('?' * len(ids))}) AND reminder_claimed_at = ?
+                ''', ids + [claimed_at])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    if failed:
+        logger.warning(f"⚠️ {len(failed)} appointment reminder(s) failed and will be retried")
+    logger.info(f"⏰ Sent {len(delivered)} appointment reminder(s)")
+    return len(delivered)
@@ -0,0 +1,163 @@
+"""
+Pregnancy Risk Scoring for the Maternal and Child Health Care System
+Rule-based risk score per patient from weight entries, overdue appointments
+and report diagnoses, materialized into patient_risk_scores by a batch job
+"""
+
+import re
+import json
+import sqlite3
+import logging
+from collections import defaultdict
+from datetime import datetime
+
+from app.services.appointments import ACTIVE_STATUSES
+
+logger = logging.getLogger(__name__)
+
+# Points added per flag; the score is their sum
+RISK_WEIGHTS = {
+    'bmi_obese': 2,
+    'bmi_underweight': 1,
+    'weight_gain_high': 2,
+    'weight_gain_low': 2,
+    'rapid_gain': 3,
+    'overdue_appointment': 2,
+    'diagnosis': 3  # per matched condition
+}
+
+# Score thresholds for the stored level
+HIGH_RISK_SCORE = 5
+MEDIUM_RISK_SCORE = 3
+
+# More than this between consecutive weight entries is flagged (kg/week)
+RAPID_GAIN_KG_PER_WEEK = 1.0
+
+# Only diagnoses from roughly the current pregnancy count
+DIAGNOSIS_LOOKBACK_DAYS = 280
+
+DIAGNOSIS_TERMS = {
+    'preeclampsia': ('preeclampsia', 'pre-eclampsia', 'eclampsia'),
+    'gestational_diabetes': ('gestational diabetes', 'gdm'),
+    'hypertension': ('hypertension', 'high blood pressure'),
+    'anemia': ('anemia', 'anaemia'),
+    'placenta_previa': ('placenta previa', 'placenta praevia'),
+    'bleeding': ('bleeding', 'hemorrhage', 'haemorrhage'),
+    'multiple_pregnancy': ('twin', 'twins', 'triplets')
+}
+
+_DIAGNOSIS_PATTERNS = {
+    condition: re.compile(r'\b(' + '|'.join(re.escape(term) for term in terms) + r')\b', re.IGNORECASE)
+    for condition, terms in DIAGNOSIS_TERMS.items()
+}
+
+_INPUTS_SQL = '''
+    WITH recent_weight AS (
+        SELECT user_id, weight, pregnancy_week, bmi_category, gain_status,
+               ROW_NUMBER() OVER (PARTITION BY user_id
+                                  ORDER BY pregnancy_week DESC, date DESC, id DESC) AS rn
+        FROM weight_entries
+    )
+    SELECT p.doctor_id, p.patient_id,
+           w1.bmi_category, w1.gain_status,
+           w1.weight AS weight, w1.pregnancy_week AS week,
+           w2.weight AS previous_weight, w2.pregnancy_week AS previous_week,
+           (SELECT COUNT(*) FROM appointments a
+            WHERE a.user_id = p.patient_id AND a.status IN {active}
+              AND a.appointment_date < :now) AS overdue
+    FROM (
+        SELECT doctor_id, user_id AS patient_id FROM appointments
+        WHERE doctor_id IS NOT NULL AND user_id IS NOT NULL
+        UNION
+        SELECT doctor_id, patient_id FROM medical_reports WHERE is_active = 1
+    ) p
+    LEFT JOIN recent_weight w1 ON w1.user_id = p.patient_id AND w1.rn = 1
+    LEFT JOIN recent_weight w2 ON w2.user_id = p.patient_id AND w2.rn = 2
+'''
+
+
+def score_patient(row, diagnoses):
+    """(score, flags) for one patient's inputs row and their recent diagnosis texts"""
+    flags = []
+    if row['bmi_category'] in ('obese', 'underweight'):
+        flags.append(f"bmi_{row['bmi_category']}")
+    if row['gain_status'] in ('high', 'low'):
+        flags.append(f"weight_gain_{row['gain_status']}")
+    if row['previous_week'] is not None and row['week'] > row['previous_week']:
+        rate = (row['weight'] - row['previous_weight']) / (row['week'] - row['previous_week'])
+        if rate > RAPID_GAIN_KG_PER_WEEK:
+            flags.append('rapid_gain')
+    if row['overdue']:
+        flags.append('overdue_appointment')
+
+    score = sum(RISK_WEIGHTS[flag] for flag in flags)
+    for condition, pattern in _DIAGNOSIS_PATTERNS.items():
+        if any(pattern.search(text) for text in diagnoses):
+            flags.append(f'diagnosis_{condition}')
+            score += RISK_WEIGHTS['diagnosis']
+    return score, flags
+
+
+def risk_level(score):
+    if score >= HIGH_RISK_SCORE:
+        return 'high'
+    if score >= MEDIUM_RISK_SCORE:
+        return 'medium'
+    return 'low'
+
+
+def refresh_all():
+    """Rescore every doctor-patient pair and replace patient_risk_scores (scheduled job)"""
+    from app.data_manager import DataManager
+    from app.services import weight_trajectory
+
+    # Scores read the stored weight-gain status
+    weight_trajectory.refresh_stale()
+
+    now = datetime.now()
+    params = {'now': now.isoformat(timespec='seconds')}
+    active = "('" + "','".join(ACTIVE_STATUSES) + "')"
+
+    conn = DataManager.get_connection()
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f'''
+            SELECT patient_id, diagnosis
+            FROM medical_reports
+            WHERE is_active = 1 AND diagnosis IS NOT NULL
+              AND report_date >= date(:now, '-{DIAGNOSIS_LOOKBACK_DAYS} days')
+        ''', params)
+        diagnoses = defaultdict(list)
+        for row in cursor.fetchall():
+            diagnoses[row['patient_id']].append(row['diagnosis'])
+
+        cursor.execute(_INPUTS_SQL.format(active=active), params)
+        computed_at = now.isoformat()
+        scores = []
+        for row in cursor.fetchall():
+            score, flags = score_patient(row, diagnoses.get(row['patient_id'], ()))
+            scores.append((row['doctor_id'], row['patient_id'], score, risk_level(score),
+                           json.dumps(flags), computed_at))
+
+        cursor.execute('DELETE FROM patient_risk_scores')
+        cursor.executemany('''
+            INSERT INTO patient_risk_scores (doctor_id, patient_id, score, level, flags, computed_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', scores)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    # Dashboards and worklists read the new scores on their next build
+    from app.services.doctor_stats import doctor_stats
+    from app.services.worklist import worklist
+    doctor_stats.invalidate()
+    worklist.invalidate()
+
+    high = sum(1 for score in scores if score[3] == 'high')
+    logger.info(f"🩺 Scored {len(scores)} doctor-patient pairs, {high} high risk")
+    return len(scores)
@@ -0,0 +1,150 @@
+"""
+Background Scheduler for the Maternal and Child Health Care System
+Runs periodic maintenance jobs (reminders, digests, batch computations)
+on a single daemon thread inside the Flask application context
+"""
+
+import os
+import threading
+import time
+import logging
+
+try:
+    import fcntl
+except ImportError:  # Windows: the development server is a single process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# How often a process without the scheduler lock checks whether it is free
+LEADER_RETRY_SECONDS = 60
+
+
+class Scheduler:
+    """Minimal interval scheduler running registered jobs in the app context"""
+
+    def __init__(self):
+        self.app = None
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.lock_path = None
+        self._lock_file = None
+
+    def init_app(self, app):
+        """Bind to the app and start the worker thread if scheduling is enabled"""
+        self.app = app
+        self.lock_path = app.config.get('SCHEDULER_LOCK_FILE')
+        if not app.config.get('SCHEDULER_ENABLED', True):
+            logger.info("⏸️ Background scheduler disabled")
+            return
+        self.start()
+
+    def add_job(self, name, interval_seconds, func, run_immediately=False):
+        """
+        Register a periodic job
+
+        Args:
+            name: Unique job name (re-registering replaces the job)
+            interval_seconds: Seconds between runs
+            func: Callable taking no arguments, run inside an app context
+            run_immediately: Run on the first tick instead of after one interval
+        """
+        next_run = time.monotonic() if run_immediately else time.monotonic() + interval_seconds
+        with self._lock:
+            self._jobs[name] = {
+                'interval': interval_seconds,
+                'func': func,
+                'next_run': next_run,
+                'last_result': None,
+                'last_error': None
+            }
+
+    def run_job(self, name):
+        """Run a job now, in the calling thread, and return its result"""
+        with self._lock:
+            job = self._jobs[name]
+        with self.app.app_context():
+            return job['func']()
+
+    def get_jobs(self):
+        """Get status for every registered job"""
+        now = time.monotonic()
+        with self._lock:
+            return [{
+                'name': name,
+                'interval_seconds': job['interval'],
+                'next_run_in': max(0, round(job['next_run'] - now)),
+                'last_result': job['last_result'],
+                'last_error': job['last_error']
+            } for name, job in self._jobs.items()]
+
+    def start(self):
+        """Start the worker thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='scheduler', daemon=True)
+        self._thread.start()
+        logger.info("⏰ Background scheduler started")
+
+    def stop(self):
+        """Stop the worker thread"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        self._thread = None
+        if self._lock_file:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def _is_leader(self):
+        """
+        Hold the scheduler lock file so only one process runs jobs
+
+        Every worker process (e.g. under gunicorn) creates the app and its own
+        scheduler; the one holding an exclusive flock on SCHEDULER_LOCK_FILE
+        runs the jobs and the others keep retrying, taking over if it exits.
+        """
+        if self._lock_file or fcntl is None or not self.lock_path:
+            return True
+        lock_file = open(self.lock_path, 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        logger.info(f"⏰ Scheduler lock acquired; jobs run in process {os.getpid()}")
+        return True
+
+    def _run(self):
+        while not self._stop.is_set():
+            if not self._is_leader():
+                self._stop.wait(LEADER_RETRY_SECONDS)
+                continue
+
+            now = time.monotonic()
+            with self._lock:
+                due = [(name, job) for name, job in self._jobs.items() if job['next_run'] <= now]
+                for _, job in due:
+                    job['next_run'] = now + job['interval']
+                pending = [job['next_run'] for job in self._jobs.values()]
+
+            for name, job in due:
+                try:
+                    with self.app.app_context():
+                        job['last_result'] = job['func']()
+                    job['last_error'] = None
+                except Exception as e:
+                    job['last_error'] = str(e)
+                    logger.error(f"❌ Scheduled job '{name}' failed: {str(e)}")
+
+            # Sleep until the next job is due (re-checked at least once a minute)
+            wait = min(pending) - time.monotonic() if pending else 60
+            self._stop.wait(max(1, min(wait, 60)))
+
+
+# Global scheduler instance
+scheduler = Scheduler()
@@ -0,0 +1,170 @@
+"""
+SMTP Connection Pool for the Maternal and Child Health Care System
+Keeps authenticated SMTP sessions alive between sends so that bursts of
+notifications reuse one TCP/TLS/AUTH handshake instead of paying it per email
+"""
+
+import smtplib
+import ssl
+import threading
+import time
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class SMTPConnectionPool:
+    """Pool of authenticated, keep-alive SMTP sessions"""
+
+    def __init__(self, host, port, username=None, password=None, use_tls=True,
+                 use_auth=True, pool_size=2, idle_timeout=60, timeout=30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.use_auth = use_auth
+        self.pool_size = pool_size
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+
+        self._idle = []  # list of (server, last_used) tuples
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        """Open a new SMTP session, upgrading to TLS and logging in as configured"""
+        logger.info(f"📧 Opening SMTP session to {self.host}:{self.port}")
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                server.starttls(context=ssl.create_default_context())
+            if self.use_auth and self.username and self.password:
+                server.login(self.username, self.password)
+        except Exception:
+            self._close(server)
+            raise
+        return server
+
+    @staticmethod
+    def _close(server):
+        """Close a session, ignoring errors from already-dead connections"""
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    @staticmethod
+    def _is_alive(server):
+        """NOOP health check before reusing an idle session"""
+        try:
+            return server.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def acquire(self):
+        """Get a healthy session from the pool, or open a new one"""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                server, last_used = self._idle.pop()
+
+            if time.monotonic() - last_used > self.idle_timeout:
+                self._close(server)
+                continue
+            if self._is_alive(server):
+                return server
+            self._close(server)
+
+        return self._connect()
+
+    def release(self, server, healthy=True):
+        """Return a session to the pool, closing it if unhealthy or the pool is full"""
+        if healthy:
+            with self._lock:
+                if len(self._idle) < self.pool_size:
+                    self._idle.append((server, time.monotonic()))
+                    return
+        self._close(server)
+
+    @contextmanager
+    def session(self):
+        """Context manager yielding one pooled session"""
+        server = self.acquire()
+        healthy = True
+        try:
+            yield server
+        except (smtplib.SMTPServerDisconnected, OSError):
+            healthy = False
+            raise
+        finally:
+            self.release(server, healthy)
+
+    def send_messages(self, sender, messages):
+        """
+        Send a batch of messages over a single session
+
+        Args:
+            sender: Envelope sender address
+            messages: List of (to_email, message_string) tuples
+
+        Returns:
+            List of booleans, one per message, in input order
+        """
+        results = [False] * len(messages)
+        if not messages:
+            return results
+
+        server = self.acquire()
+        reconnected = False
+        try:
+            index = 0
+            while index < len(messages):
+                to_email, message_string = messages[index]
+                try:
+                    server.sendmail(sender, to_email, message_string)
+                    results[index] = True
+                except (smtplib.SMTPServerDisconnected, OSError) as e:
+                    # The server dropped us mid-batch; reconnect once and retry
+                    self._close(server)
+                    server = None
+                    if reconnected:
+                        logger.error(f"❌ SMTP session lost while sending to {to_email}: {str(e)}")
+                        break
+                    reconnected = True
+                    try:
+                        server = self._connect()
+                    except (smtplib.SMTPException, OSError) as e:
+                        # Keep the results of messages already delivered
+                        logger.error(f"❌ SMTP reconnect failed after {index} message(s): {str(e)}")
+                        break
+                    continue
+                except smtplib.SMTPException as e:
+                    logger.error(f"❌ Failed to send email to {to_email}: {str(e)}")
+                index += 1
+        finally:
+            if server is not None:
+                self.release(server)
+
+        return results
+
+    def prune(self):
+        """Close idle sessions that have exceeded the idle timeout"""
+        now = time.monotonic()
+        with self._lock:
+            stale = [server for server, last_used in self._idle if now - last_used > self.idle_timeout]
+            self._idle = [(server, last_used) for server, last_used in self._idle if now - last_used <= self.idle_timeout]
+        for server in stale:
+            self._close(server)
+        return len(stale)
+
+    def close_all(self):
+        """Close every idle session"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for server, _ in idle:
+            self._close(server)
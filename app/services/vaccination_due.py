@@ -0,0 +1,95 @@
+"""
+Vaccination Due-Date Engine for the Maternal and Child Health Care System
+Materializes every active baby's due, upcoming and overdue vaccinations into
+the vaccination_due table from babies.birth_date and vaccination_schedules
+"""
+
+import logging
+from datetime import date, datetime
+
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+# Set-based computation over babies x schedules; SQLite evaluates the whole
+# population in one statement instead of one Python loop iteration per pair
+_MATERIALIZE_SQL = '''
+    INSERT INTO vaccination_due (baby_id, schedule_id, vaccine_name, age_months, due_date, status, computed_at)
+    SELECT baby_id, schedule_id, vaccine_name, age_months, due_date,
+           CASE
+               WHEN completed THEN 'completed'
+               WHEN due_date < :today THEN 'overdue'
+               WHEN due_date <= date(:today, '+' || :window_days || ' days') THEN 'due'
+               ELSE 'upcoming'
+           END,
+           :computed_at
+    FROM (
+        SELECT b.id AS baby_id, s.id AS schedule_id, s.vaccine_name, s.age_months,
+               date(b.birth_date, '+' || s.age_months || ' months') AS due_date,
+               EXISTS (
+                   SELECT 1 FROM vaccinations v
+                   WHERE v.baby_id = b.id AND v.vaccine_name = s.vaccine_name
+                     AND (v.status = 'completed' OR v.administered_date IS NOT NULL)
+               ) AS completed
+        FROM babies b
+        CROSS JOIN vaccination_schedules s
+        WHERE b.is_active = 1 AND s.is_active = 1 {scope}
+    )
+'''
+
+
+def _materialize(baby_id=None, schedule_id=None):
+    """Recompute vaccination_due rows, optionally scoped to one baby or one schedule"""
+    from app.data_manager import DataManager
+
+    if baby_id is not None:
+        delete_sql, scope, params = 'DELETE FROM vaccination_due WHERE baby_id = :id', 'AND b.id = :id', {'id': baby_id}
+    elif schedule_id is not None:
+        delete_sql, scope, params = 'DELETE FROM vaccination_due WHERE schedule_id = :id', 'AND s.id = :id', {'id': schedule_id}
+    else:
+        delete_sql, scope, params = 'DELETE FROM vaccination_due', '', {}
+
+    params.update({
+        'today': date.today().isoformat(),
+        'window_days': int(current_app.config.get('VACCINATION_DUE_WINDOW_DAYS', 30)),
+        'computed_at': datetime.now().isoformat()
+    })
+
+    conn = DataManager.get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(delete_sql, params)
+        cursor.execute(_MATERIALIZE_SQL.format(scope=scope), params)
+        count = cursor.rowcount
+        conn.commit()
+        return count
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def refresh_all():
+    """Rebuild the whole table (daily job, since statuses move with the calendar)"""
+    count = _materialize()
+    logger.info(f"💉 Materialized {count} vaccination due rows")
+    return count
+
+
+def refresh_for_baby(baby_id):
+    """Recompute rows for one baby after it is added, edited or deactivated"""
+    try:
+        return _materialize(baby_id=baby_id)
+    except Exception as e:
+        logger.error(f"❌ Failed to refresh vaccination due dates for baby {baby_id}: {str(e)}")
+        return 0
+
+
+def refresh_for_schedule(schedule_id):
+    """Recompute rows for one schedule entry after it is created, changed or removed"""
+    try:
+        return _materialize(schedule_id=schedule_id)
+    except Exception as e:
+        logger.error(f"❌ Failed to refresh vaccination due dates for schedule {schedule_id}: {str(e)}")
+        return 0
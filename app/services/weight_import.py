@@ -0,0 +1,185 @@
+"""
+Weight Entry Import for the Maternal and Child Health Care System
+Reads a pregnancy weight CSV (the export format or snake_case columns) in
+chunks, validates and derives BMI and gain with NumPy, and inserts in bulk
+"""
+
+import csv
+import logging
+from datetime import date, datetime
+
+import numpy as np
+
+from app.services import weight_trajectory
+
+logger = logging.getLogger(__name__)
+
+CHUNK_ROWS = 1000
+
+# Errors listed in the response; the total is always reported
+MAX_REPORTED_ERRORS = 100
+
+# Plausible ranges; rows outside them are rejected rather than clipped
+WEEK_RANGE = (1, 42)
+WEIGHT_RANGE = (20, 300)     # kg
+HEIGHT_RANGE = (100, 250)    # cm
+
+NUMERIC_COLUMNS = ('pregnancy_week', 'weight', 'pre_pregnancy_weight', 'height')
+
+# Header aliases -> weight_entries column; BMI, gain and status are always recomputed
+HEADER_ALIASES = {
+    'date': 'date',
+    'pregnancy_week': 'pregnancy_week',
+    'week': 'pregnancy_week',
+    'weight': 'weight',
+    'pre_pregnancy_weight': 'pre_pregnancy_weight',
+    'height': 'height',
+    'notes': 'notes'
+}
+
+
+class WeightImportError(ValueError):
+    """The file itself cannot be imported (bad header or encoding)"""
+
+
+def import_entries(conn, user_id, lines):
+    """
+    Validate and insert every row of a CSV for one user on the caller's connection
+
+    Rows are read and inserted CHUNK_ROWS at a time, so memory does not grow
+    with the file. Nothing is committed here: the caller commits only when
+    the returned error count is zero.
+
+    Returns:
+        (imported, error_count, errors) where errors are {'row', 'error'}
+        for the first MAX_REPORTED_ERRORS bad rows (row 1 is the header)
+    """
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if not header:
+        raise WeightImportError('The file is empty')
+    columns = [HEADER_ALIASES.get(_normalize(name)) for name in header]
+    missing = {'pregnancy_week', 'weight'} - set(columns)
+    if missing:
+        raise WeightImportError(f"Missing required column(s): {', '.join(sorted(missing))}")
+
+    cursor = conn.cursor()
+    # New rows get ids above the current maximum; used to compute their trajectory
+    cursor.execute('SELECT COALESCE(MAX(id), 0) FROM weight_entries')
+    last_id = cursor.fetchone()[0]
+    imported = error_count = 0
+    errors = []
+    chunk = []
+    row_number = 1
+
+    def flush():
+        nonlocal imported, error_count
+        records, chunk_errors = _validate(chunk)
+        error_count += len(chunk_errors)
+        errors.extend(chunk_errors[:MAX_REPORTED_ERRORS - len(errors)])
+        # Once any row is bad the import will be rolled back; keep validating only
+        if records and not error_count:
+            cursor.executemany('''
+                INSERT INTO weight_entries
+                (user_id, date, weight, pregnancy_week, pre_pregnancy_weight, height, bmi, weight_gain, notes)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [(user_id,) + record for record in records])
+            imported += len(records)
+        chunk.clear()
+
+    for row in reader:
+        row_number += 1
+        if not any(cell.strip() for cell in row):
+            continue
+        chunk.append((row_number, {column: cell.strip() for column, cell in zip(columns, row) if column}))
+        if len(chunk) >= CHUNK_ROWS:
+            flush()
+    if chunk:
+        flush()
+
+    if imported and not error_count:
+        weight_trajectory.refresh_entries(conn, 'user_id = ? AND id > ?', (user_id, last_id))
+        logger.info(f"⚖️ Imported {imported} weight entries for user {user_id}")
+    return imported, error_count, errors
+
+
+def _validate(chunk):
+    """Vectorized checks and derived values for one chunk of (row number, {column: text})"""
+    count = len(chunk)
+    values = {column: np.full(count, np.nan) for column in NUMERIC_COLUMNS}
+    unparsed = {column: np.zeros(count, dtype=bool) for column in NUMERIC_COLUMNS}
+    problems = [[] for _ in range(count)]
+    dates = []
+    today = date.today()
+
+    # Text to numbers is per cell; everything after is array arithmetic
+    for index, (_, row) in enumerate(chunk):
+        for column in NUMERIC_COLUMNS:
+            text = row.get(column, '')
+            if text:
+                try:
+                    values[column][index] = float(text)
+                except ValueError:
+                    problems[index].append(f'{column} is not a number')
+                    unparsed[column][index] = True
+        entry_date = row.get('date', '')
+        if entry_date:
+            try:
+                parsed = datetime.strptime(entry_date[:10], '%Y-%m-%d').date()
+                if parsed > today:
+                    problems[index].append('date is in the future')
+                entry_date = parsed.isoformat()
+            except ValueError:
+                problems[index].append('date must be YYYY-MM-DD')
+        dates.append(entry_date or today.isoformat())
+
+    week, weight = values['pregnancy_week'], values['weight']
+    pre_weight, height = values['pre_pregnancy_weight'], values['height']
+
+    checks = [
+        (np.isnan(week) & ~unparsed['pregnancy_week'], 'pregnancy_week is required'),
+        (np.isnan(weight) & ~unparsed['weight'], 'weight is required'),
+        ((week < WEEK_RANGE[0]) | (week > WEEK_RANGE[1]) | (np.floor(week) < week),
+         f'pregnancy_week must be a whole number from {WEEK_RANGE[0]} to {WEEK_RANGE[1]}'),
+        ((weight < WEIGHT_RANGE[0]) | (weight > WEIGHT_RANGE[1]),
+         f'weight must be between {WEIGHT_RANGE[0]} and {WEIGHT_RANGE[1]} kg'),
+        ((pre_weight < WEIGHT_RANGE[0]) | (pre_weight > WEIGHT_RANGE[1]),
+         f'pre_pregnancy_weight must be between {WEIGHT_RANGE[0]} and {WEIGHT_RANGE[1]} kg'),
+        ((height < HEIGHT_RANGE[0]) | (height > HEIGHT_RANGE[1]),
+         f'height must be between {HEIGHT_RANGE[0]} and {HEIGHT_RANGE[1]} cm')
+    ]
+    for failed, message in checks:
+        for index in np.flatnonzero(failed):
+            problems[index].append(message)
+
+    # Same rounding as calculate_bmi and the single-entry endpoint
+    with np.errstate(invalid='ignore'):
+        bmi = np.round(weight / np.square(height / 100), 1)
+        gain = np.round(weight - pre_weight, 1)
+
+    records, errors = [], []
+    for index, (row_number, row) in enumerate(chunk):
+        if problems[index]:
+            errors.append({'row': row_number, 'error': '; '.join(problems[index])})
+            continue
+        records.append((
+            dates[index],
+            float(weight[index]),
+            int(week[index]),
+            _value(pre_weight[index]),
+            _value(height[index]),
+            _value(bmi[index]),
+            _value(gain[index]),
+            row.get('notes', '')
+        ))
+    return records, errors
+
+
+def _normalize(name):
+    # 'Pre-pregnancy Weight (kg)' -> 'pre_pregnancy_weight'
+    name = name.split('(')[0].strip().lower()
+    return name.replace('-', '_').replace(' ', '_')
+
+
+def _value(number):
+    return None if np.isnan(number) else float(number)
@@ -0,0 +1,191 @@
+"""
+Weight Trajectory for the Maternal and Child Health Care System
+Places pregnancy weight entries against the IOM (2009) gain band for the
+mother's BMI category; results are stored on weight_entries at write time
+"""
+
+import sqlite3
+import logging
+from datetime import datetime
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CATEGORIES = ('underweight', 'normal', 'overweight', 'obese')
+
+# IOM 2009 weekly gain in the 2nd and 3rd trimesters (kg/week, low-high)
+WEEKLY_GAIN = {
+    'underweight': (0.44, 0.58),
+    'normal': (0.35, 0.50),
+    'overweight': (0.23, 0.33),
+    'obese': (0.17, 0.27)
+}
+
+# Total gain expected by the end of the first trimester, for every category
+FIRST_TRIMESTER_GAIN = (0.5, 2.0)
+FIRST_TRIMESTER_WEEKS = 13
+TERM_WEEKS = 40
+
+_LOW = np.array([WEEKLY_GAIN[category][0] for category in CATEGORIES])
+_HIGH = np.array([WEEKLY_GAIN[category][1] for category in CATEGORIES])
+
+
+def classify(bmi, weeks, gains):
+    """
+    Vectorized IOM placement for arrays of entries
+
+    Args:
+        bmi: BMI used for the category (NaN when unknown)
+        weeks: pregnancy week of each entry
+        gains: weight gained so far in kg (NaN when unknown)
+
+    Returns:
+        (categories, band_low, band_high, statuses); band values are NaN and
+        status 'unknown' where the category or gain is unknown
+    """
+    bmi = np.asarray(bmi, dtype=float)
+    weeks = np.clip(np.asarray(weeks, dtype=float), 0, None)
+    gains = np.asarray(gains, dtype=float)
+
+    # 0..3 for underweight..obese, -1 unknown (same cut-offs as get_bmi_category)
+    index = np.searchsorted([18.5, 25, 30], bmi, side='right')
+    index = np.where(np.isnan(bmi), -1, index)
+    known = index >= 0
+    safe = np.where(known, index, 0)
+
+    low, high = _band(safe, weeks)
+    low = np.where(known, low, np.nan)
+    high = np.where(known, high, np.nan)
+
+    statuses = np.full(bmi.shape, 'unknown', dtype=object)
+    measured = known & ~np.isnan(gains)
+    statuses[measured] = 'good'
+    statuses[measured & (gains < low)] = 'low'
+    statuses[measured & (gains > high)] = 'high'
+
+    categories = np.array(CATEGORIES + ('unknown',), dtype=object)[np.where(known, index, len(CATEGORIES))]
+    return categories, low, high, statuses
+
+
+def expected_band(bmi_category, max_week=TERM_WEEKS):
+    """The IOM band week by week for one category, for charts"""
+    if bmi_category not in WEEKLY_GAIN:
+        return []
+    weeks = np.arange(0, max_week + 1)
+    low, high = _band(np.full(weeks.shape, CATEGORIES.index(bmi_category)), weeks)
+    return [{'week': int(week), 'low': round(float(l), 2), 'high': round(float(h), 2)}
+            for week, l, h in zip(weeks, low, high)]
+
+
+def _band(category_index, weeks):
+    # Linear to the first-trimester total by week 13, then the weekly rate
+    first = np.minimum(weeks, FIRST_TRIMESTER_WEEKS) / FIRST_TRIMESTER_WEEKS
+    later = np.maximum(weeks - FIRST_TRIMESTER_WEEKS, 0)
+    return (first * FIRST_TRIMESTER_GAIN[0] + later * _LOW[category_index],
+            first * FIRST_TRIMESTER_GAIN[1] + later * _HIGH[category_index])
+
+
+def refresh_entries(conn, where, params=()):
+    """
+    Recompute and store the band and status for the weight_entries matching where
+
+    IOM categories use pre-pregnancy BMI when pre-pregnancy weight and
+    height are known, otherwise the entry's own BMI. Runs on the caller's
+    connection and leaves the commit to the caller.
+
+    Returns:
+        Number of entries updated
+    """
+    cursor = conn.cursor()
+    cursor.execute(f'''
+        SELECT id, pregnancy_week, pre_pregnancy_weight, height, bmi, weight_gain
+        FROM weight_entries
+        WHERE {where}
+    ''', params)
+    rows = cursor.fetchall()
+    if not rows:
+        return 0
+
+    columns = np.array([[np.nan if value is None else value for value in row] for row in rows], dtype=float)
+    ids, weeks, pre_weight, height, bmi, gains = columns.T
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pre_bmi = pre_weight / np.square(height / 100)
+    bmi = np.where(np.isfinite(pre_bmi), pre_bmi, bmi)
+
+    categories, low, high, statuses = classify(bmi, weeks, gains)
+
+    now = datetime.now().isoformat()
+    cursor.executemany('''
+        UPDATE weight_entries
+        SET bmi_category = ?, gain_band_low = ?, gain_band_high = ?, gain_status = ?, trajectory_updated_at = ?
+        WHERE id = ?
+    ''', [
+        (categories[i], _value(low[i]), _value(high[i]), statuses[i], now, int(ids[i]))
+        for i in range(len(rows))
+    ])
+    return len(rows)
+
+
+def refresh_stale():
+    """Compute every entry that has no stored trajectory yet, in one pass"""
+    from app.data_manager import DataManager
+
+    conn = DataManager.get_connection()
+    try:
+        count = refresh_entries(conn, 'trajectory_updated_at IS NULL')
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    if count:
+        logger.info(f"🤰 Computed weight trajectory for {count} entries")
+    return count
+
+
+def population_summary(user_ids):
+    """
+    Latest entry per patient with its band and status, plus status counts
+
+    Doctor view over many patients in a single read of the stored
+    trajectories (computed on write and backfilled at startup).
+    """
+    from app.data_manager import DataManager
+
+    if not user_ids:
+        return {'patients': [], 'counts': {status: 0 for status in ('low', 'good', 'high', 'unknown')}}
+
+    conn = DataManager.get_connection()
+    conn.row_factory = sqlite3.Row
+    try:
+        cursor = conn.cursor()
+        placeholders = ','.join('?' * len(user_ids))
+        cursor.execute(f'''
+            WITH latest AS (
+                SELECT w.*, ROW_NUMBER() OVER (PARTITION BY w.user_id
+                                               ORDER BY w.pregnancy_week DESC, w.date DESC, w.id DESC) AS rn
+                FROM weight_entries w
+                WHERE w.user_id IN ({placeholders})
+            )
+            SELECT l.user_id, u.full_name, l.date, l.pregnancy_week, l.weight, l.weight_gain,
+                   l.bmi_category, l.gain_band_low, l.gain_band_high, l.gain_status
+            FROM latest l
+            JOIN users u ON u.id = l.user_id
+            WHERE l.rn = 1
+            ORDER BY CASE l.gain_status WHEN 'high' THEN 0 WHEN 'low' THEN 1 ELSE 2 END, u.full_name
+        ''', list(user_ids))
+        patients = [dict(row) for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+    counts = {status: 0 for status in ('low', 'good', 'high', 'unknown')}
+    for patient in patients:
+        counts[patient['gain_status'] or 'unknown'] += 1
+    return {'patients': patients, 'counts': counts}
+
+
+def _value(number):
+    return None if np.isnan(number) else round(float(number), 2)
@@ -0,0 +1,209 @@
+"""
+Doctor Worklist for the Maternal and Child Health Care System
+Keeps a priority heap per doctor of pending appointments, overdue
+follow-ups and visits awaiting a report, updated by appointment events
+"""
+
+import heapq
+import itertools
+import json
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+
+from app.services.appointments import ACTIVE_STATUSES
+from app.utils.helpers import parse_appointment_datetime
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_COMPONENTS = ('type', 'risk', 'time')
+
+# Within equal priority: overdue first, then requests, then paperwork
+_KIND_RANK = {'follow_up': 0, 'appointment': 1, 'report': 2}
+
+# Risk levels from patient_risk_scores, most urgent first
+_RISK_RANK = {'high': 0, 'medium': 1}
+
+_ITEMS_SQL = '''
+    SELECT * FROM (
+        SELECT a.id, a.doctor_id, a.user_id, a.appointment_type, a.appointment_date, a.status,
+               COALESCE(a.patient_name, u.full_name) AS patient_name, a.child_name,
+               rs.level AS risk_level, rs.flags AS risk_flags,
+               CASE
+                   WHEN a.status = 'pending' AND a.appointment_date >= :now THEN 'appointment'
+                   WHEN a.status IN {active} AND a.appointment_date < :now THEN 'follow_up'
+                   WHEN a.status = 'completed' AND NOT EXISTS (
+                       SELECT 1 FROM medical_reports r
+                       WHERE r.doctor_id = a.doctor_id AND r.patient_id = a.user_id
+                         AND r.is_active = 1 AND r.report_date >= a.appointment_day
+                   ) THEN 'report'
+               END AS kind
+        FROM appointments a
+        LEFT JOIN users u ON a.user_id = u.id
+        LEFT JOIN patient_risk_scores rs ON rs.doctor_id = a.doctor_id AND rs.patient_id = a.user_id
+        WHERE {scope}
+    )
+    WHERE kind IS NOT NULL
+'''
+
+
+class DoctorWorklist:
+    """Per-doctor min-heaps of work items with lazy deletion"""
+
+    def __init__(self):
+        self.priority = list(PRIORITY_COMPONENTS)
+        self.urgent_types = ['emergency']
+        self._heaps = {}     # doctor_id -> heap of [key, item_id, item or None]
+        self._entries = {}   # doctor_id -> {appointment_id: heap entry}
+        self._counter = itertools.count()
+        self._lock = threading.RLock()
+
+    def init_app(self, app):
+        priority = [part.strip() for part in app.config.get('WORKLIST_PRIORITY', 'type,risk,time').split(',')]
+        self.priority = [part for part in priority if part in PRIORITY_COMPONENTS] or list(PRIORITY_COMPONENTS)
+        self.urgent_types = [part.strip().lower()
+                             for part in app.config.get('WORKLIST_URGENT_TYPES', 'emergency').split(',') if part.strip()]
+
+    # Reads
+
+    def top(self, doctor_id, limit=20):
+        """The doctor's `limit` most urgent items, building the heap on first use"""
+        with self._lock:
+            if doctor_id not in self._heaps:
+                self._build(doctor_id)
+            heap = self._heaps[doctor_id]
+
+            # Pop the best entries, then push them back: O(limit log n)
+            popped = []
+            while heap and len(popped) < limit:
+                entry = heapq.heappop(heap)
+                if entry[2] is not None:
+                    popped.append(entry)
+            for entry in popped:
+                heapq.heappush(heap, entry)
+            return [dict(entry[2], priority=list(entry[0])) for entry in popped]
+
+    def size(self, doctor_id):
+        with self._lock:
+            return len(self._entries.get(doctor_id, {}))
+
+    # Events
+
+    def refresh_appointments(self, appointment_ids):
+        """Re-classify appointments after they are created or change state"""
+        appointment_ids = list(appointment_ids)
+        with self._lock:
+            if not appointment_ids or not self._heaps:
+                return
+            for appointment_id in appointment_ids:
+                self._remove(appointment_id)
+
+            # Named and positional parameters cannot be mixed, so inline the (integer) ids
+            scope = f'a.id IN ({",".join(str(int(i)) for i in appointment_ids)})'
+            for item in self._load(scope, {}):
+                if item['doctor_id'] in self._heaps:
+                    self._push(item)
+
+    def refresh_reports(self, doctor_id, patient_id):
+        """Re-classify a patient's visits after the doctor files or edits a report"""
+        with self._lock:
+            if doctor_id not in self._heaps:
+                return
+            stale = [appointment_id for appointment_id, entry in self._entries[doctor_id].items()
+                     if entry[2]['patient_id'] == patient_id]
+            for appointment_id in stale:
+                self._remove(appointment_id)
+            for item in self._load('a.doctor_id = :doctor_id AND a.user_id = :patient_id',
+                                   {'doctor_id': doctor_id, 'patient_id': patient_id}):
+                self._push(item)
+
+    def invalidate(self, doctor_id=None):
+        """Drop a doctor's heap (or all heaps); it is rebuilt on the next read"""
+        with self._lock:
+            if doctor_id is None:
+                self._heaps.clear()
+                self._entries.clear()
+            else:
+                self._heaps.pop(doctor_id, None)
+                self._entries.pop(doctor_id, None)
+
+    def refresh_all(self):
+        """Scheduled job: drop every heap so time-based states (overdue) are re-evaluated"""
+        self.invalidate()
+        return 0
+
+    # Internals
+
+    def _build(self, doctor_id):
+        self._heaps[doctor_id] = []
+        self._entries[doctor_id] = {}
+        for item in self._load('a.doctor_id = :doctor_id', {'doctor_id': doctor_id}):
+            self._push(item)
+        logger.info(f"📋 Built worklist for doctor {doctor_id}: {self.size(doctor_id)} items")
+
+    def _load(self, scope, params):
+        from app.data_manager import DataManager
+
+        active = "('" + "','".join(ACTIVE_STATUSES) + "')"
+        conn = DataManager.get_connection()
+        conn.row_factory = sqlite3.Row
+        try:
+            cursor = conn.cursor()
+            cursor.execute(_ITEMS_SQL.format(scope=scope, active=active),
+                           dict(params, now=datetime.now().isoformat(timespec='seconds')))
+            rows = cursor.fetchall()
+        finally:
+            conn.close()
+        return [self._item(row) for row in rows]
+
+    def _item(self, row):
+        return {
+            'kind': row['kind'],
+            'appointment_id': row['id'],
+            'doctor_id': row['doctor_id'],
+            'patient_id': row['user_id'],
+            'patient_name': row['patient_name'],
+            'child_name': row['child_name'],
+            'appointment_type': row['appointment_type'],
+            'appointment_date': row['appointment_date'],
+            'status': row['status'],
+            'risk_level': row['risk_level'] or 'low',
+            'risk_flags': json.loads(row['risk_flags']) if row['risk_flags'] else []
+        }
+
+    def _key(self, item):
+        ranks = {
+            'type': 0 if any(urgent in (item['appointment_type'] or '').lower() for urgent in self.urgent_types) else 1,
+            'risk': _RISK_RANK.get(item['risk_level'], 2),
+            'time': _timestamp(item['appointment_date'])
+        }
+        return tuple(ranks[component] for component in self.priority) + (_KIND_RANK[item['kind']],)
+
+    def _push(self, item):
+        doctor_id = item['doctor_id']
+        entry = [self._key(item), next(self._counter), item]
+        self._entries[doctor_id][item['appointment_id']] = entry
+        heapq.heappush(self._heaps[doctor_id], entry)
+
+    def _remove(self, appointment_id):
+        for doctor_id, entries in self._entries.items():
+            entry = entries.pop(appointment_id, None)
+            if entry:
+                entry[2] = None  # lazily deleted; skipped when popped
+                heap = self._heaps[doctor_id]
+                if len(heap) > 2 * len(entries) + 32:
+                    self._heaps[doctor_id] = [e for e in heap if e[2] is not None]
+                    heapq.heapify(self._heaps[doctor_id])
+                return
+
+
+def _timestamp(value):
+    try:
+        return parse_appointment_datetime(value).timestamp()
+    except (TypeError, ValueError, OSError):
+        return float('inf')
+
+
+# Global doctor worklist instance
+worklist = DoctorWorklist()
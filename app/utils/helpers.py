@@ -0,0 +1,138 @@
+"""
+Shared helper functions for the Maternal and Child Health Care System
+"""
+
+import csv
+import io
+import sqlite3
+from datetime import datetime
+
+
+def parse_appointment_datetime(value):
+    """Parse a stored or submitted appointment date into a naive, second-precision datetime"""
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        parsed = datetime.fromisoformat(str(value).strip().replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        # Browsers submit toISOString() in UTC; appointments are stored in server local time
+        parsed = parsed.astimezone()
+    return parsed.replace(tzinfo=None, microsecond=0)
+
+
+def appointment_datetime_fields(value):
+    """
+    Canonical sortable appointment_date plus precomputed display fields
+
+    Returns:
+        Dictionary of column name -> value, ready to write to the appointments table
+    """
+    parsed = parse_appointment_datetime(value)
+    return {
+        'appointment_date': parsed.strftime('%Y-%m-%dT%H:%M:%S'),
+        'appointment_day': parsed.strftime('%Y-%m-%d'),
+        'display_date': parsed.strftime('%B %d, %Y'),
+        'display_time': parsed.strftime('%I:%M %p')
+    }
+
+
+# Medical report summaries
+
+REPORT_PREVIEW_LENGTH = 120
+
+
+def report_preview(text, length=REPORT_PREVIEW_LENGTH):
+    """
+    Shorten report text for list views; detail endpoints return it in full
+
+    List queries select SUBSTR(column, 1, length + 1) so the extra character
+    tells us whether anything was cut off without reading the whole text.
+    """
+    if not text:
+        return ''
+    if len(text) <= length:
+        return text
+    return text[:length].rstrip() + '…'
+
+
+# Pregnancy weight tracking
+
+def calculate_bmi(weight, height):
+    """Calculate BMI from weight (kg) and height (cm)"""
+    if height and weight:
+        height_m = height / 100  # Convert cm to meters
+        return round(weight / (height_m ** 2), 1)
+    return None
+
+
+def get_bmi_category(bmi):
+    """Get BMI category"""
+    if bmi is None:
+        return 'unknown'
+    if bmi < 18.5:
+        return 'underweight'
+    elif bmi < 25:
+        return 'normal'
+    elif bmi < 30:
+        return 'overweight'
+    else:
+        return 'obese'
+
+
+def get_recommended_gain_range(bmi_category):
+    """Get recommended weight gain range based on BMI category"""
+    ranges = {
+        'underweight': {'total': '12.7-18.1 kg', 'weekly': '0.5 kg/week (2nd & 3rd trimester)'},
+        'normal': {'total': '11.3-15.9 kg', 'weekly': '0.4 kg/week (2nd & 3rd trimester)'},
+        'overweight': {'total': '6.8-11.3 kg', 'weekly': '0.3 kg/week (2nd & 3rd trimester)'},
+        'obese': {'total': '5.0-9.1 kg', 'weekly': '0.2 kg/week (2nd & 3rd trimester)'}
+    }
+    return ranges.get(bmi_category, {'total': 'Consult your doctor', 'weekly': 'Consult your doctor'})
+
+
+# Streaming CSV exports
+
+CSV_FETCH_SIZE = 500
+
+
+def stream_csv(connect, query, params, header, to_values, fetch_size=CSV_FETCH_SIZE):
+    """
+    Yield a CSV document line by line straight from a query
+
+    Rows are read with fetchmany and each batch is written to a reused
+    buffer and sent, so memory stays flat however long the history is. The
+    connection is opened inside the generator because it runs after the
+    view has returned (wrap it in stream_with_context).
+
+    Args:
+        connect: callable returning a sqlite3 connection
+        query, params: the SELECT to export
+        header: list of column titles
+        to_values: function mapping a sqlite3.Row to a list of cell values
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        chunk = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return chunk
+
+    buffer.write('\ufeff')  # BOM so spreadsheet apps detect UTF-8
+    writer.writerow(header)
+    yield flush()
+
+    conn = connect()
+    conn.row_factory = sqlite3.Row
+    try:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            writer.writerows(to_values(row) for row in rows)
+            yield flush()
+    finally:
+        conn.close()
@@ -0,0 +1,40 @@
+"""
+Shared fixtures for the Maternal and Child Health Care System tests
+"""
+
+import pytest
+from flask import Flask
+
+from app import init_database
+
+
+@pytest.fixture
+def db_app(tmp_path):
+    """Bare Flask app on a fresh database with the full schema, inside an app context"""
+    flask_app = Flask(__name__)
+    flask_app.config['DATABASE_PATH'] = str(tmp_path / 'test.db')
+    init_database(flask_app.config['DATABASE_PATH'])
+    with flask_app.app_context():
+        yield flask_app
+
+
+@pytest.fixture
+def conn(db_app):
+    """Connection to the fixture database"""
+    from app.data_manager import DataManager
+
+    connection = DataManager.get_connection()
+    yield connection
+    connection.close()
+
+
+@pytest.fixture
+def add_user(conn):
+    """Insert a user and return its id"""
+    def add(email, role='user'):
+        cursor = conn.cursor()
+        cursor.execute('INSERT INTO users (full_name, email, password_hash, role) VALUES (?, ?, ?, ?)',
+                       (email.split('@')[0].title(), email, 'hash', role))
+        conn.commit()
+        return cursor.lastrowid
+    return add
@@ -0,0 +1,205 @@
+"""
+Tests for the doctor availability engine: the booked-slot index, free slots
+and the database-side double-booking check
+"""
+
+from datetime import date, datetime, time, timedelta
+
+import pytest
+
+from app.services.availability import AvailabilityEngine, SlotConflictError, _DoctorIndex, _minute
+
+DOCTOR = 7
+
+
+def _next_weekday(weekday):
+    """A future date on the given weekday (0 = Monday)"""
+    day = date.today() + timedelta(days=7)
+    return day + timedelta(days=(weekday - day.weekday()) % 7)
+
+
+def _at(day, hour, minute=0):
+    return datetime.combine(day, time(hour, minute))
+
+
+# _DoctorIndex.find_overlap
+
+def _index(*intervals):
+    index = _DoctorIndex()
+    for start, end, appointment_id in intervals:
+        index.add(start, end, appointment_id)
+    return index
+
+
+def test_find_overlap_empty_index():
+    assert _index().find_overlap(600, 630) is None
+
+
+def test_find_overlap_touching_intervals_do_not_overlap():
+    index = _index((600, 630, 1))
+
+    assert index.find_overlap(630, 660) is None
+    assert index.find_overlap(570, 600) is None
+
+
+def test_find_overlap_partial_and_contained():
+    index = _index((600, 630, 1), (700, 760, 2))
+
+    assert index.find_overlap(620, 650) == 1
+    assert index.find_overlap(590, 610) == 1
+    assert index.find_overlap(710, 720) == 2
+    assert index.find_overlap(640, 690) is None
+
+
+def test_find_overlap_sees_long_interval_starting_much_earlier():
+    # The long booking starts far before the query; max_length widens the search
+    index = _index((500, 800, 1), (640, 650, 2))
+
+    assert index.find_overlap(700, 710) == 1
+
+
+def test_find_overlap_excludes_the_moving_appointment():
+    index = _index((600, 630, 1))
+
+    assert index.find_overlap(600, 630, exclude_id=1) is None
+    assert _index((600, 630, 1), (600, 630, 2)).find_overlap(600, 630, exclude_id=1) == 2
+
+
+def test_remove_drops_only_that_appointment():
+    index = _index((600, 630, 1), (600, 630, 2))
+    index.remove(600, 1)
+
+    assert index.entries == [(600, 630, 2)]
+    assert index.find_overlap(600, 630, exclude_id=2) is None
+
+
+# free_slots
+
+def test_free_slots_skip_booked_slots():
+    engine = AvailabilityEngine()
+    day = _next_weekday(0)
+    engine.add(DOCTOR, 1, _at(day, 10))
+
+    slots = engine.free_slots(DOCTOR, day)
+
+    assert slots[0] == _at(day, 9)
+    assert slots[-1] == _at(day, 16, 30)
+    assert _at(day, 10) not in slots
+    assert _at(day, 9, 30) in slots and _at(day, 10, 30) in slots
+    assert len(slots) == 15
+
+
+def test_free_slots_off_slot_booking_blocks_both_neighbours():
+    engine = AvailabilityEngine()
+    day = _next_weekday(1)
+    engine.add(DOCTOR, 1, _at(day, 10, 15))
+
+    slots = engine.free_slots(DOCTOR, day)
+
+    assert _at(day, 10) not in slots
+    assert _at(day, 10, 30) not in slots
+    assert _at(day, 11) in slots
+
+
+def test_free_slots_respect_doctor_settings():
+    engine = AvailabilityEngine()
+    engine._settings[DOCTOR] = {'start_time': time(8, 0), 'end_time': time(10, 0),
+                                'slot_minutes': 45, 'working_days': [2]}
+    wednesday = _next_weekday(2)
+
+    assert engine.free_slots(DOCTOR, wednesday) == [_at(wednesday, 8), _at(wednesday, 8, 45)]
+    assert engine.free_slots(DOCTOR, _next_weekday(3)) == []
+
+
+def test_free_slots_none_on_weekend():
+    assert AvailabilityEngine().free_slots(DOCTOR, _next_weekday(5)) == []
+
+
+def test_removed_booking_frees_its_slot():
+    engine = AvailabilityEngine()
+    day = _next_weekday(0)
+    engine.add(DOCTOR, 1, _at(day, 10))
+    engine.remove(1)
+
+    assert _at(day, 10) in engine.free_slots(DOCTOR, day)
+
+
+def test_minute_is_monotonic_across_midnight():
+    day = _next_weekday(0)
+    assert _minute(_at(day + timedelta(days=1), 0)) - _minute(_at(day, 23, 30)) == 30
+
+
+# Database check (the authority across processes)
+
+@pytest.fixture
+def doctor_and_patient(add_user):
+    return add_user('doctor@example.com', role='doctor'), add_user('patient@example.com')
+
+
+def _book(conn, doctor_id, patient_id, start, status='pending'):
+    cursor = conn.cursor()
+    cursor.execute('''
+        INSERT INTO appointments (user_id, doctor_id, doctor_name, appointment_type, appointment_date, status)
+        VALUES (?, ?, 'Doctor', 'Checkup', ?, ?)
+    ''', (patient_id, doctor_id, start.strftime('%Y-%m-%dT%H:%M:%S'), status))
+    conn.commit()
+    return cursor.lastrowid
+
+
+def test_check_finds_bookings_this_process_never_indexed(conn, doctor_and_patient):
+    doctor_id, patient_id = doctor_and_patient
+    day = _next_weekday(0)
+    booked = _book(conn, doctor_id, patient_id, _at(day, 10))
+    # A fresh engine stands in for another worker whose index never saw the booking
+    engine = AvailabilityEngine()
+
+    with pytest.raises(SlotConflictError) as conflict:
+        engine.check(conn.cursor(), doctor_id, _at(day, 10, 15))
+
+    assert conflict.value.conflicting_id == booked
+    # The conflict teaches this worker's read cache about the booking
+    assert _at(day, 10) not in engine.free_slots(doctor_id, day)
+
+
+def test_check_allows_adjacent_and_inactive_slots(conn, doctor_and_patient):
+    doctor_id, patient_id = doctor_and_patient
+    day = _next_weekday(0)
+    _book(conn, doctor_id, patient_id, _at(day, 10))
+    _book(conn, doctor_id, patient_id, _at(day, 11), status='cancelled')
+    engine = AvailabilityEngine()
+    cursor = conn.cursor()
+
+    engine.check(cursor, doctor_id, _at(day, 10, 30))
+    engine.check(cursor, doctor_id, _at(day, 9, 30))
+    engine.check(cursor, doctor_id, _at(day, 11))
+
+
+def test_check_excludes_the_appointment_being_moved(conn, doctor_and_patient):
+    doctor_id, patient_id = doctor_and_patient
+    day = _next_weekday(0)
+    booked = _book(conn, doctor_id, patient_id, _at(day, 10))
+
+    AvailabilityEngine().check(conn.cursor(), doctor_id, _at(day, 10, 15), exclude_id=booked)
+
+
+def test_check_uses_stored_slot_length(conn, doctor_and_patient):
+    doctor_id, patient_id = doctor_and_patient
+    day = _next_weekday(0)
+    _book(conn, doctor_id, patient_id, _at(day, 10))
+    conn.execute('''
+        INSERT INTO doctor_availability (doctor_id, start_time, end_time, slot_minutes, working_days)
+        VALUES (?, '09:00', '17:00', 60, '0,1,2,3,4')
+    ''', (doctor_id,))
+    conn.commit()
+
+    with pytest.raises(SlotConflictError):
+        AvailabilityEngine().check(conn.cursor(), doctor_id, _at(day, 10, 45))
+
+
+def test_check_sees_bookings_across_midnight(conn, doctor_and_patient):
+    doctor_id, patient_id = doctor_and_patient
+    day = _next_weekday(0)
+    _book(conn, doctor_id, patient_id, _at(day, 23, 45))
+
+    with pytest.raises(SlotConflictError):
+        AvailabilityEngine().check(conn.cursor(), doctor_id, _at(day + timedelta(days=1), 0, 0))
@@ -0,0 +1,148 @@
+"""
+Tests for the cohort analytics snapshots: merging deltas, rebuilding after
+deletes and publishing whole generations
+"""
+
+import json
+import os
+
+import numpy as np
+import pytest
+
+from app.services.cohort_analytics import CohortAnalytics, _merge
+
+
+def _arrays(ids, values):
+    return {'id': np.array(ids, dtype=np.int64), 'value': np.array(values, dtype=np.float32)}
+
+
+def test_merge_replaces_changed_rows_and_adds_new_ones_in_id_order():
+    merged = _merge(_arrays([1, 3, 5], [10, 30, 50]), _arrays([3, 4, 9], [33, 40, 90]))
+
+    assert merged['id'].tolist() == [1, 3, 4, 5, 9]
+    assert merged['value'].tolist() == [10, 33, 40, 50, 90]
+
+
+def test_merge_with_empty_delta_keeps_everything():
+    merged = _merge(_arrays([2, 1], [20, 10]), _arrays([], []))
+
+    assert merged['id'].tolist() == [1, 2]
+    assert merged['value'].tolist() == [10, 20]
+
+
+@pytest.fixture
+def analytics(db_app, tmp_path):
+    instance = CohortAnalytics()
+    instance.snapshot_dir = str(tmp_path / 'cohorts')
+    os.makedirs(instance.snapshot_dir)
+    return instance
+
+
+@pytest.fixture
+def patient_id(add_user):
+    return add_user('mother@example.com')
+
+
+def _add_entry(conn, user_id, week, gain, stamp='2024-01-01T00:00:00'):
+    cursor = conn.cursor()
+    cursor.execute('''
+        INSERT INTO weight_entries (user_id, date, weight, pregnancy_week, weight_gain, trajectory_updated_at)
+        VALUES (?, '2024-01-01', 60 + ?, ?, ?, ?)
+    ''', (user_id, gain, week, gain, stamp))
+    conn.commit()
+    return cursor.lastrowid
+
+
+def test_gain_curve_percentiles_by_week(analytics, conn, patient_id):
+    for gain in (1, 2, 3, 4, 5):
+        _add_entry(conn, patient_id, 20, gain)
+    _add_entry(conn, patient_id, 30, 9)
+
+    curve = analytics.pregnancy_gain_curve(percentiles=(50,))
+
+    assert curve == [{'week': 20, 'n': 5, 'p50': 3.0}, {'week': 30, 'n': 1, 'p50': 9.0}]
+
+
+def test_refresh_merges_only_changed_rows(analytics, conn, patient_id):
+    first = _add_entry(conn, patient_id, 20, 1)
+    _add_entry(conn, patient_id, 21, 2)
+    analytics.refresh()
+
+    conn.execute("UPDATE weight_entries SET weight_gain = 7, trajectory_updated_at = '2024-02-01T00:00:00' "
+                 "WHERE id = ?", (first,))
+    _add_entry(conn, patient_id, 22, 3, stamp='2024-02-01T00:00:00')
+    conn.commit()
+
+    assert analytics.refresh() == 2
+    arrays = analytics._snapshot('pregnancy')
+    assert arrays['weight_gain'].tolist() == [7, 2, 3]
+    assert analytics.status()['pregnancy']['mark'] == '2024-02-01T00:00:00'
+
+
+def test_deleted_rows_trigger_a_full_rebuild(analytics, conn, patient_id):
+    ids = [_add_entry(conn, patient_id, week, week / 10) for week in (20, 21, 22)]
+    analytics.refresh()
+
+    # A delete leaves no stamp, so only the row count reveals it
+    conn.execute('DELETE FROM weight_entries WHERE id = ?', (ids[1],))
+    conn.commit()
+    analytics.refresh()
+
+    arrays = analytics._snapshot('pregnancy')
+    assert arrays['id'].tolist() == [ids[0], ids[2]]
+    assert analytics.status()['pregnancy']['rows'] == 2
+
+
+def test_snapshot_is_published_as_one_generation(analytics, conn, patient_id):
+    _add_entry(conn, patient_id, 20, 1)
+    analytics.refresh()
+    directory = os.path.join(analytics.snapshot_dir, 'pregnancy')
+    with open(os.path.join(directory, 'meta.json')) as f:
+        first = json.load(f)['generation']
+
+    _add_entry(conn, patient_id, 21, 2, stamp='2024-02-01T00:00:00')
+    analytics.refresh()
+    with open(os.path.join(directory, 'meta.json')) as f:
+        second = json.load(f)['generation']
+
+    assert second != first
+    assert sorted(os.listdir(os.path.join(directory, second))) == ['id.npy', 'week.npy', 'weight_gain.npy']
+
+
+def test_old_generations_are_pruned_keeping_the_previous_one(analytics, conn, patient_id):
+    directory = os.path.join(analytics.snapshot_dir, 'pregnancy')
+    generations = []
+    for week in (20, 21, 22, 23):
+        _add_entry(conn, patient_id, week, 1, stamp=f'2024-01-{week}T00:00:00')
+        analytics.refresh()
+        with open(os.path.join(directory, 'meta.json')) as f:
+            generations.append(json.load(f)['generation'])
+
+    remaining = sorted(entry for entry in os.listdir(directory) if entry.startswith('gen-'))
+    assert remaining == sorted(generations[-2:])
+
+
+def test_other_instances_follow_the_published_generation(analytics, conn, patient_id):
+    _add_entry(conn, patient_id, 20, 1)
+    analytics.refresh()
+    # Another worker process mapping the same snapshot directory
+    reader = CohortAnalytics()
+    reader.snapshot_dir = analytics.snapshot_dir
+    assert reader._snapshot('pregnancy')['id'].size == 1
+
+    _add_entry(conn, patient_id, 21, 2, stamp='2024-02-01T00:00:00')
+    analytics.refresh()
+
+    assert reader._snapshot('pregnancy')['id'].size == 2
+
+
+def test_legacy_flat_snapshot_is_rebuilt(analytics, conn, patient_id):
+    _add_entry(conn, patient_id, 20, 1)
+    directory = os.path.join(analytics.snapshot_dir, 'pregnancy')
+    os.makedirs(directory)
+    np.save(os.path.join(directory, 'id.npy'), np.array([99], dtype=np.int64))
+    with open(os.path.join(directory, 'meta.json'), 'w') as f:
+        json.dump({'mark': '', 'rows': 1}, f)
+
+    assert analytics._snapshot('pregnancy')['id'].size == 1
+    assert 'id.npy' not in os.listdir(directory)
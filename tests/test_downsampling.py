@@ -0,0 +1,104 @@
+"""
+Tests for Largest-Triangle-Three-Buckets downsampling
+"""
+
+import math
+
+import numpy as np
+import pytest
+
+from app.services.downsampling import lttb, downsample, day_number, MIN_POINTS
+
+
+def _reference_lttb(x, y, threshold):
+    """Straightforward loop version of LTTB (Steinarsson, 2013)"""
+    n = len(x)
+    every = (n - 2) / (threshold - 2)
+    selected = [0]
+    a = 0
+    for i in range(threshold - 2):
+        avg_start = math.floor((i + 1) * every) + 1
+        avg_end = min(math.floor((i + 2) * every) + 1, n)
+        avg_x = sum(x[avg_start:avg_end]) / (avg_end - avg_start)
+        avg_y = sum(y[avg_start:avg_end]) / (avg_end - avg_start)
+
+        best, best_area = None, -1
+        for j in range(math.floor(i * every) + 1, math.floor((i + 1) * every) + 1):
+            area = abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a]))
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        a = best
+    selected.append(n - 1)
+    return selected
+
+
+@pytest.mark.parametrize('n,threshold', [(10, 3), (100, 10), (1000, 37), (257, 256)])
+def test_matches_reference_implementation(n, threshold):
+    rng = np.random.default_rng(n)
+    x = np.sort(rng.uniform(0, 1000, n))
+    y = rng.normal(size=n).cumsum()
+
+    assert lttb(x, y, threshold).tolist() == _reference_lttb(x.tolist(), y.tolist(), threshold)
+
+
+def test_keeps_ends_and_returns_sorted_unique_indices():
+    x = np.arange(500)
+    y = np.sin(x / 10)
+
+    selected = lttb(x, y, 50)
+
+    assert len(selected) == 50
+    assert selected[0] == 0 and selected[-1] == 499
+    assert (np.diff(selected) > 0).all()
+
+
+def test_keeps_a_single_spike():
+    y = np.zeros(200)
+    y[123] = 10
+
+    assert 123 in lttb(np.arange(200), y, 10)
+
+
+@pytest.mark.parametrize('threshold', [5, 6, MIN_POINTS - 1, 0])
+def test_small_series_or_threshold_keep_everything(threshold):
+    assert lttb(np.arange(5), np.arange(5), threshold).tolist() == [0, 1, 2, 3, 4]
+
+
+def test_downsample_keeps_each_series_peaks_in_original_order():
+    items = [{'day': day, 'weight': 0.0, 'height': None} for day in range(100)]
+    items[30]['weight'] = 5.0
+    for day in range(0, 100, 10):
+        items[day]['height'] = 50.0
+    items[70]['height'] = 80.0
+
+    reduced = downsample(items, 'day', ['weight', 'height'], 5)
+
+    days = [item['day'] for item in reduced]
+    assert days == sorted(days)
+    assert 30 in days and 70 in days
+    assert {0, 99} <= set(days)
+    assert len(reduced) <= 5 * 2
+
+
+def test_downsample_returns_short_lists_unchanged():
+    items = [{'day': day, 'weight': day} for day in range(4)]
+
+    assert downsample(items, 'day', ['weight'], 10) is items
+    assert downsample(items, 'day', ['weight'], None) is items
+
+
+def test_downsample_skips_items_without_x():
+    items = [{'date': f'2024-01-{day:02d}', 'weight': float(day)} for day in range(1, 29)]
+    items[5]['date'] = 'not a date'
+
+    reduced = downsample(items, lambda item: day_number(item['date']), ['weight'], 4)
+
+    assert items[5] not in reduced
+    assert len(reduced) == 4
+
+
+def test_day_number():
+    assert day_number('2024-03-01T10:00:00') - day_number('2024-02-28') == 2
+    assert day_number(None) is None
+    assert day_number('soon') is None
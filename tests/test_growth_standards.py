@@ -0,0 +1,105 @@
+"""
+Tests for the WHO growth standards z-score and percentile engine
+"""
+
+import numpy as np
+import pytest
+
+from app.services.growth_standards import GrowthStandards, ages_in_months, percentile, DAYS_PER_MONTH
+
+
+@pytest.fixture(scope='module')
+def standards():
+    return GrowthStandards()
+
+
+def _lms(standards, indicator, sex, age):
+    ages, L, M, S = standards.tables[(indicator, sex)]
+    index = int(np.flatnonzero(ages == age)[0])
+    return L[index], M[index], S[index]
+
+
+def _value_at(l, m, s, z):
+    """Measurement at a given z-score inside +/-3 SD (inverse of the LMS formula)"""
+    return m * (1 + l * s * z) ** (1 / l)
+
+
+def test_tables_cover_birth_to_five_years(standards):
+    assert standards.max_age_months == 60
+    assert set(standards.tables) == {(indicator, sex) for indicator in ('wfa', 'lfa', 'hcfa')
+                                     for sex in ('male', 'female')}
+
+
+@pytest.mark.parametrize('indicator,sex,age', [
+    ('wfa', 'male', 0), ('wfa', 'female', 12), ('lfa', 'male', 24), ('hcfa', 'female', 60)
+])
+def test_median_scores_zero(standards, indicator, sex, age):
+    _, m, _ = _lms(standards, indicator, sex, age)
+
+    assert standards.zscores(indicator, sex, [age], [m])[0] == pytest.approx(0, abs=1e-9)
+
+
+@pytest.mark.parametrize('z', [-2.5, -1, 1, 2, 3])
+def test_lms_formula_round_trips(standards, z):
+    l, m, s = _lms(standards, 'wfa', 'female', 6)
+
+    assert standards.zscores('wfa', 'female', [6], [_value_at(l, m, s, z)])[0] == pytest.approx(z, abs=1e-6)
+
+
+def test_weight_beyond_three_sd_is_extrapolated_linearly(standards):
+    l, m, s = _lms(standards, 'wfa', 'male', 6)
+    sd2, sd3 = _value_at(l, m, s, 2), _value_at(l, m, s, 3)
+    sd_neg2, sd_neg3 = _value_at(l, m, s, -2), _value_at(l, m, s, -3)
+
+    high, low = standards.zscores('wfa', 'male', [6, 6], [sd3 + (sd3 - sd2), sd_neg3 - (sd_neg2 - sd_neg3)])
+
+    assert high == pytest.approx(4)
+    assert low == pytest.approx(-4)
+
+
+def test_ages_between_table_points_are_interpolated(standards):
+    l0, m0, s0 = _lms(standards, 'hcfa', 'male', 3)
+    l1, m1, s1 = _lms(standards, 'hcfa', 'male', 4)
+    midpoint = _value_at((l0 + l1) / 2, (m0 + m1) / 2, (s0 + s1) / 2, 1)
+
+    assert standards.zscores('hcfa', 'male', [3.5], [midpoint])[0] == pytest.approx(1, abs=1e-6)
+
+
+def test_unscorable_inputs_give_nan(standards):
+    _, m, _ = _lms(standards, 'wfa', 'male', 12)
+
+    z = standards.zscores('wfa', 'male', [-1, 61, 12, 12], [m, m, 0, np.nan])
+
+    assert np.isnan(z).all()
+    assert np.isnan(standards.zscores('wfa', 'other', [12], [m])).all()
+
+
+def test_score_splits_by_sex_and_skips_missing_measurements(standards):
+    _, male_m, _ = _lms(standards, 'wfa', 'male', 12)
+    _, female_m, _ = _lms(standards, 'wfa', 'female', 12)
+
+    results = standards.score(['male', 'female', 'unknown'], [12, 12, 12], {
+        'weight': [male_m, female_m, male_m],
+        'height': [None, None, None],
+        'head_circumference': [None, None, None]
+    })
+
+    z, p = results['weight_for_age']
+    assert z[:2] == pytest.approx([0, 0], abs=1e-9)
+    assert p[:2] == pytest.approx([50, 50], abs=1e-6)
+    assert np.isnan(z[2])
+    assert np.isnan(results['length_for_age'][0]).all()
+
+
+def test_percentile_matches_normal_distribution():
+    assert percentile([0, 1, -1.881, 1.881]) == pytest.approx([50, 84.134, 3.0, 97.0], abs=0.01)
+    assert np.isnan(percentile([np.nan])).all()
+
+
+def test_ages_in_months_from_dates_and_fallback():
+    ages = ages_in_months(['2024-01-01', '2024-01-01'], ['2024-01-01', '2025-01-01'], [None, None])
+    assert ages == pytest.approx([0, 366 / DAYS_PER_MONTH])
+
+    fallback = ages_in_months(['not a date', '2024-01-01'], ['2024-02-01', None], [5, None])
+    assert fallback[0] == 5
+    assert np.isnan(fallback[1])
@@ -0,0 +1,141 @@
+"""
+Tests for stored growth metrics: ages, z-scores, velocity, trend and
+percentile-crossing flags, computed in full and incrementally
+"""
+
+import json
+
+import pytest
+
+from app.services import growth_trends
+from app.services.growth_standards import growth_standards, ages_in_months
+from app.services.growth_trends import TREND_ALPHA, _crossing
+
+BIRTH = '2024-01-15'
+
+
+def _weight_at(age_months, z):
+    """WHO boys' weight at a whole-month age and z-score (inside +/-3 SD)"""
+    ages, L, M, S = growth_standards.tables[('wfa', 'male')]
+    l, m, s = L[age_months], M[age_months], S[age_months]
+    return round(float(m * (1 + l * s * z) ** (1 / l)), 3)
+
+
+@pytest.fixture
+def baby_id(conn, add_user):
+    parent_id = add_user('parent@example.com')
+    cursor = conn.cursor()
+    cursor.execute('''
+        INSERT INTO babies (name, birth_date, gender, parent_id, unique_id)
+        VALUES ('Test Baby', ?, 'Male', ?, 'BABY-TEST-1')
+    ''', (BIRTH, parent_id))
+    conn.commit()
+    return cursor.lastrowid
+
+
+def _add_record(conn, baby_id, record_date, weight=None, height=None):
+    conn.execute('INSERT INTO growth_records (baby_id, record_date, weight, height) VALUES (?, ?, ?, ?)',
+                 (baby_id, record_date, weight, height))
+
+
+def _records(conn, baby_id):
+    conn.row_factory = lambda cursor, row: {column[0]: value for column, value in zip(cursor.description, row)}
+    try:
+        return conn.execute('SELECT * FROM growth_records WHERE baby_id = ? ORDER BY record_date, id',
+                            (baby_id,)).fetchall()
+    finally:
+        conn.row_factory = None
+
+
+def test_ages_are_whole_days_and_completed_months(conn, baby_id):
+    _add_record(conn, baby_id, '2024-01-15', weight=3.3)
+    _add_record(conn, baby_id, '2024-03-14', weight=5.0)
+    _add_record(conn, baby_id, '2024-03-15', weight=5.1)
+    growth_trends.refresh_baby(conn, baby_id)
+
+    records = _records(conn, baby_id)
+
+    assert [r['age_days'] for r in records] == [0, 59, 60]
+    assert [r['age_months'] for r in records] == [0, 1, 2]
+
+
+def test_z_scores_velocity_and_trend(conn, baby_id):
+    weights = [_weight_at(0, 0), _weight_at(2, 0.5), _weight_at(4, 0.5)]
+    dates = ['2024-01-15', '2024-03-15', '2024-05-15']
+    for record_date, weight in zip(dates, weights):
+        _add_record(conn, baby_id, record_date, weight=weight)
+
+    assert growth_trends.refresh_baby(conn, baby_id) == 3
+    records = _records(conn, baby_id)
+    ages = ages_in_months([BIRTH] * 3, dates, [None] * 3)
+
+    assert records[0]['weight_z'] == pytest.approx(0, abs=0.01)
+    assert records[0]['weight_velocity'] is None
+    assert records[0]['weight_trend'] == pytest.approx(weights[0])
+    for index in (1, 2):
+        expected_velocity = (weights[index] - weights[index - 1]) / (ages[index] - ages[index - 1])
+        assert records[index]['weight_velocity'] == pytest.approx(expected_velocity, abs=1e-3)
+    assert records[1]['weight_trend'] == pytest.approx(
+        TREND_ALPHA * weights[1] + (1 - TREND_ALPHA) * weights[0], abs=1e-3)
+    # No height measured: nothing stored for it
+    assert records[1]['height_z'] is None and records[1]['height_velocity'] is None
+    assert all(r['metrics_updated_at'] for r in records)
+
+
+def test_velocity_skips_visits_without_that_measurement(conn, baby_id):
+    _add_record(conn, baby_id, '2024-01-15', weight=3.3)
+    _add_record(conn, baby_id, '2024-02-15', height=54.0)
+    _add_record(conn, baby_id, '2024-03-15', weight=5.3)
+    growth_trends.refresh_baby(conn, baby_id)
+
+    records = _records(conn, baby_id)
+    months = ages_in_months([BIRTH], ['2024-03-15'], [None])[0]
+
+    assert records[2]['weight_velocity'] == pytest.approx((5.3 - 3.3) / months, abs=1e-3)
+
+
+def test_crossing_two_major_percentile_lines_is_flagged(conn, baby_id):
+    _add_record(conn, baby_id, '2024-01-15', weight=_weight_at(0, -2.5))
+    _add_record(conn, baby_id, '2024-03-15', weight=_weight_at(2, 0.5))
+    _add_record(conn, baby_id, '2024-05-15', weight=_weight_at(4, 0.8))
+    growth_trends.refresh_baby(conn, baby_id)
+
+    crossings = [json.loads(r['percentile_crossings']) for r in _records(conn, baby_id)]
+
+    assert crossings == [[], ['weight_for_age_up'], []]
+
+
+def test_crossing_rule():
+    assert _crossing(-2.5, 0.5) == 'up'
+    assert _crossing(1.2, -0.2) == 'down'
+    # One line (the median) is not enough
+    assert _crossing(-0.5, 0.5) is None
+    assert _crossing(None, 1.0) is None
+
+
+def test_incremental_refresh_matches_full_recompute(conn, baby_id):
+    dates = ['2024-01-15', '2024-02-15', '2024-03-15', '2024-04-15']
+    for month, record_date in enumerate(dates[:3]):
+        _add_record(conn, baby_id, record_date, weight=_weight_at(month, 0.2 * month))
+    growth_trends.refresh_baby(conn, baby_id)
+
+    _add_record(conn, baby_id, dates[3], weight=_weight_at(3, -1.5))
+    assert growth_trends.refresh_baby(conn, baby_id, dates[3]) == 1
+    incremental = _records(conn, baby_id)
+
+    conn.execute('UPDATE growth_records SET metrics_updated_at = NULL WHERE baby_id = ?', (baby_id,))
+    growth_trends.refresh_baby(conn, baby_id)
+    full = _records(conn, baby_id)
+
+    columns = growth_trends.METRIC_COLUMNS + ['percentile_crossings', 'age_days', 'age_months']
+    for before, after in zip(incremental, full):
+        assert {c: before[c] for c in columns} == {c: after[c] for c in columns}
+
+
+def test_rescore_missing_picks_up_never_computed_records(conn, baby_id):
+    _add_record(conn, baby_id, '2024-01-15', weight=3.3)
+    _add_record(conn, baby_id, '2024-03-15', weight=5.5)
+
+    assert growth_trends.rescore_missing(conn) == 2
+    assert growth_trends.rescore_missing(conn) == 0
+    assert all(r['metrics_updated_at'] and r['weight_z'] is not None for r in _records(conn, baby_id))
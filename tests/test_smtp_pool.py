@@ -0,0 +1,184 @@
+"""
+Tests for the SMTP connection pool against a local SMTP stand-in
+"""
+
+import socket
+import socketserver
+import threading
+import time
+
+import pytest
+
+from app.services.smtp_pool import SMTPConnectionPool
+
+SENDER = 'noreply@example.com'
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: no TLS, no AUTH"""
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+            server.sockets.append(self.connection)
+        if server.refuse:
+            self._reply('554 not accepting connections')
+            return
+        self._reply('220 localhost test SMTP')
+
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            verb = line.decode().strip().split(' ')[0].upper()
+            server.commands.append(verb)
+            if verb == 'QUIT':
+                self._reply('221 bye')
+                return
+            if verb == 'DATA':
+                self._reply('354 end with .')
+                body = []
+                for data_line in iter(self.rfile.readline, b''):
+                    if data_line == b'.\r\n':
+                        break
+                    body.append(data_line)
+                server.messages.append(b''.join(body))
+                self._reply('250 queued')
+                # Simulate the server dropping the session mid-batch
+                if server.drop_after and len(server.messages) == server.drop_after:
+                    server.drop_after = None
+                    return
+            elif verb in ('EHLO', 'HELO', 'MAIL', 'RCPT', 'RSET', 'NOOP'):
+                self._reply('250 ok')
+            else:
+                self._reply('502 not implemented')
+
+    def _reply(self, text):
+        self.wfile.write(f'{text}\r\n'.encode())
+
+
+class _SMTPStandIn(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _SMTPHandler)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.sockets = []
+        self.commands = []
+        self.messages = []
+        self.refuse = False
+        self.drop_after = None
+
+    def drop_sessions(self):
+        """Close every open session from the server side"""
+        with self.lock:
+            sockets, self.sockets = self.sockets, []
+        for sock in sockets:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+@pytest.fixture
+def smtp_server():
+    server = _SMTPStandIn()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _pool(server, **kwargs):
+    return SMTPConnectionPool('127.0.0.1', server.server_address[1], use_tls=False,
+                              use_auth=False, timeout=5, **kwargs)
+
+
+def _messages(count):
+    return [(f'user{i}@example.com', f'Subject: test {i}\r\n\r\nbody {i}\r\n') for i in range(count)]
+
+
+def _wait_for(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_batch_uses_one_session(smtp_server):
+    pool = _pool(smtp_server)
+
+    assert pool.send_messages(SENDER, _messages(5)) == [True] * 5
+    assert len(smtp_server.messages) == 5
+    assert smtp_server.connections == 1
+    pool.close_all()
+
+
+def test_idle_session_is_reused_after_noop(smtp_server):
+    pool = _pool(smtp_server)
+    pool.send_messages(SENDER, _messages(1))
+
+    assert pool.send_messages(SENDER, _messages(1)) == [True]
+    assert smtp_server.connections == 1
+    assert 'NOOP' in smtp_server.commands
+    pool.close_all()
+
+
+def test_dead_idle_session_is_replaced(smtp_server):
+    pool = _pool(smtp_server)
+    pool.send_messages(SENDER, _messages(1))
+    smtp_server.drop_sessions()
+
+    assert pool.send_messages(SENDER, _messages(2)) == [True, True]
+    assert smtp_server.connections == 2
+    pool.close_all()
+
+
+def test_prune_closes_expired_sessions(smtp_server):
+    pool = _pool(smtp_server, idle_timeout=0.05)
+    pool.send_messages(SENDER, _messages(1))
+    time.sleep(0.1)
+
+    assert pool.prune() == 1
+    assert pool.prune() == 0
+    assert _wait_for(lambda: 'QUIT' in smtp_server.commands)
+
+
+def test_expired_session_is_not_reused(smtp_server):
+    pool = _pool(smtp_server, idle_timeout=0.05)
+    pool.send_messages(SENDER, _messages(1))
+    time.sleep(0.1)
+
+    assert pool.send_messages(SENDER, _messages(1)) == [True]
+    assert smtp_server.connections == 2
+    assert 'NOOP' not in smtp_server.commands
+    pool.close_all()
+
+
+def test_reconnects_once_when_dropped_mid_batch(smtp_server):
+    pool = _pool(smtp_server)
+    smtp_server.drop_after = 2
+
+    assert pool.send_messages(SENDER, _messages(4)) == [True] * 4
+    assert len(smtp_server.messages) == 4
+    assert smtp_server.connections == 2
+    pool.close_all()
+
+
+def test_failed_reconnect_keeps_delivered_results(smtp_server):
+    pool = _pool(smtp_server)
+    smtp_server.drop_after = 2
+
+    def refuse_after_drop(original=pool._connect):
+        smtp_server.refuse = smtp_server.connections >= 1
+        return original()
+
+    pool._connect = refuse_after_drop
+
+    assert pool.send_messages(SENDER, _messages(4)) == [True, True, False, False]
+    assert len(smtp_server.messages) == 2
+    pool.close_all()
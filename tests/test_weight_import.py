@@ -0,0 +1,127 @@
+"""
+Tests for the weight entry CSV import: per-row validation and the bulk insert
+"""
+
+from datetime import date, timedelta
+
+import pytest
+
+from app.services.weight_import import import_entries, WeightImportError, MAX_REPORTED_ERRORS, _validate
+
+VALID_ROW = {'date': '2024-03-01', 'pregnancy_week': '20', 'weight': '70',
+             'pre_pregnancy_weight': '62', 'height': '165', 'notes': 'clinic visit'}
+
+
+def _row(**changes):
+    row = dict(VALID_ROW)
+    for column, value in changes.items():
+        if value is None:
+            row.pop(column, None)
+        else:
+            row[column] = value
+    return row
+
+
+def _errors(*rows):
+    records, errors = _validate([(index + 2, row) for index, row in enumerate(rows)])
+    return records, {error['row']: error['error'] for error in errors}
+
+
+def test_valid_row_derives_bmi_and_gain():
+    records, errors = _errors(_row())
+
+    assert errors == {}
+    assert records == [('2024-03-01', 70.0, 20, 62.0, 165.0, 25.7, 8.0, 'clinic visit')]
+
+
+def test_optional_columns_may_be_missing():
+    records, errors = _errors(_row(pre_pregnancy_weight=None, height=None, notes=None, date=None))
+
+    assert errors == {}
+    assert records == [(date.today().isoformat(), 70.0, 20, None, None, None, None, '')]
+
+
+@pytest.mark.parametrize('changes,message', [
+    ({'pregnancy_week': None}, 'pregnancy_week is required'),
+    ({'weight': None}, 'weight is required'),
+    ({'pregnancy_week': '20.5'}, 'pregnancy_week must be a whole number from 1 to 42'),
+    ({'pregnancy_week': '43'}, 'pregnancy_week must be a whole number from 1 to 42'),
+    ({'weight': '19'}, 'weight must be between 20 and 300 kg'),
+    ({'pre_pregnancy_weight': '301'}, 'pre_pregnancy_weight must be between 20 and 300 kg'),
+    ({'height': '99'}, 'height must be between 100 and 250 cm'),
+    ({'date': '01/03/2024'}, 'date must be YYYY-MM-DD'),
+    ({'date': (date.today() + timedelta(days=1)).isoformat()}, 'date is in the future'),
+])
+def test_invalid_values_are_reported(changes, message):
+    records, errors = _errors(_row(**changes))
+
+    assert records == []
+    assert errors == {2: message}
+
+
+def test_unparseable_number_is_not_also_reported_missing():
+    _, errors = _errors(_row(weight='heavy'))
+
+    assert errors == {2: 'weight is not a number'}
+
+
+def test_every_problem_in_a_row_is_listed_and_good_rows_kept():
+    records, errors = _errors(_row(), _row(pregnancy_week='0', height='abc'), _row(weight='80'))
+
+    assert [record[1] for record in records] == [70.0, 80.0]
+    assert errors == {3: 'height is not a number; pregnancy_week must be a whole number from 1 to 42'}
+
+
+# import_entries
+
+def _csv(*rows):
+    return ['Date,Pregnancy Week,Weight (kg),Pre-pregnancy Weight (kg),Height (cm),Notes\n'] + [
+        ','.join(row) + '\n' for row in rows]
+
+
+@pytest.fixture
+def patient_id(add_user):
+    return add_user('mother@example.com')
+
+
+def test_import_inserts_rows_and_computes_their_trajectory(conn, patient_id):
+    imported, error_count, errors = import_entries(conn, patient_id, _csv(
+        ('2024-03-01', '20', '70', '62', '165', 'first'),
+        ('', '', '', '', '', ''),
+        ('2024-04-01', '24', '72', '62', '165', 'second')
+    ))
+    conn.commit()
+
+    assert (imported, error_count, errors) == (2, 0, [])
+    rows = conn.execute('SELECT pregnancy_week, weight_gain, gain_status, trajectory_updated_at '
+                        'FROM weight_entries WHERE user_id = ? ORDER BY pregnancy_week', (patient_id,)).fetchall()
+    assert [(week, gain) for week, gain, _, _ in rows] == [(20, 8.0), (24, 10.0)]
+    assert all(status and stamp for _, _, status, stamp in rows)
+
+
+def test_import_with_errors_inserts_nothing(conn, patient_id):
+    imported, error_count, errors = import_entries(conn, patient_id, _csv(
+        ('2024-03-01', '20', '70', '62', '165', 'good'),
+        ('2024-03-08', '21', '7', '62', '165', 'typo')
+    ))
+
+    assert (imported, error_count) == (0, 1)
+    assert errors == [{'row': 3, 'error': 'weight must be between 20 and 300 kg'}]
+    assert conn.execute('SELECT COUNT(*) FROM weight_entries WHERE user_id = ?', (patient_id,)).fetchone()[0] == 0
+
+
+def test_import_caps_reported_errors(conn, patient_id):
+    rows = [('2024-03-01', '99', '70', '', '', '')] * (MAX_REPORTED_ERRORS + 5)
+
+    imported, error_count, errors = import_entries(conn, patient_id, _csv(*rows))
+
+    assert imported == 0
+    assert error_count == MAX_REPORTED_ERRORS + 5
+    assert len(errors) == MAX_REPORTED_ERRORS
+
+
+def test_import_rejects_a_header_without_required_columns(conn, patient_id):
+    with pytest.raises(WeightImportError, match='pregnancy_week'):
+        import_entries(conn, patient_id, ['Date,Weight\n', '2024-03-01,70\n'])
+    with pytest.raises(WeightImportError, match='empty'):
+        import_entries(conn, patient_id, [])